@@ -1,10 +1,17 @@
 import streamlit as st
 import requests
-from bisect import bisect_right
 import base64
+import copy
 import hashlib
+import json
+import os
+import re
+import threading
+import time
 import secrets as pysecrets
 from pathlib import Path
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from zoneinfo import ZoneInfo
 from urllib.parse import urlencode
 
@@ -13,6 +20,18 @@ SECONDARY_DATASET_ID = "hydraulics"
 LEGACY_SECONDARY_DATASET_ID = "scott"
 MANUAL_QUERY_KEY = "manual"
 MANUAL_MARKDOWN_PATH = Path(__file__).resolve().parent / "docs" / "hydraulic_resourcing_user_manual.md"
+AUTOSAVE_QUEUE_DIR = Path(__file__).resolve().parent / ".autosave_queue"
+AUTOSAVE_DEFAULT_DEBOUNCE_SECONDS = 4.0
+AUTOSAVE_MAX_RETRY_SECONDS = 300.0
+STATE_CACHE_DIR = Path(__file__).resolve().parent / ".state_cache"
+SHARED_DATASET_TTL_SECONDS = 300.0
+SCHEDULE_DEFAULT_WORKERS = 1
+RISK_SAMPLE_OPTIONS = [1000, 5000, 10000, 20000]
+DEPENDENCY_START_LABELS = {
+    "start": "Plan start",
+    "queue": "Member's previous job",
+    "dependency": "Predecessor finish",
+}
 
 def _query_param_str(key: str) -> str:
     try:
@@ -226,8 +245,101 @@ def require_login():
 
 require_login()
 
+import numpy as np
 import pandas as pd
-from datetime import date, datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from resourcing_core import (
+    WEEKDAY_MAP,
+    LABEL_TO_INT,
+    INT_TO_LABEL,
+    DEFAULT_TEAM_ROWS,
+    DEFAULT_JOBS_ROWS,
+    RISK_DEFAULT_SAMPLES,
+    SEQUENCING_POLICIES,
+    SHARE_MODES,
+    CapacityCalendar,
+    DateRangeMask,
+    _default_member_settings,
+    _normalize_team_df,
+    _ordinals_to_dates,
+    _payload_digest,
+    _safe_date,
+    _safe_date_hours,
+    _safe_dates,
+    _safe_datetime,
+    _safe_float,
+    _safe_int,
+    _serialize_member_settings,
+    _utc_now,
+    add_months,
+    add_status_columns,
+    allocate_member_hours,
+    apply_job_dtypes,
+    apply_job_shares,
+    apply_scenario_edits,
+    backlog_queue,
+    build_day_job_details,
+    build_member_calendar,
+    clean_jobs_df,
+    collapse_shared_jobs,
+    decode_state_snapshot,
+    delivery_health,
+    dependency_edges,
+    describe_scenario_edit,
+    describe_unavailable_rule,
+    empty_jobs_df,
+    encode_state_snapshot,
+    evaluate_scenarios,
+    expand_unavailable_rules,
+    finish_date_changes,
+    free_hours_until,
+    get_effective_unavailable_hours,
+    job_arrays,
+    job_hours,
+    job_time_slots,
+    load_state_snapshot_bytes,
+    member_due_deficit,
+    member_leave_ranges,
+    member_schedule_task,
+    month_end,
+    month_start,
+    next_available_date,
+    normalize_active_priorities,
+    normalize_dependencies,
+    normalize_estimate_ranges,
+    normalize_hours_profile,
+    normalize_intraday,
+    normalize_sequencing,
+    normalize_shared_jobs,
+    normalize_unavailable_hours,
+    normalize_unavailable_rules,
+    on_time_counts,
+    ordinal_day,
+    outcome_kpis,
+    parse_member_settings,
+    parse_work_window,
+    propose_rebalance,
+    rebalance_edits,
+    run_dependency_schedule,
+    run_member_schedule_tasks,
+    schedule_member_jobs,
+    schedule_outcome,
+    scheduled_queue,
+    sequencing_outcomes,
+    shared_job_rows,
+    simulate_delivery_risk,
+)
+from resourcing_calendar import (
+    MS_BULK_MAX_WORKERS,
+    MS_BULK_WORKERS_LIMIT,
+    MS_GRAPH_BASE_URL,
+    GraphThrottle,
+    _event_overlaps_days,
+    fetch_microsoft_calendar_events_windowed,
+    map_events_to_busy_spans,
+    map_events_to_daily_unavailable,
+    sync_calendar_windows,
+)
 
 st.markdown(
     '''
@@ -643,72 +755,11 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-WEEKDAY_MAP = [("Mon", 0), ("Tue", 1), ("Wed", 2), ("Thu", 3), ("Fri", 4), ("Sat", 5), ("Sun", 6)]
-LABEL_TO_INT = {k: v for k, v in WEEKDAY_MAP}
-INT_TO_LABEL = {v: k for k, v in WEEKDAY_MAP}
-
-JOB_COLS = ["Job name", "Required hours", "Priority", "Assignee", "Due date", "Notes"]
 SUPABASE_STATE_TABLE = "app_state"
 SUPABASE_DEFAULT_STATE_ID = PRIMARY_DATASET_ID
-MS_GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
 MS_DEFAULT_SCOPES = ["offline_access", "openid", "profile", "User.Read", "Calendars.Read"]
 MS_SNAPSHOT_HORIZON_DAYS = 60
-
-DEFAULT_TEAM_ROWS = [
-    {"Member": "SL", "Daily hours": 8.0},
-    {"Member": "LS", "Daily hours": 8.0},
-    {"Member": "LB", "Daily hours": 8.0},
-]
-
-DEFAULT_JOBS_ROWS = [
-    {"Job name": "Job B", "Required hours": 8.0, "Priority": 1, "Assignee": "SL", "Due date": None, "Notes": ""},
-    {"Job name": "Job A", "Required hours": 16.0, "Priority": 2, "Assignee": "SL", "Due date": None, "Notes": ""},
-    {"Job name": "Backlog item", "Required hours": 6.0, "Priority": 0, "Assignee": "SL", "Due date": None, "Notes": "On hold"},
-]
-
-def build_working_dates(start_date: date, weekdays: set[int], non_working_dates: set[date], horizon_days: int = 3650) -> list[date]:
-    dates = []
-    d = start_date
-    for _ in range(horizon_days):
-        if d.weekday() in weekdays and d not in non_working_dates:
-            dates.append(d)
-        d = d + timedelta(days=1)
-    return dates
-
-def normalize_unavailable_hours(unavailable_hours: dict | None, daily_hours: float) -> dict[date, float]:
-    out: dict[date, float] = {}
-    if unavailable_hours is None:
-        return out
-    for k, v in unavailable_hours.items():
-        kd = _safe_date(k)
-        if kd is None:
-            continue
-        try:
-            hv = float(v)
-        except Exception:
-            continue
-        if hv <= 0:
-            continue
-        out[kd] = min(hv, float(daily_hours))
-    return out
-
-def build_capacity_days(
-    start_date: date,
-    weekdays: set[int],
-    non_working_dates: set[date],
-    daily_hours: float,
-    unavailable_hours: dict | None = None,
-    horizon_days: int = 3650,
-) -> list[tuple[date, float]]:
-    unavail = normalize_unavailable_hours(unavailable_hours, daily_hours)
-    days: list[tuple[date, float]] = []
-    d = start_date
-    for _ in range(horizon_days):
-        if d.weekday() in weekdays and d not in non_working_dates:
-            cap = max(float(daily_hours) - float(unavail.get(d, 0.0)), 0.0)
-            days.append((d, cap))
-        d = d + timedelta(days=1)
-    return days
+MS_SNAPSHOT_MAX_HORIZON_DAYS = 730
 
 def get_supabase_config() -> tuple[str, str, bool]:
     url = st.secrets.get("SUPABASE_URL", "").strip().rstrip("/")
@@ -719,33 +770,6 @@ def get_active_state_id() -> str:
     state_id = str(st.session_state.get("state_dataset_id", SUPABASE_DEFAULT_STATE_ID)).strip()
     return state_id if state_id else SUPABASE_DEFAULT_STATE_ID
 
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
-
-def _safe_date(value) -> date | None:
-    dt = pd.to_datetime(value, errors="coerce")
-    if pd.isna(dt):
-        return None
-    return dt.date()
-
-def _safe_datetime(value) -> datetime | None:
-    dt = pd.to_datetime(value, errors="coerce", utc=True)
-    if pd.isna(dt):
-        return None
-    return dt.to_pydatetime()
-
-def _safe_int(value, default: int = 0) -> int:
-    try:
-        return int(value)
-    except Exception:
-        return int(default)
-
-def _safe_float(value, default: float = 0.0) -> float:
-    try:
-        return float(value)
-    except Exception:
-        return float(default)
-
 def _normalize_scope_list(raw_scopes) -> list[str]:
     if isinstance(raw_scopes, (list, tuple, set)):
         items = [str(x).strip() for x in raw_scopes]
@@ -808,6 +832,12 @@ def _default_calendar_sync_state() -> dict:
         "oauth_state": "",
         "oauth_code_verifier": "",
         "oauth_created_at": "",
+        "delta_windows": {},
+        "delta_member": "",
+        "delta_basis": "",
+        "delta_applied_through": "",
+        "timezone": "",
+        "event_cache": {},
     }
 
 def ensure_calendar_sync_state() -> None:
@@ -822,112 +852,77 @@ def ensure_calendar_sync_state() -> None:
             merged[k] = current[k]
     st.session_state["calendar_sync"] = merged
 
-def get_effective_unavailable_hours(cfg: dict, daily_hours: float) -> dict[date, float]:
-    manual_map = normalize_unavailable_hours(cfg.get("unavailable_hours", {}), daily_hours)
-    calendar_map = normalize_unavailable_hours(cfg.get("calendar_unavailable_hours", {}), daily_hours)
-    out: dict[date, float] = {}
-    for d in set(list(manual_map.keys()) + list(calendar_map.keys())):
-        total = float(manual_map.get(d, 0.0)) + float(calendar_map.get(d, 0.0))
-        if total > 0:
-            out[d] = min(float(daily_hours), total)
-    return out
-
-def _default_member_settings(members: list[str]) -> dict:
-    out = {}
-    for m in members:
-        out[m] = {
-            "weekdays": {0, 1, 2, 3, 4},
-            "leave_dates": [],
-            "start_date": date.today(),
-            "unavailable_hours": {},
-            "calendar_unavailable_hours": {},
-        }
-    return out
+def get_team_shutdown_mask() -> DateRangeMask:
+    # One coalesced mask per set of shutdown ranges, shared by every member's capacity calendar.
+    ranges = st.session_state.get("team_shutdowns", [])
+    cache_key = tuple((str(a), str(b)) for a, b in ranges)
+    cached = st.session_state.get("team_shutdown_mask")
+    if cached is None or cached[0] != cache_key:
+        cached = (cache_key, DateRangeMask(ranges))
+        st.session_state["team_shutdown_mask"] = cached
+    return cached[1]
 
-def _normalize_team_df(df: pd.DataFrame) -> pd.DataFrame:
-    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
-        return pd.DataFrame(DEFAULT_TEAM_ROWS)
-    out = df.copy()
-    if "Member" not in out.columns:
-        out["Member"] = None
-    if "Daily hours" not in out.columns:
-        out["Daily hours"] = None
-    out = out[["Member", "Daily hours"]]
-    out = out.dropna(subset=["Member", "Daily hours"], how="any")
-    out = out[out["Member"].astype(str).str.len() > 0]
-    out["Daily hours"] = pd.to_numeric(out["Daily hours"], errors="coerce")
-    out = out[out["Daily hours"] >= 1.0]
-    out = out.reset_index(drop=True)
-    return out if not out.empty else pd.DataFrame(DEFAULT_TEAM_ROWS)
+def member_capacity_calendar(member: str, daily_hours: float, start_date: date) -> CapacityCalendar:
+    return build_member_calendar(st.session_state["member_settings"][member], daily_hours, start_date, get_team_shutdown_mask())
 
 def init_local_state_if_missing() -> None:
     if "team" not in st.session_state:
         st.session_state["team"] = pd.DataFrame(DEFAULT_TEAM_ROWS)
-    if "jobs_raw" not in st.session_state:
-        st.session_state["jobs_raw"] = pd.DataFrame(DEFAULT_JOBS_ROWS)
+    if "shared_jobs" not in st.session_state:
+        st.session_state["shared_jobs"] = {}
+    if "jobs_store" not in st.session_state:
+        set_jobs_table(st.session_state.pop("jobs_raw", pd.DataFrame(DEFAULT_JOBS_ROWS)))
     if "member_settings" not in st.session_state:
         members = st.session_state["team"]["Member"].astype(str).tolist()
         st.session_state["member_settings"] = _default_member_settings(members)
+    if "team_shutdowns" not in st.session_state:
+        st.session_state["team_shutdowns"] = []
+    if "estimate_ranges" not in st.session_state:
+        st.session_state["estimate_ranges"] = normalize_estimate_ranges(None)
+    if "dependencies" not in st.session_state:
+        st.session_state["dependencies"] = []
     ensure_calendar_sync_state()
 
+def mark_state_changed() -> None:
+    # Job partitions carry their own versions; every other saved field bumps this generation when it
+    # changes, so autosave can skip serializing the plan on reruns that changed nothing.
+    st.session_state["state_generation"] = int(st.session_state.get("state_generation", 0)) + 1
+
+def update_state(container, key: str, value) -> None:
+    # Widgets write their value back on every rerun; only a different value counts as a change.
+    if container.get(key) != value:
+        container[key] = value
+        mark_state_changed()
+
 def serialize_state_payload() -> dict:
     team_df = _normalize_team_df(st.session_state.get("team", pd.DataFrame(DEFAULT_TEAM_ROWS)))
-    jobs_df = clean_jobs_df(st.session_state.get("jobs_raw", pd.DataFrame(columns=JOB_COLS)))
+    jobs_df = get_jobs_table()
     ms = st.session_state.get("member_settings", {})
 
     team_records = team_df.to_dict(orient="records")
     jobs_records = []
-    for row in jobs_df.to_dict(orient="records"):
-        due = _safe_date(row.get("Due date"))
+    # The store holds canonical dtypes, so columns convert in bulk instead of per-cell parsing.
+    job_dues = jobs_df["Due date"].dt.strftime("%Y-%m-%d").tolist()
+    for name, hours, priority, assignee, due, notes in zip(
+        jobs_df["Job name"].tolist(),
+        job_hours(jobs_df["Required hours"]),
+        jobs_df["Priority"].tolist(),
+        jobs_df["Assignee"].astype(str).tolist(),
+        job_dues,
+        jobs_df["Notes"].tolist(),
+    ):
         jobs_records.append(
             {
-                "Job name": str(row.get("Job name", "")),
-                "Required hours": float(row.get("Required hours", 0.0)),
-                "Priority": int(row.get("Priority", 0)),
-                "Assignee": str(row.get("Assignee", "")),
-                "Due date": None if due is None else due.isoformat(),
-                "Notes": str(row.get("Notes", "")),
+                "Job name": str(name),
+                "Required hours": float(hours),
+                "Priority": int(priority),
+                "Assignee": assignee,
+                "Due date": due if isinstance(due, str) else None,
+                "Notes": str(notes),
             }
         )
 
-    settings_records = {}
-    for member, cfg in ms.items():
-        weekdays = sorted([int(x) for x in cfg.get("weekdays", {0, 1, 2, 3, 4})])
-        leave_dates = []
-        for d in cfg.get("leave_dates", []):
-            parsed = _safe_date(d)
-            if parsed is not None:
-                leave_dates.append(parsed.isoformat())
-        unavailable_hours = {}
-        for k, v in (cfg.get("unavailable_hours", {}) or {}).items():
-            kd = _safe_date(k)
-            if kd is None:
-                continue
-            try:
-                hv = float(v)
-            except Exception:
-                continue
-            if hv > 0:
-                unavailable_hours[kd.isoformat()] = hv
-        calendar_unavailable_hours = {}
-        for k, v in (cfg.get("calendar_unavailable_hours", {}) or {}).items():
-            kd = _safe_date(k)
-            if kd is None:
-                continue
-            try:
-                hv = float(v)
-            except Exception:
-                continue
-            if hv > 0:
-                calendar_unavailable_hours[kd.isoformat()] = hv
-        start = _safe_date(cfg.get("start_date", date.today()))
-        settings_records[str(member)] = {
-            "weekdays": weekdays,
-            "leave_dates": leave_dates,
-            "start_date": date.today().isoformat() if start is None else start.isoformat(),
-            "unavailable_hours": unavailable_hours,
-            "calendar_unavailable_hours": calendar_unavailable_hours,
-        }
+    settings_records = {str(member): _serialize_member_settings(cfg) for member, cfg in ms.items()}
 
     ensure_calendar_sync_state()
     sync = st.session_state.get("calendar_sync", _default_calendar_sync_state())
@@ -937,75 +932,36 @@ def serialize_state_payload() -> dict:
         "team": team_records,
         "jobs_raw": jobs_records,
         "member_settings": settings_records,
+        "team_shutdowns": [[a.isoformat(), b.isoformat()] for a, b in get_team_shutdown_mask().ranges],
+        "estimate_ranges": normalize_estimate_ranges(st.session_state.get("estimate_ranges")),
+        "dependencies": normalize_dependencies(st.session_state.get("dependencies")),
+        "shared_jobs": normalize_shared_jobs(st.session_state.get("shared_jobs")),
         "calendar_sync": sync_record,
     }
 
+def reset_risk_widgets() -> None:
+    # The spread inputs and job ranges editor keep their own widget state, which would otherwise
+    # outlive a newly loaded plan and be written back over its ranges.
+    for k in ("risk_spread_low", "risk_spread_likely", "risk_spread_high"):
+        st.session_state.pop(k, None)
+    for k in [k for k in list(st.session_state.keys()) if str(k).startswith("risk_job_ranges_")]:
+        st.session_state.pop(k, None)
+
 def apply_state_payload(payload: dict) -> None:
     team_df = _normalize_team_df(pd.DataFrame(payload.get("team", DEFAULT_TEAM_ROWS)))
     st.session_state["team"] = team_df
 
-    jobs_df = pd.DataFrame(payload.get("jobs_raw", DEFAULT_JOBS_ROWS))
-    if "Due date" in jobs_df.columns:
-        jobs_df["Due date"] = pd.to_datetime(jobs_df["Due date"], errors="coerce").dt.date
-    st.session_state["jobs_raw"] = clean_jobs_df(jobs_df)
+    # Cloud and snapshot payloads are validated here once; the store only ever holds clean tables.
+    # Shares come first so the partitions are built with them applied.
+    st.session_state["shared_jobs"] = normalize_shared_jobs(payload.get("shared_jobs"))
+    set_jobs_table(pd.DataFrame(payload.get("jobs_raw", DEFAULT_JOBS_ROWS)))
 
     members = team_df["Member"].astype(str).tolist()
-    defaults = _default_member_settings(members)
-    incoming = payload.get("member_settings", {})
-    loaded = {}
-    if isinstance(incoming, dict):
-        for m in members:
-            cfg = incoming.get(m, {})
-            weekdays_raw = cfg.get("weekdays", [0, 1, 2, 3, 4])
-            weekdays = set()
-            for w in weekdays_raw:
-                try:
-                    wi = int(w)
-                except Exception:
-                    continue
-                if 0 <= wi <= 6:
-                    weekdays.add(wi)
-            if len(weekdays) == 0:
-                weekdays = {0, 1, 2, 3, 4}
-            leave_dates = []
-            for d in cfg.get("leave_dates", []):
-                parsed = _safe_date(d)
-                if parsed is not None:
-                    leave_dates.append(parsed)
-            unavailable_hours = {}
-            for kd, hv in (cfg.get("unavailable_hours", {}) or {}).items():
-                parsed = _safe_date(kd)
-                if parsed is None:
-                    continue
-                try:
-                    h = float(hv)
-                except Exception:
-                    continue
-                if h > 0:
-                    unavailable_hours[parsed] = h
-            calendar_unavailable_hours = {}
-            for kd, hv in (cfg.get("calendar_unavailable_hours", {}) or {}).items():
-                parsed = _safe_date(kd)
-                if parsed is None:
-                    continue
-                try:
-                    h = float(hv)
-                except Exception:
-                    continue
-                if h > 0:
-                    calendar_unavailable_hours[parsed] = h
-            start = _safe_date(cfg.get("start_date"))
-            loaded[m] = {
-                "weekdays": weekdays,
-                "leave_dates": leave_dates,
-                "start_date": date.today() if start is None else start,
-                "unavailable_hours": unavailable_hours,
-                "calendar_unavailable_hours": calendar_unavailable_hours,
-            }
-    for m in members:
-        if m not in loaded:
-            loaded[m] = defaults[m]
-    st.session_state["member_settings"] = loaded
+    st.session_state["member_settings"] = parse_member_settings(payload.get("member_settings", {}), members)
+    st.session_state["team_shutdowns"] = DateRangeMask(payload.get("team_shutdowns", [])).ranges
+    st.session_state["estimate_ranges"] = normalize_estimate_ranges(payload.get("estimate_ranges"))
+    reset_risk_widgets()
+    st.session_state["dependencies"] = normalize_dependencies(payload.get("dependencies"))
 
     ensure_calendar_sync_state()
     incoming_sync = payload.get("calendar_sync", {})
@@ -1013,6 +969,31 @@ def apply_state_payload(payload: dict) -> None:
         sync = st.session_state.get("calendar_sync", _default_calendar_sync_state())
         sync.update(_calendar_state_clean_for_save(incoming_sync))
         st.session_state["calendar_sync"] = sync
+    mark_state_changed()
+
+def _state_cache_path(state_id: str) -> Path:
+    safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in state_id)
+    return STATE_CACHE_DIR / f"{safe_id}.hrsnap"
+
+def write_local_state_cache(state_id: str, payload: dict) -> None:
+    try:
+        STATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _state_cache_path(state_id)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(encode_state_snapshot(payload))
+        tmp_path.replace(path)
+    except Exception:
+        # The cache only speeds up offline starts; failing to write it must not break editing.
+        pass
+
+def read_local_state_cache(state_id: str) -> tuple[dict | None, str]:
+    path = _state_cache_path(state_id)
+    if not path.exists():
+        return None, "No local cache found."
+    try:
+        return decode_state_snapshot(path.read_bytes()), f"Loaded local cache (dataset: {state_id})."
+    except Exception as exc:
+        return None, f"Local cache unreadable: {exc}"
 
 def fetch_state_from_cloud() -> tuple[dict | None, str]:
     url, key, ready = get_supabase_config()
@@ -1045,11 +1026,7 @@ def fetch_state_from_cloud() -> tuple[dict | None, str]:
     except Exception as exc:
         return None, f"Cloud load failed: {exc}"
 
-def save_state_to_cloud() -> tuple[bool, str]:
-    url, key, ready = get_supabase_config()
-    if not ready:
-        return False, "SUPABASE_URL or SUPABASE_ANON_KEY is missing in Streamlit secrets."
-    state_id = get_active_state_id()
+def post_state_payload(url: str, key: str, state_id: str, payload: dict) -> tuple[bool, str]:
     endpoint = f"{url}/rest/v1/{SUPABASE_STATE_TABLE}"
     headers = {
         "apikey": key,
@@ -1057,7 +1034,7 @@ def save_state_to_cloud() -> tuple[bool, str]:
         "Content-Type": "application/json",
         "Prefer": "resolution=merge-duplicates,return=representation",
     }
-    body = [{"id": state_id, "payload": serialize_state_payload()}]
+    body = [{"id": state_id, "payload": payload}]
     try:
         resp = requests.post(endpoint, headers=headers, json=body, timeout=12)
         if resp.status_code >= 400:
@@ -1066,26 +1043,228 @@ def save_state_to_cloud() -> tuple[bool, str]:
     except Exception as exc:
         return False, f"Cloud save failed: {exc}"
 
-def _graph_parse_datetime(dt_obj: dict | None) -> datetime | None:
-    if not isinstance(dt_obj, dict):
-        return None
-    dt_raw = str(dt_obj.get("dateTime", "")).strip()
-    if len(dt_raw) == 0:
-        return None
-    parsed = pd.to_datetime(dt_raw, errors="coerce")
-    if pd.isna(parsed):
-        return None
-    dt_val = parsed.to_pydatetime()
-    tz_raw = str(dt_obj.get("timeZone", "")).strip()
-    if dt_val.tzinfo is None:
-        if tz_raw:
+def save_state_to_cloud() -> tuple[bool, str]:
+    url, key, ready = get_supabase_config()
+    if not ready:
+        return False, "SUPABASE_URL or SUPABASE_ANON_KEY is missing in Streamlit secrets."
+    state_id = get_active_state_id()
+    payload = serialize_state_payload()
+    ok, msg = post_state_payload(url, key, state_id, payload)
+    if ok:
+        get_autosave_queue(url, key, get_autosave_debounce_seconds()).discard(state_id)
+        get_shared_dataset_cache().invalidate(state_id, payload)
+    return ok, msg
+
+class CloudAutosaveQueue:
+    # Write-behind saver shared by all sessions in this process. Each dataset keeps only its
+    # newest payload (a full-state save supersedes older ones), journaled to disk until the
+    # background worker has posted it successfully. on_saved(state_id, payload) runs after each
+    # successful post.
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        queue_dir: Path,
+        debounce_seconds: float,
+        on_saved: Callable[[str, dict], None] | None = None,
+    ):
+        self.url = url
+        self.key = key
+        self.queue_dir = queue_dir
+        self.debounce_seconds = max(float(debounce_seconds), 0.0)
+        self.on_saved = on_saved
+        self.last_flush_ms: float | None = None
+        self.last_flush_at: datetime | None = None
+        self.last_message = ""
+        self._pending: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.queue_dir.glob("*.json")):
             try:
-                dt_val = dt_val.replace(tzinfo=ZoneInfo(tz_raw))
+                entry = json.loads(path.read_text(encoding="utf-8"))
             except Exception:
-                dt_val = dt_val.replace(tzinfo=timezone.utc)
-        else:
-            dt_val = dt_val.replace(tzinfo=timezone.utc)
-    return dt_val.astimezone(timezone.utc)
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("payload"), dict):
+                state_id = str(entry.get("state_id", path.stem))
+                self._pending[state_id] = {"payload": entry["payload"], "due_at": time.monotonic(), "edits": 1, "attempts": 0}
+        self._thread = threading.Thread(target=self._run, name="cloud-autosave", daemon=True)
+        self._thread.start()
+        if self._pending:
+            self._wake.set()
+
+    def _journal_path(self, state_id: str) -> Path:
+        safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in state_id)
+        return self.queue_dir / f"{safe_id}.json"
+
+    def _write_journal(self, state_id: str, payload: dict) -> None:
+        path = self._journal_path(state_id)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"state_id": state_id, "payload": payload}), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def enqueue(self, state_id: str, payload: dict) -> None:
+        with self._lock:
+            self._write_journal(state_id, payload)
+            previous = self._pending.get(state_id, {})
+            self._pending[state_id] = {
+                "payload": payload,
+                "due_at": time.monotonic() + self.debounce_seconds,
+                "edits": int(previous.get("edits", 0)) + 1,
+                "attempts": int(previous.get("attempts", 0)),
+            }
+        self._wake.set()
+
+    def discard(self, state_id: str) -> None:
+        with self._lock:
+            self._pending.pop(state_id, None)
+            self._journal_path(state_id).unlink(missing_ok=True)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def pending_edits(self, state_id: str) -> int:
+        with self._lock:
+            return int(self._pending.get(state_id, {}).get("edits", 0))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                due_ids = [sid for sid, entry in self._pending.items() if entry["due_at"] <= now]
+                waits = [entry["due_at"] - now for entry in self._pending.values() if entry["due_at"] > now]
+            for state_id in due_ids:
+                self._flush(state_id)
+            if not due_ids:
+                self._wake.wait(timeout=min(waits) if waits else None)
+                self._wake.clear()
+
+    def _flush(self, state_id: str) -> None:
+        with self._lock:
+            entry = self._pending.get(state_id)
+            if entry is None:
+                return
+            payload = entry["payload"]
+        started = time.perf_counter()
+        ok, msg = post_state_payload(self.url, self.key, state_id, payload)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self.last_flush_ms = elapsed_ms
+            self.last_flush_at = _utc_now()
+            self.last_message = msg
+            current = self._pending.get(state_id)
+            if current is not None and current["payload"] is payload:
+                if ok:
+                    del self._pending[state_id]
+                    self._journal_path(state_id).unlink(missing_ok=True)
+                else:
+                    current["attempts"] = int(current.get("attempts", 0)) + 1
+                    current["due_at"] = time.monotonic() + min(2.0 ** current["attempts"], AUTOSAVE_MAX_RETRY_SECONDS)
+            # Otherwise a newer edit arrived while posting; it keeps its own debounce deadline.
+        if ok and self.on_saved is not None:
+            # Only a payload the cloud holds is handed to other sessions.
+            self.on_saved(state_id, payload)
+
+def get_autosave_debounce_seconds() -> float:
+    return max(_safe_float(st.secrets.get("AUTOSAVE_DEBOUNCE_SECONDS", AUTOSAVE_DEFAULT_DEBOUNCE_SECONDS), AUTOSAVE_DEFAULT_DEBOUNCE_SECONDS), 0.0)
+
+@st.cache_resource(show_spinner=False)
+def get_autosave_queue(url: str, key: str, debounce_seconds: float) -> CloudAutosaveQueue:
+    return CloudAutosaveQueue(url, key, AUTOSAVE_QUEUE_DIR, debounce_seconds, on_saved=get_shared_dataset_cache().invalidate)
+
+class SharedDatasetCache:
+    # Process-wide cache of the latest payload per dataset, the session state parsed from it and the
+    # member schedules built on it. Sessions adopt copies of the containers and share the read-only
+    # frames; any save replaces the dataset's entry so later sessions start from the saved payload.
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = max(float(ttl_seconds), 0.0)
+        self._entries: dict[str, dict] = {}
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def load_lock(self, state_id: str) -> threading.Lock:
+        # Sessions opening the same dataset at once wait for one download instead of each fetching it.
+        with self._lock:
+            return self._load_locks.setdefault(state_id, threading.Lock())
+
+    def entry(self, state_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(state_id)
+            if entry is not None and time.monotonic() - entry["loaded_at"] > self.ttl_seconds:
+                # Other processes may have saved since; refetch rather than serve a stale payload.
+                del self._entries[state_id]
+                entry = None
+            return entry
+
+    def publish(self, state_id: str, payload: dict) -> dict:
+        entry = {
+            "key": (state_id, _payload_digest(payload)),
+            "payload": payload,
+            "state": None,
+            "schedules": {},
+            "loaded_at": time.monotonic(),
+        }
+        with self._lock:
+            self._entries[state_id] = entry
+        return entry
+
+    def invalidate(self, state_id: str, payload: dict | None = None) -> None:
+        with self._lock:
+            self._entries.pop(state_id, None)
+        if payload is not None:
+            self.publish(state_id, payload)
+
+    def attach_state(self, entry: dict, state: dict) -> None:
+        with self._lock:
+            if entry["state"] is None:
+                entry["state"] = state
+
+    def member_schedule(self, entry: dict, key: tuple, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        with self._lock:
+            hit = entry["schedules"].get(key)
+        if hit is None:
+            built = build()
+            with self._lock:
+                hit = entry["schedules"].setdefault(key, built)
+        return hit
+
+    def peek_member_schedule(self, entry: dict, key: tuple) -> pd.DataFrame | None:
+        with self._lock:
+            return entry["schedules"].get(key)
+
+    def stats(self) -> tuple[int, int]:
+        with self._lock:
+            return len(self._entries), sum(len(e["schedules"]) for e in self._entries.values())
+
+@st.cache_resource(show_spinner=False)
+def get_shared_dataset_cache() -> SharedDatasetCache:
+    return SharedDatasetCache(SHARED_DATASET_TTL_SECONDS)
+
+def queue_autosave_if_changed() -> None:
+    state_id = get_active_state_id()
+    digest_key = f"autosave_digest_{state_id}"
+    # Serializing and hashing the whole plan is the expensive part; skip both while no partition
+    # version or state generation moved. The day is part of the signal because start dates follow it.
+    signal = (tuple(sorted(_jobs_store()["versions"].items())), int(st.session_state.get("state_generation", 0)), date.today())
+    signal_key = f"autosave_signal_{state_id}"
+    if digest_key in st.session_state and st.session_state.get(signal_key) == signal:
+        return
+    st.session_state[signal_key] = signal
+    payload = serialize_state_payload()
+    digest = _payload_digest(payload)
+    previous = st.session_state.get(digest_key)
+    st.session_state[digest_key] = digest
+    # The first digest after a load is the baseline; only later changes are queued.
+    if previous is None or previous == digest:
+        return
+    write_local_state_cache(state_id, payload)
+    if not bool(st.session_state.get("autosave_enabled", True)):
+        return
+    url, key, ready = get_supabase_config()
+    if not ready:
+        return
+    get_autosave_queue(url, key, get_autosave_debounce_seconds()).enqueue(state_id, payload)
 
 def _calendar_state_clean_for_save(sync: dict) -> dict:
     clean = _default_calendar_sync_state()
@@ -1108,6 +1287,19 @@ def _calendar_state_clean_for_save(sync: dict) -> dict:
     clean["oauth_state"] = str(sync.get("oauth_state", ""))
     clean["oauth_code_verifier"] = str(sync.get("oauth_code_verifier", ""))
     clean["oauth_created_at"] = "" if _safe_datetime(sync.get("oauth_created_at")) is None else _safe_datetime(sync.get("oauth_created_at")).isoformat()
+    windows = sync.get("delta_windows", {})
+    clean["delta_windows"] = {
+        str(k): {"end": str(v.get("end", "")), "link": str(v.get("link", ""))}
+        for k, v in (windows.items() if isinstance(windows, dict) else [])
+        if isinstance(v, dict)
+    }
+    applied_through = _safe_date(sync.get("delta_applied_through")) if sync.get("delta_applied_through") else None
+    clean["delta_applied_through"] = "" if applied_through is None else applied_through.isoformat()
+    clean["delta_member"] = str(sync.get("delta_member", ""))
+    clean["delta_basis"] = str(sync.get("delta_basis", ""))
+    clean["timezone"] = str(sync.get("timezone", ""))
+    cache = sync.get("event_cache", {})
+    clean["event_cache"] = {str(k): v for k, v in cache.items() if isinstance(v, dict)} if isinstance(cache, dict) else {}
     return clean
 
 def _code_challenge_s256(verifier: str) -> str:
@@ -1122,9 +1314,9 @@ def build_microsoft_authorize_url() -> tuple[str | None, str]:
         return None, "Set MS_CLIENT_ID and MS_REDIRECT_URI in Streamlit secrets to enable redirect login."
     ensure_calendar_sync_state()
     sync = st.session_state["calendar_sync"]
-    sync["provider"] = "microsoft"
-    sync["tenant_id"] = cfg["tenant_id"]
-    sync["client_id"] = cfg["client_id"]
+    update_state(sync, "provider", "microsoft")
+    update_state(sync, "tenant_id", cfg["tenant_id"])
+    update_state(sync, "client_id", cfg["client_id"])
     now = _utc_now()
     created = _safe_datetime(sync.get("oauth_created_at"))
     state_is_fresh = created is not None and created > now - timedelta(minutes=20)
@@ -1132,6 +1324,7 @@ def build_microsoft_authorize_url() -> tuple[str | None, str]:
         sync["oauth_state"] = pysecrets.token_urlsafe(24)
         sync["oauth_code_verifier"] = pysecrets.token_urlsafe(72)
         sync["oauth_created_at"] = now.isoformat()
+        mark_state_changed()
     use_pkce = len(cfg["client_secret"]) == 0
     params = {
         "client_id": cfg["client_id"],
@@ -1147,6 +1340,7 @@ def build_microsoft_authorize_url() -> tuple[str | None, str]:
             verifier = pysecrets.token_urlsafe(72)
             sync["oauth_code_verifier"] = verifier
             sync["oauth_created_at"] = now.isoformat()
+            mark_state_changed()
         params["code_challenge"] = _code_challenge_s256(verifier)
         params["code_challenge_method"] = "S256"
 
@@ -1166,6 +1360,7 @@ def _store_graph_tokens(token_data: dict, clear_oauth: bool = True) -> None:
         sync["oauth_code_verifier"] = ""
         sync["oauth_created_at"] = ""
     st.session_state["calendar_sync"] = sync
+    mark_state_changed()
 
 def _fetch_graph_identity(access_token: str) -> str:
     if len(access_token.strip()) == 0:
@@ -1255,6 +1450,7 @@ def process_microsoft_oauth_callback_if_present() -> None:
     if identity:
         sync2["linked_email"] = identity
         st.session_state["calendar_sync"] = sync2
+        mark_state_changed()
     st.session_state["calendar_sync_message"] = "Microsoft calendar linked."
     _clear_oauth_query_params()
 
@@ -1265,8 +1461,8 @@ def get_microsoft_access_token() -> tuple[str | None, str]:
 
     ensure_calendar_sync_state()
     sync = st.session_state["calendar_sync"]
-    sync["tenant_id"] = cfg["tenant_id"]
-    sync["client_id"] = cfg["client_id"]
+    update_state(sync, "tenant_id", cfg["tenant_id"])
+    update_state(sync, "client_id", cfg["client_id"])
     st.session_state["calendar_sync"] = sync
 
     now = _utc_now()
@@ -1297,75 +1493,11 @@ def get_microsoft_access_token() -> tuple[str | None, str]:
             if identity:
                 fresh_sync["linked_email"] = identity
                 st.session_state["calendar_sync"] = fresh_sync
+                mark_state_changed()
             return fresh_sync.get("access_token", ""), "Microsoft calendar linked."
 
     return None, "Calendar not linked yet. Click Link calander and sign in with Microsoft."
 
-def fetch_microsoft_calendar_events(access_token: str, start_dt: datetime, end_dt: datetime) -> tuple[list[dict] | None, str]:
-    start_iso = start_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    end_iso = end_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Prefer": 'outlook.timezone="UTC"',
-    }
-    params = {
-        "startDateTime": start_iso,
-        "endDateTime": end_iso,
-        "$select": "id,subject,start,end,isCancelled,showAs",
-    }
-    events: list[dict] = []
-    next_url = f"{MS_GRAPH_BASE_URL}/me/calendarView"
-    try:
-        while next_url:
-            if next_url.endswith("/calendarView"):
-                resp = requests.get(next_url, headers=headers, params=params, timeout=20)
-            else:
-                resp = requests.get(next_url, headers=headers, timeout=20)
-            data = resp.json()
-            if resp.status_code >= 400:
-                err = str(data.get("error", data))[:240]
-                return None, f"Calendar fetch failed ({resp.status_code}): {err}"
-            values = data.get("value", [])
-            if isinstance(values, list):
-                events.extend([v for v in values if isinstance(v, dict)])
-            next_url = data.get("@odata.nextLink")
-    except Exception as exc:
-        return None, f"Calendar fetch failed: {exc}"
-    return events, f"Fetched {len(events)} calendar events."
-
-def map_events_to_daily_unavailable(events: list[dict], start_day: date, end_day: date) -> tuple[dict[date, float], int]:
-    if end_day < start_day:
-        return {}, 0
-    range_start = datetime.combine(start_day, datetime.min.time(), tzinfo=timezone.utc)
-    range_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
-    totals: dict[date, float] = {}
-    counted_events = 0
-    for ev in events:
-        if bool(ev.get("isCancelled", False)):
-            continue
-        show_as = str(ev.get("showAs", "")).strip().lower()
-        if show_as == "free":
-            continue
-        st_dt = _graph_parse_datetime(ev.get("start"))
-        en_dt = _graph_parse_datetime(ev.get("end"))
-        if st_dt is None or en_dt is None or en_dt <= st_dt:
-            continue
-        st_dt = max(st_dt, range_start)
-        en_dt = min(en_dt, range_end)
-        if en_dt <= st_dt:
-            continue
-        counted_events += 1
-
-        cursor = st_dt
-        while cursor < en_dt:
-            day_boundary = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
-            segment_end = min(en_dt, day_boundary)
-            hrs = max((segment_end - cursor).total_seconds() / 3600.0, 0.0)
-            if hrs > 0:
-                totals[cursor.date()] = totals.get(cursor.date(), 0.0) + hrs
-            cursor = segment_end
-    return totals, counted_events
-
 def resolve_calendar_target_member(members: list[str]) -> str | None:
     if len(members) == 0:
         return None
@@ -1374,6 +1506,154 @@ def resolve_calendar_target_member(members: list[str]) -> str | None:
         return secret_pref
     return members[0]
 
+def get_calendar_member_mailboxes(members: list[str]) -> dict[str, str]:
+    raw = st.secrets.get("MS_CALENDAR_MEMBERS", {})
+    try:
+        mapping = {str(k).strip(): str(v).strip() for k, v in dict(raw).items()}
+    except Exception:
+        return {}
+    return {m: mapping[m] for m in members if mapping.get(m)}
+
+def get_microsoft_app_access_token() -> tuple[str | None, str]:
+    cfg = get_microsoft_calendar_config()
+    if not cfg["client_id"] or not cfg["client_secret"]:
+        return None, "Set MS_CLIENT_ID and MS_CLIENT_SECRET in Streamlit secrets to enable team calendar sync."
+    if cfg["tenant_id"].lower() in {"common", "organizations", "consumers"}:
+        return None, "Set MS_TENANT_ID to your directory tenant to enable team calendar sync."
+
+    cached = st.session_state.get("calendar_app_token", {})
+    cached_exp = _safe_datetime(cached.get("expires_at")) if isinstance(cached, dict) and cached.get("expires_at") else None
+    if cached_exp is not None and cached_exp > _utc_now() + timedelta(minutes=2) and cached.get("access_token"):
+        return str(cached["access_token"]), "Using existing Microsoft app token."
+
+    token_body = {
+        "client_id": cfg["client_id"],
+        "client_secret": cfg["client_secret"],
+        "grant_type": "client_credentials",
+        "scope": "https://graph.microsoft.com/.default",
+    }
+    try:
+        token_resp = requests.post(cfg["token_url"], data=token_body, timeout=15)
+        token_data = token_resp.json()
+    except Exception as exc:
+        return None, f"Team calendar token request failed: {exc}"
+    if token_resp.status_code >= 400 or not str(token_data.get("access_token", "")).strip():
+        err_desc = str(token_data.get("error_description", token_data))[:220]
+        return None, f"Team calendar token request failed ({token_resp.status_code}): {err_desc}"
+    expires_in = _safe_int(token_data.get("expires_in", 3600) or 3600, 3600)
+    st.session_state["calendar_app_token"] = {
+        "access_token": str(token_data["access_token"]),
+        "expires_at": (_utc_now() + timedelta(seconds=expires_in)).isoformat(),
+    }
+    return str(token_data["access_token"]), "Microsoft app token issued."
+
+def _fetch_member_calendar_hours(
+    access_token: str,
+    mailbox: str,
+    start_day: date,
+    end_day: date,
+    throttle: GraphThrottle,
+    tz: tzinfo,
+    work_window: list[str] | None,
+) -> tuple[dict[date, float] | None, list[tuple[datetime, datetime]], int, str]:
+    # Runs on a worker thread, so it must not touch st.session_state.
+    events, msg = fetch_microsoft_calendar_events_windowed(access_token, start_day, end_day, user_id=mailbox, throttle=throttle)
+    if events is None:
+        return None, [], 0, msg
+    totals, counted_events = map_events_to_daily_unavailable(events, start_day, end_day, tz=tz, work_window=work_window)
+    return totals, map_events_to_busy_spans(events, start_day, end_day, tz=tz), counted_events, msg
+
+def refresh_team_calendar_snapshots(
+    members: list[str],
+    horizon_days: int = MS_SNAPSHOT_HORIZON_DAYS,
+    on_progress: Callable[[int, int, str], None] | None = None,
+) -> tuple[bool, str, list[dict]]:
+    mailboxes = get_calendar_member_mailboxes(members)
+    if len(mailboxes) == 0:
+        return False, "Add MS_CALENDAR_MEMBERS (member = mailbox) to Streamlit secrets to enable team calendar sync.", []
+    access_token, token_msg = get_microsoft_app_access_token()
+    if access_token is None:
+        return False, token_msg, []
+
+    start_day = date.today()
+    end_day = start_day + timedelta(days=max(int(horizon_days), 1))
+    throttle = GraphThrottle()
+    max_workers = max(1, min(_safe_int(st.secrets.get("MS_BULK_MAX_WORKERS", MS_BULK_MAX_WORKERS), MS_BULK_MAX_WORKERS), MS_BULK_WORKERS_LIMIT, len(mailboxes)))
+
+    ms = st.session_state.get("member_settings", {})
+    tz, _ = get_calendar_timezone()
+    summary: list[dict] = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="calendar-sync") as pool:
+        futures = {
+            pool.submit(
+                _fetch_member_calendar_hours,
+                access_token,
+                mailbox,
+                start_day,
+                end_day,
+                throttle,
+                tz,
+                ms.get(member, {}).get("calendar_work_window"),
+            ): member
+            for member, mailbox in mailboxes.items()
+        }
+        for future in as_completed(futures):
+            member = futures[future]
+            try:
+                totals, busy, counted_events, msg = future.result()
+            except Exception as exc:
+                totals, busy, counted_events, msg = None, [], 0, f"Calendar fetch failed: {exc}"
+            if totals is not None:
+                cfg = ms.get(member, {})
+                cfg["calendar_unavailable_hours"] = {d: float(h) for d, h in totals.items() if float(h) > 0.0}
+                cfg["calendar_busy"] = busy
+                ms[member] = cfg
+            summary.append(
+                {
+                    "Member": member,
+                    "Mailbox": mailboxes[member],
+                    "Events": int(counted_events),
+                    "Unavailable hours": round(float(sum((totals or {}).values())), 1),
+                    "Status": "Updated" if totals is not None else msg,
+                }
+            )
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(futures), member)
+    st.session_state["member_settings"] = ms
+
+    ensure_calendar_sync_state()
+    sync = st.session_state["calendar_sync"]
+    if str(sync.get("delta_member", "")) in mailboxes:
+        # The delta cache no longer matches this member's stored hours; rebuild them on the next delta refresh.
+        sync["delta_applied_through"] = ""
+    sync["last_snapshot_at"] = _utc_now().isoformat()
+    sync["last_snapshot_member"] = ", ".join(sorted(mailboxes.keys()))
+    sync["last_snapshot_event_count"] = int(sum(row["Events"] for row in summary))
+    sync["last_snapshot_hours"] = float(sum(row["Unavailable hours"] for row in summary))
+    st.session_state["calendar_sync"] = sync
+    mark_state_changed()
+
+    summary = sorted(summary, key=lambda row: row["Member"])
+    updated = len([row for row in summary if row["Status"] == "Updated"])
+    return updated > 0, f"Team calendars refreshed: {updated} of {len(summary)} members updated over next {horizon_days} days.", summary
+
+def get_calendar_timezone() -> tuple[tzinfo, str]:
+    ensure_calendar_sync_state()
+    name = str(st.session_state["calendar_sync"].get("timezone", "")).strip()
+    if not name:
+        name = str(st.secrets.get("MS_CALENDAR_TIMEZONE", "UTC")).strip() or "UTC"
+    try:
+        return ZoneInfo(name), name
+    except Exception:
+        return timezone.utc, "UTC"
+
+def get_calendar_snapshot_horizon_days() -> int:
+    default = _safe_int(st.secrets.get("MS_SNAPSHOT_HORIZON_DAYS", MS_SNAPSHOT_HORIZON_DAYS), MS_SNAPSHOT_HORIZON_DAYS)
+    value = _safe_int(st.session_state.get("calendar_snapshot_horizon_days", default), default)
+    return max(1, min(value, MS_SNAPSHOT_MAX_HORIZON_DAYS))
+
 def refresh_microsoft_calendar_snapshot(target_member: str | None, horizon_days: int = MS_SNAPSHOT_HORIZON_DAYS) -> tuple[bool, str]:
     if target_member is None:
         return False, "No team member available for calendar sync."
@@ -1383,278 +1663,80 @@ def refresh_microsoft_calendar_snapshot(target_member: str | None, horizon_days:
 
     start_day = date.today()
     end_day = start_day + timedelta(days=max(int(horizon_days), 1))
-    start_dt = datetime.combine(start_day, datetime.min.time(), tzinfo=timezone.utc)
-    end_dt = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
 
-    events, fetch_msg = fetch_microsoft_calendar_events(access_token, start_dt, end_dt)
-    if events is None:
+    ensure_calendar_sync_state()
+    sync = st.session_state["calendar_sync"]
+    stored_windows = sync.get("delta_windows", {}) if isinstance(sync.get("delta_windows"), dict) else {}
+    tz, tz_name = get_calendar_timezone()
+    cached = sync.get("event_cache", {})
+    synced, fetch_msg = sync_calendar_windows(access_token, start_day, end_day, stored_windows, cached if isinstance(cached, dict) else {}, tz)
+    if synced is None:
         return False, fetch_msg
-    unavailable_by_day, counted_events = map_events_to_daily_unavailable(events, start_day, end_day)
+    cache = synced["cache"]
+    affected = synced["affected"]
 
     ms = st.session_state.get("member_settings", {})
     cfg = ms.get(target_member, {})
+    work_window = cfg.get("calendar_work_window") if parse_work_window(cfg.get("calendar_work_window")) else []
+    basis = f"{tz_name}|{','.join(work_window)}"
+    applied_through = _safe_date(sync.get("delta_applied_through")) if sync.get("delta_applied_through") else None
+    incremental = (
+        str(sync.get("delta_member", "")) == target_member
+        and str(sync.get("delta_basis", "")) == basis
+        and applied_through is not None
+    )
+    if incremental:
+        unavailable_by_day = {
+            d: h
+            for d, h in normalize_unavailable_hours(cfg.get("calendar_unavailable_hours", {}), 24.0).items()
+            if start_day <= d <= end_day
+        }
+        if applied_through < end_day:
+            affected |= {applied_through + timedelta(days=i) for i in range(1, (end_day - applied_through).days + 1)}
+        affected = {d for d in affected if start_day <= d <= end_day}
+        if affected:
+            lo, hi = min(affected), max(affected)
+            candidates = [ev for ev in cache.values() if _event_overlaps_days(ev, lo, hi, tz)]
+            totals, _ = map_events_to_daily_unavailable(candidates, lo, hi, tz=tz, work_window=work_window)
+            for d in affected:
+                if float(totals.get(d, 0.0)) > 0.0:
+                    unavailable_by_day[d] = float(totals[d])
+                else:
+                    unavailable_by_day.pop(d, None)
+    else:
+        unavailable_by_day, _ = map_events_to_daily_unavailable(list(cache.values()), start_day, end_day, tz=tz, work_window=work_window)
+    counted_events = sum(
+        1
+        for ev in cache.values()
+        if not bool(ev.get("isCancelled", False))
+        and str(ev.get("showAs", "")).strip().lower() != "free"
+        and _event_overlaps_days(ev, start_day, end_day, tz)
+    )
+
     cfg["calendar_unavailable_hours"] = {d: float(h) for d, h in unavailable_by_day.items() if float(h) > 0.0}
+    # Busy spans are cheap to rebuild from the whole event cache, so they skip the incremental path.
+    cfg["calendar_busy"] = map_events_to_busy_spans(list(cache.values()), start_day, end_day, tz=tz)
     ms[target_member] = cfg
     st.session_state["member_settings"] = ms
 
-    ensure_calendar_sync_state()
-    sync = st.session_state["calendar_sync"]
+    sync["delta_windows"] = synced["delta_windows"]
+    sync["delta_member"] = target_member
+    sync["delta_basis"] = basis
+    sync["delta_applied_through"] = end_day.isoformat()
+    sync["event_cache"] = cache
     sync["last_snapshot_at"] = _utc_now().isoformat()
     sync["last_snapshot_member"] = target_member
     sync["last_snapshot_event_count"] = counted_events
     sync["last_snapshot_hours"] = float(sum(unavailable_by_day.values()))
     st.session_state["calendar_sync"] = sync
+    mark_state_changed()
 
+    sync_kind = f"{synced['changes']} changes" if synced["full_windows"] == 0 else f"{synced['full_windows']} of {synced['windows']} windows fully synced"
     return True, (
-        f"Calendar snapshot refreshed for {target_member}: "
+        f"Calendar snapshot refreshed for {target_member} ({sync_kind}): "
         f"{counted_events} events, {float(sum(unavailable_by_day.values())):.1f}h unavailable over next {horizon_days} days."
     )
 
-def normalize_active_priorities(jobs: pd.DataFrame) -> pd.DataFrame:
-    if jobs.empty:
-        return jobs
-
-    jobs = jobs.copy()
-    jobs["Priority"] = pd.to_numeric(jobs["Priority"], errors="coerce").fillna(0).astype(int)
-
-    active = jobs[jobs["Priority"] >= 1].copy()
-    hold = jobs[jobs["Priority"] == 0].copy()
-
-    if not active.empty:
-        groups = []
-        for member, g in active.groupby("Assignee", dropna=False, sort=False):
-            g = g.copy()
-            g["_row_order"] = range(len(g))
-            ordered = []
-            for _, row in g.sort_values("_row_order").iterrows():
-                p = int(row["Priority"])
-                if p < 1:
-                    p = 1
-                idx = p - 1
-                if idx >= len(ordered):
-                    ordered.append(row)
-                else:
-                    ordered.insert(idx, row)
-            out = pd.DataFrame(ordered).reset_index(drop=True)
-            out["Priority"] = range(1, len(out) + 1)
-            out = out.drop(columns=["_row_order"], errors="ignore")
-            groups.append(out)
-        active = pd.concat(groups, ignore_index=True)
-
-    if not hold.empty:
-        hold = hold.reset_index(drop=True)
-
-    return pd.concat([active, hold], ignore_index=True)
-
-def _capacity_segments(capacity_days: list[tuple[date, float]]) -> tuple[list[tuple[int, date, float, float]], float]:
-    segments: list[tuple[int, date, float, float]] = []
-    running = 0.0
-    for day_idx, (d, cap) in enumerate(capacity_days):
-        cap_val = float(cap)
-        if cap_val <= 1e-9:
-            continue
-        seg_start = running
-        running = running + cap_val
-        segments.append((day_idx, d, seg_start, running))
-    return segments, running
-
-def schedule_member_jobs(
-    df_member_active: pd.DataFrame,
-    start_date: date,
-    daily_hours: float,
-    weekdays: set[int],
-    non_working_dates: set[date],
-    unavailable_hours: dict | None = None,
-) -> pd.DataFrame:
-    df = df_member_active.copy()
-    df = df.sort_values(["Priority", "Job name"], ascending=[True, True]).reset_index(drop=True)
-
-    capacity_days = build_capacity_days(
-        start_date,
-        weekdays,
-        non_working_dates,
-        daily_hours,
-        unavailable_hours=unavailable_hours,
-        horizon_days=3650,
-    )
-    if len(capacity_days) == 0:
-        raise ValueError("No working days available for this member calendar")
-    segments, total_capacity = _capacity_segments(capacity_days)
-    if total_capacity <= 1e-9 or len(segments) == 0:
-        raise ValueError("No project capacity available for this member calendar")
-    seg_ends = [seg_end for _, _, _, seg_end in segments]
-
-    start_hour_index = []
-    finish_hour_index = []
-    running = 0.0
-    for hrs in df["Required hours"].astype(float).tolist():
-        start_hour_index.append(running)
-        running = running + float(hrs)
-        finish_hour_index.append(running)
-
-    df["Start hour index"] = start_hour_index
-    df["Finish hour index"] = finish_hour_index
-
-    def hour_index_to_date(h: float) -> date:
-        if h < 0:
-            h = 0.0
-        if h >= total_capacity:
-            return segments[-1][1]
-        seg_pos = bisect_right(seg_ends, h)
-        if seg_pos >= len(segments):
-            seg_pos = len(segments) - 1
-        return segments[seg_pos][1]
-
-    def finish_hour_to_date(h: float) -> date:
-        eps = 1e-9
-        return hour_index_to_date(max(h - eps, 0.0))
-
-    df["Start date"] = [hour_index_to_date(h) for h in df["Start hour index"]]
-    df["Finish date"] = [finish_hour_to_date(h) for h in df["Finish hour index"]]
-    return df
-
-def allocate_member_hours(
-    schedule_df: pd.DataFrame,
-    start_date: date,
-    daily_hours: float,
-    weekdays: set[int],
-    non_working_dates: set[date],
-    horizon_workdays: int = 20,
-    unavailable_hours: dict | None = None,
-) -> pd.DataFrame:
-    capacity_days = build_capacity_days(
-        start_date,
-        weekdays,
-        non_working_dates,
-        daily_hours,
-        unavailable_hours=unavailable_hours,
-        horizon_days=3650,
-    )
-    capacity_days = capacity_days[:max(horizon_workdays, 1)]
-    alloc = pd.DataFrame({"Date": [d for d, _ in capacity_days]})
-    if len(capacity_days) == 0:
-        alloc["Allocated hours"] = []
-        alloc["Free hours"] = []
-        return alloc
-    capacity_vals = [float(c) for _, c in capacity_days]
-    alloc["Allocated hours"] = 0.0
-    segments, total_capacity = _capacity_segments(capacity_days)
-    seg_ends = [seg_end for _, _, _, seg_end in segments]
-
-    if schedule_df is None or schedule_df.empty:
-        alloc["Free hours"] = capacity_vals
-        return alloc
-
-    for _, row in schedule_df.iterrows():
-        if len(segments) == 0:
-            break
-        sh = float(row["Start hour index"])
-        fh = float(row["Finish hour index"])
-        if fh <= 0 or sh >= total_capacity:
-            continue
-        sh_clip = max(0.0, sh)
-        fh_clip = min(fh, total_capacity)
-        if fh_clip <= sh_clip:
-            continue
-
-        start_seg = bisect_right(seg_ends, sh_clip)
-        end_seg = bisect_right(seg_ends, max(fh_clip - 1e-9, 0.0))
-        if start_seg >= len(segments):
-            continue
-        if end_seg >= len(segments):
-            end_seg = len(segments) - 1
-
-        for seg_pos in range(start_seg, end_seg + 1):
-            day_idx, _, seg_start, seg_end = segments[seg_pos]
-            overlap = max(0.0, min(fh_clip, seg_end) - max(sh_clip, seg_start))
-            if overlap <= 0.0:
-                continue
-            alloc.loc[day_idx, "Allocated hours"] = float(alloc.loc[day_idx, "Allocated hours"]) + overlap
-
-    alloc["Free hours"] = (pd.Series(capacity_vals) - alloc["Allocated hours"]).clip(lower=0.0)
-    return alloc
-
-def build_day_job_details(
-    schedule_df: pd.DataFrame,
-    start_date: date,
-    daily_hours: float,
-    weekdays: set[int],
-    non_working_dates: set[date],
-    horizon_workdays: int = 20,
-    unavailable_hours: dict | None = None,
-) -> dict[date, list[str]]:
-    capacity_days = build_capacity_days(
-        start_date,
-        weekdays,
-        non_working_dates,
-        daily_hours,
-        unavailable_hours=unavailable_hours,
-        horizon_days=3650,
-    )
-    capacity_days = capacity_days[:max(horizon_workdays, 1)]
-    day_jobs = {d: [] for d, _ in capacity_days}
-
-    if schedule_df is None or schedule_df.empty:
-        return day_jobs
-
-    segments, total_capacity = _capacity_segments(capacity_days)
-    seg_ends = [seg_end for _, _, _, seg_end in segments]
-
-    for _, row in schedule_df.iterrows():
-        if len(segments) == 0:
-            break
-        sh = float(row["Start hour index"])
-        fh = float(row["Finish hour index"])
-        if fh <= 0 or sh >= total_capacity:
-            continue
-        sh_clip = max(0.0, sh)
-        fh_clip = min(fh, total_capacity)
-        if fh_clip <= sh_clip:
-            continue
-        start_seg = bisect_right(seg_ends, sh_clip)
-        end_seg = bisect_right(seg_ends, max(fh_clip - 1e-9, 0.0))
-        if start_seg >= len(segments):
-            continue
-        if end_seg >= len(segments):
-            end_seg = len(segments) - 1
-        job_name = str(row.get("Job name", "")).strip()
-        for seg_pos in range(start_seg, end_seg + 1):
-            _, seg_date, seg_start, seg_end = segments[seg_pos]
-            overlap = max(0.0, min(fh_clip, seg_end) - max(sh_clip, seg_start))
-            if overlap <= 0:
-                continue
-            name = job_name if job_name else "Unnamed job"
-            day_jobs[seg_date].append(f"{name} ({overlap:.1f}h)")
-    return day_jobs
-
-def ordinal_day(n: int) -> str:
-    if 10 <= n % 100 <= 20:
-        suffix = "th"
-    else:
-        suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
-    return f"{n}{suffix}"
-
-def month_start(d: date) -> date:
-    return date(d.year, d.month, 1)
-
-def add_months(d: date, months: int) -> date:
-    m = d.month - 1 + months
-    y = d.year + m // 12
-    m = m % 12 + 1
-    return date(y, m, 1)
-
-def month_end(d: date) -> date:
-    return add_months(month_start(d), 1) - timedelta(days=1)
-
-def due_cutoff_hours(due_date: date, capacity_days: list[tuple[date, float]]) -> float:
-    # Capacity available up to and including due_date, based on member calendar.
-    total = 0.0
-    for d, cap in capacity_days:
-        if d > due_date:
-            break
-        total += float(cap)
-    return total
-
 def ensure_member_settings(members: list[str]) -> None:
     if "member_settings" not in st.session_state:
         st.session_state["member_settings"] = {}
@@ -1663,65 +1745,615 @@ def ensure_member_settings(members: list[str]) -> None:
         if m not in ms:
             ms[m] = {
                 "weekdays": {0, 1, 2, 3, 4},
-                "leave_dates": [],
+                "leave_ranges": [],
                 "start_date": date.today(),
                 "unavailable_hours": {},
                 "calendar_unavailable_hours": {},
+                "calendar_work_window": [],
+                "unavailable_rules": [],
+                "hours_profile": {},
+                "sequencing": normalize_sequencing(None),
+                "calendar_busy": [],
+                "intraday": normalize_intraday(None),
             }
         if "weekdays" not in ms[m]:
             ms[m]["weekdays"] = {0, 1, 2, 3, 4}
-        if "leave_dates" not in ms[m]:
-            ms[m]["leave_dates"] = []
+        if "leave_ranges" not in ms[m] or "leave_dates" in ms[m]:
+            ms[m]["leave_ranges"] = member_leave_ranges(ms[m])
+            ms[m].pop("leave_dates", None)
         # Schedule start is always the current day.
         ms[m]["start_date"] = date.today()
         if "unavailable_hours" not in ms[m] or not isinstance(ms[m]["unavailable_hours"], dict):
             ms[m]["unavailable_hours"] = {}
         if "calendar_unavailable_hours" not in ms[m] or not isinstance(ms[m]["calendar_unavailable_hours"], dict):
             ms[m]["calendar_unavailable_hours"] = {}
+        if parse_work_window(ms[m].get("calendar_work_window")) is None:
+            ms[m]["calendar_work_window"] = []
+        if not isinstance(ms[m].get("unavailable_rules"), list):
+            ms[m]["unavailable_rules"] = []
+        if not isinstance(ms[m].get("hours_profile"), dict):
+            ms[m]["hours_profile"] = {}
+        ms[m]["sequencing"] = normalize_sequencing(ms[m].get("sequencing"))
+        if not isinstance(ms[m].get("calendar_busy"), list):
+            ms[m]["calendar_busy"] = []
+        ms[m]["intraday"] = normalize_intraday(ms[m].get("intraday"))
     for m in list(ms.keys()):
         if m not in members:
             del ms[m]
 
-def clean_jobs_df(df: pd.DataFrame) -> pd.DataFrame:
-    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
-        return pd.DataFrame(columns=JOB_COLS)
+def jobs_editor_view(df: pd.DataFrame) -> pd.DataFrame:
+    # Editors get plain dtypes so new assignees and rows can be typed in; their output is cleaned again.
+    out = df.astype({"Assignee": "object", "Notes": "object"})
+    out["Required hours"] = job_hours(df["Required hours"])
+    return out
 
-    df = df.copy()
-    for c in JOB_COLS:
-        if c not in df.columns:
-            df[c] = None
-    df = df[JOB_COLS]
+def _jobs_store() -> dict:
+    if "jobs_store" not in st.session_state:
+        st.session_state["jobs_store"] = {"partitions": {}, "versions": {}, "flat": None}
+    return st.session_state["jobs_store"]
+
+def _bump_jobs_partition(store: dict, member: str) -> None:
+    store["versions"][member] = int(store["versions"].get(member, 0)) + 1
+
+def jobs_partition_version(member: str) -> int:
+    return int(_jobs_store()["versions"].get(str(member), 0))
+
+def set_jobs_table(df: pd.DataFrame, validated: bool = False) -> None:
+    # Split a whole jobs table into per-assignee partitions; only partitions whose rows changed get a new version.
+    # Pass validated=True for a table that already went through clean_jobs_df and normalize_active_priorities.
+    jobs = df if validated else normalize_active_priorities(clean_jobs_df(df))
+    store = _jobs_store()
+    incoming = {}
+    if not jobs.empty:
+        incoming = {
+            str(member): apply_job_dtypes(part.reset_index(drop=True))
+            for member, part in jobs.groupby("Assignee", sort=False, observed=True)
+        }
+    shared_fixes = apply_job_shares(incoming, st.session_state.get("shared_jobs", {}))
+    incoming.update(shared_fixes)
+    for member in list(store["partitions"].keys()):
+        if member not in incoming:
+            del store["partitions"][member]
+            _bump_jobs_partition(store, member)
+    for member, part in incoming.items():
+        current = store["partitions"].get(member)
+        if current is None or not current.equals(part):
+            store["partitions"][member] = part
+            _bump_jobs_partition(store, member)
+    # Keep the caller's row order as the flat view so editors see the table they submitted, unless
+    # shared jobs rewrote some rows.
+    store["flat"] = None if shared_fixes else (tuple(sorted(store["versions"].items())), jobs)
+
+def replace_member_jobs(member: str, df: pd.DataFrame, validated: bool = False) -> None:
+    part = df if validated else clean_jobs_df(df)
+    if not part.empty:
+        part = part.assign(Assignee=str(member))
+    part = apply_job_dtypes(normalize_active_priorities(part).reset_index(drop=True))
+    store = _jobs_store()
+    # A shared job keeps this member's share of the hours whatever the edit set them to.
+    part = apply_job_shares({**store["partitions"], str(member): part}, st.session_state.get("shared_jobs", {}), [str(member)]).get(str(member), part)
+    current = store["partitions"].get(str(member))
+    if part.empty:
+        if current is not None:
+            del store["partitions"][str(member)]
+            _bump_jobs_partition(store, str(member))
+        return
+    if current is None or not current.equals(part):
+        store["partitions"][str(member)] = part
+        _bump_jobs_partition(store, str(member))
+
+def get_member_jobs(member: str) -> pd.DataFrame:
+    store = _jobs_store()
+    part = store["partitions"].get(str(member))
+    if part is None:
+        return empty_jobs_df()
+    if _shared_schedule_entry(member) is None:
+        return part
+    # The partition is still the frame other sessions of the dataset read: hand out a private copy,
+    # made once per session, so an in-place edit by a caller stays in this session.
+    copies = store.setdefault("copies", {})
+    hit = copies.get(str(member))
+    if hit is None or hit[0] is not part:
+        hit = (part, part.copy())
+        copies[str(member)] = hit
+    return hit[1]
+
+def member_capacity_key(member: str, daily_hours: float, start_date: date) -> str:
+    cfg = st.session_state["member_settings"][member]
+    basis = {
+        "settings": _serialize_member_settings(cfg),
+        "daily_hours": float(daily_hours),
+        "start": start_date.isoformat(),
+        "shutdowns": [[a.isoformat(), b.isoformat()] for a, b in get_team_shutdown_mask().ranges],
+    }
+    return _payload_digest(basis)
 
-    df = df.dropna(subset=["Job name", "Required hours", "Priority", "Assignee"], how="any")
-    df = df[df["Job name"].astype(str).str.len() > 0]
+def cached_member_schedule(
+    member: str,
+    kind: str,
+    capacity_key: str,
+    build: Callable[[], pd.DataFrame],
+) -> pd.DataFrame:
+    # Reuse a member's schedule until their job partition version or capacity inputs change.
+    linked = linked_member_schedule(member, kind, capacity_key)
+    if linked is not None:
+        return linked.copy()
+    cache = st.session_state.setdefault("member_schedule_cache", {})
+    key = (jobs_partition_version(member), capacity_key)
+    hit = cache.get((member, kind))
+    if hit is None or hit[0] != key:
+        hit = (key, shared_member_schedule(member, kind, capacity_key, build))
+        cache[(member, kind)] = hit
+    return hit[1].copy()
+
+def _shared_schedule_entry(member: str) -> dict | None:
+    # While this session still holds the shared partition object, every viewer of the dataset gets the same schedule.
+    entry = st.session_state.get("shared_dataset_entry")
+    if entry is None or entry["state"] is None:
+        return None
+    part = _jobs_store()["partitions"].get(str(member))
+    if part is None or entry["state"]["jobs_store"]["partitions"].get(str(member)) is not part:
+        return None
+    return entry
 
-    df["Required hours"] = pd.to_numeric(df["Required hours"], errors="coerce")
-    df = df[df["Required hours"] >= 0]
+def shared_member_schedule(
+    member: str,
+    kind: str,
+    capacity_key: str,
+    build: Callable[[], pd.DataFrame],
+) -> pd.DataFrame:
+    entry = _shared_schedule_entry(member)
+    if entry is None:
+        return build()
+    return get_shared_dataset_cache().member_schedule(entry, (str(member), kind, capacity_key), build)
+
+def get_schedule_workers() -> int:
+    # 1 keeps scheduling in the Streamlit process; 0 means one worker per CPU.
+    workers = _safe_int(st.secrets.get("SCHEDULE_WORKERS", SCHEDULE_DEFAULT_WORKERS), SCHEDULE_DEFAULT_WORKERS)
+    return (os.cpu_count() or 1) if workers == 0 else max(workers, 1)
+
+def dependency_plan(team_members: list[str], member_hours: dict) -> dict:
+    # Members whose jobs wait on each other are scheduled together; the plan is rebuilt when the links,
+    # the day, or any member's jobs or capacity change, and cached_member_schedule serves it.
+    links = st.session_state["dependencies"]
+    if not links:
+        st.session_state.pop("dependency_plan", None)
+        return {"key": None, "results": {}, "versions": {}, "capacity": {}, "frames": {}, "cycles": [], "critical": [], "unresolved": [], "edges": 0, "edge_list": []}
+    sdate = date.today()
+    daily = {m: float(member_hours.get(m, 8.0)) for m in team_members}
+    shared = st.session_state["shared_jobs"]
+    key = (plan_key(team_members, daily, sdate), _payload_digest(links), _payload_digest(shared))
+    cached = st.session_state.get("dependency_plan")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    names = {m: get_member_jobs(m)["Job name"].astype(str).tolist() for m in team_members}
+    edges, unresolved = dependency_edges(names, links, shared)
+    linked = sorted({e[0] for e in edges} | {e[2] for e in edges}, key=team_members.index)
+    tasks = [
+        member_schedule_task(m, st.session_state["member_settings"][m], daily[m], sdate, get_team_shutdown_mask(), job_arrays(get_member_jobs(m)))
+        for m in linked
+    ]
+    results, info = run_dependency_schedule(tasks, edges) if tasks else ({}, {"cycles": [], "critical": []})
+    critical = []
+    for m, row, how, finish in info["critical"]:
+        queue = results[m]["queues"].get("active")
+        starts = {} if queue is None else dict(zip(queue["order"].tolist(), queue["start"].tolist()))
+        critical.append(
+            {
+                "Member": m,
+                "Job name": names[m][row],
+                "Starts after": DEPENDENCY_START_LABELS[how],
+                "Start date": date.fromordinal(starts[row]) if row in starts else None,
+                "Finish date": date.fromordinal(finish),
+            }
+        )
+    plan = {
+        "key": key,
+        "results": results,
+        "versions": {m: jobs_partition_version(m) for m in linked},
+        "capacity": {m: member_capacity_key(m, daily[m], sdate) for m in linked},
+        "frames": {},
+        "cycles": [[f"{names[m][row]} ({m})" for m, row in cycle] for cycle in info["cycles"]],
+        "critical": critical,
+        "unresolved": unresolved,
+        "edges": len(edges),
+        "edge_list": edges,
+    }
+    st.session_state["dependency_plan"] = (key, plan, (team_members, member_hours))
+    return plan
 
-    df["Priority"] = pd.to_numeric(df["Priority"], errors="coerce").fillna(0).astype(int)
-    df["Assignee"] = df["Assignee"].astype(str)
+def linked_member_schedule(member: str, kind: str, capacity_key: str) -> pd.DataFrame | None:
+    # The dependency plan's schedule for a linked member, or None for members scheduled on their own.
+    cached = st.session_state.get("dependency_plan")
+    if cached is None or member not in cached[1]["results"]:
+        return None
+    plan = cached[1]
+    if plan["capacity"][member] != capacity_key or any(jobs_partition_version(m) != v for m, v in plan["versions"].items()):
+        # Jobs or capacity changed earlier in this run.
+        plan = dependency_plan(*cached[2])
+        if member not in plan["results"]:
+            return None
+    frame = plan["frames"].get((member, kind))
+    if frame is None:
+        result = plan["results"][member]
+        if result["error"]:
+            raise ValueError(result["error"])
+        member_jobs = get_member_jobs(member)
+        # Same frames as warm_member_schedules builds from pooled results.
+        source = add_status_columns(member_jobs) if kind == "all" else member_jobs
+        frame = scheduled_queue(source, kind, result["queues"].get(kind))
+        plan["frames"][(member, kind)] = frame
+    return frame
+
+def warm_member_schedules(team_members: list[str], member_hours: dict, kinds: tuple[str, ...]) -> None:
+    # Parallel mode: schedule every member whose cached schedule is stale in one pooled batch, so the
+    # per-member loops only read the cache. Calendar errors are left for those loops to report.
+    workers = get_schedule_workers()
+    if workers <= 1:
+        return
+    sdate = date.today()
+    cache = st.session_state.setdefault("member_schedule_cache", {})
+    shared_cache = get_shared_dataset_cache()
+    linked = dependency_plan(team_members, member_hours)["results"]
+    pending = []
+    for member in team_members:
+        if member in linked:
+            continue
+        daily_hours = float(member_hours.get(member, 8.0))
+        capacity_key = member_capacity_key(member, daily_hours, sdate)
+        key = (jobs_partition_version(member), capacity_key)
+        entry = _shared_schedule_entry(member)
+        stale = []
+        for kind in kinds:
+            hit = cache.get((member, kind))
+            if hit is not None and hit[0] == key:
+                continue
+            if entry is not None and shared_cache.peek_member_schedule(entry, (member, kind, capacity_key)) is not None:
+                continue
+            stale.append(kind)
+        member_jobs = get_member_jobs(member)
+        if stale and not member_jobs.empty:
+            pending.append((member, daily_hours, capacity_key, key, member_jobs, stale))
+    if not pending:
+        return
+    tasks = [
+        member_schedule_task(
+            member,
+            st.session_state["member_settings"][member],
+            daily_hours,
+            sdate,
+            get_team_shutdown_mask(),
+            job_arrays(member_jobs),
+            kinds=tuple(stale),
+        )
+        for member, daily_hours, _, _, member_jobs, stale in pending
+    ]
+    results = run_member_schedule_tasks(tasks, workers)
+    for member, _, capacity_key, key, member_jobs, stale in pending:
+        done = results[member]["queues"]
+        for kind in stale:
+            if kind not in done:
+                continue
+            # The Availability tab schedules its backlog queue from status-tagged jobs; match its frame.
+            source = add_status_columns(member_jobs) if kind == "all" else member_jobs
+            sched = scheduled_queue(source, kind, done[kind])
+            cache[(member, kind)] = (key, shared_member_schedule(member, kind, capacity_key, lambda sched=sched: sched))
+
+def scenario_baseline_outcomes(team_members: list[str], member_hours: dict) -> dict[str, dict]:
+    # Live-plan KPI contributions per member, rebuilt only when the member's jobs or capacity change.
+    cache = st.session_state.setdefault("scenario_baseline_cache", {})
+    sdate = date.today()
+    # A linked member's schedule also moves with the jobs and capacity of the members it is linked to.
+    plan = dependency_plan(team_members, member_hours)
+    out = {}
+    for member in team_members:
+        daily_hours = float(member_hours.get(member, 8.0))
+        capacity_key = member_capacity_key(member, daily_hours, sdate)
+        key = (jobs_partition_version(member), capacity_key, plan["key"] if member in plan["results"] else None)
+        hit = cache.get(member)
+        if hit is None or hit[0] != key:
+            member_jobs = get_member_jobs(member)
+            active = member_jobs[member_jobs["Priority"] >= 1]
+            calendar = member_capacity_calendar(member, daily_hours, sdate)
+            try:
+                sched = pd.DataFrame()
+                if not active.empty:
+                    sched = cached_member_schedule(
+                        member,
+                        "active",
+                        capacity_key,
+                        lambda: schedule_member_jobs(
+                            active,
+                            sdate,
+                            daily_hours,
+                            calendar.weekdays,
+                            calendar.leave,
+                            calendar=calendar,
+                            sequencing=st.session_state["member_settings"][member]["sequencing"],
+                        ),
+                    )
+                outcome = schedule_outcome(sched, member_due_deficit(sched, calendar)[0])
+            except ValueError as exc:
+                outcome = schedule_outcome(None, 0.0, str(exc))
+            hit = (key, outcome)
+            cache[member] = hit
+        out[member] = hit[1]
+    return out
+
+def evaluate_session_scenarios(names: list[str], team_members: list[str], member_hours: dict) -> dict[str, dict]:
+    # Scenario results are reused until the edits, the day, or a mentioned member's jobs or capacity
+    # change, or, with job links, the linked plan does.
+    scenarios = st.session_state.get("scenarios", {})
+    cache = st.session_state.setdefault("scenario_results", {})
+    sdate = date.today()
+    plan = dependency_plan(team_members, member_hours)
+    keys = {}
+    for name in names:
+        edits = scenarios.get(name, [])
+        mentioned = sorted({str(e.get(k)) for e in edits for k in ("member", "to") if str(e.get(k)) in st.session_state["member_settings"]})
+        keys[name] = (
+            json.dumps(edits, sort_keys=True, default=str),
+            sdate,
+            tuple((m, jobs_partition_version(m), member_capacity_key(m, float(member_hours.get(m, 8.0)), sdate)) for m in mentioned),
+            _payload_digest(st.session_state["shared_jobs"]),
+            plan["key"],
+        )
+    stale = [name for name in names if name not in cache or cache[name][0] != keys[name]]
+    if stale:
+        results = evaluate_scenarios(
+            {name: scenarios.get(name, []) for name in stale},
+            _jobs_store()["partitions"],
+            st.session_state["member_settings"],
+            {m: float(member_hours.get(m, 8.0)) for m in st.session_state["member_settings"]},
+            sdate,
+            get_team_shutdown_mask(),
+            get_schedule_workers(),
+            st.session_state["shared_jobs"],
+            st.session_state["dependencies"],
+        )
+        for name in stale:
+            cache[name] = (keys[name], results[name])
+    return {name: cache[name][1] for name in names}
 
-    df["Due date"] = pd.to_datetime(df["Due date"], errors="coerce").dt.date
-    df["Notes"] = df["Notes"].astype(str).replace("nan", "")
+def plan_key(team_members: list[str], daily: dict, sdate: date) -> tuple:
+    # Changes whenever a job partition, a member's capacity or the day changes.
+    return (
+        sdate,
+        tuple(sorted(_jobs_store()["versions"].items())),
+        tuple(member_capacity_key(m, daily[m], sdate) for m in team_members),
+    )
 
-    return df.reset_index(drop=True)
+def session_rebalance_proposals(team_members: list[str], member_hours: dict) -> dict:
+    sdate = date.today()
+    daily = {m: float(member_hours.get(m, 8.0)) for m in team_members}
+    key = (plan_key(team_members, daily, sdate), _payload_digest(st.session_state["shared_jobs"]))
+    cached = st.session_state.get("rebalance_proposals")
+    if cached is None or cached[0] != key:
+        result = propose_rebalance(
+            _jobs_store()["partitions"],
+            {m: st.session_state["member_settings"][m] for m in team_members},
+            daily,
+            sdate,
+            get_team_shutdown_mask(),
+            shared=st.session_state["shared_jobs"],
+        )
+        cached = (key, result)
+        st.session_state["rebalance_proposals"] = cached
+    return cached[1]
+
+def sequencing_policy_kpis(team_members: list[str], member_hours: dict, due_weight: float) -> pd.DataFrame:
+    # Outcomes per member and policy are cached, so a job edit only reschedules that member once per policy.
+    cache = st.session_state.setdefault("sequencing_compare_cache", {})
+    sdate = date.today()
+    daily = {m: float(member_hours.get(m, 8.0)) for m in team_members}
+    plan = dependency_plan(team_members, member_hours)
+    linked = set(plan["results"])
+    keys = {
+        m: (jobs_partition_version(m), member_capacity_key(m, daily[m], sdate), due_weight, plan["key"] if m in linked else None)
+        for m in team_members
+    }
+    stale = [m for m in team_members if m not in cache or cache[m][0] != keys[m]]
+    if linked & set(stale):
+        # Linked members are compared under each policy together, as the live plan schedules them.
+        stale = [m for m in team_members if m in stale or m in linked]
+    if stale:
+        fresh = sequencing_outcomes(
+            {m: get_member_jobs(m) for m in stale},
+            {m: st.session_state["member_settings"][m] for m in stale},
+            {m: daily[m] for m in stale},
+            sdate,
+            get_team_shutdown_mask(),
+            due_weight,
+            get_schedule_workers(),
+            plan["edge_list"],
+        )
+        for m in stale:
+            # Only the KPI inputs are kept, not the schedule frames.
+            cache[m] = (keys[m], {policy: {**fresh[policy][m], "sched": pd.DataFrame()} for policy in fresh})
+    in_use = [st.session_state["member_settings"][m]["sequencing"]["policy"] for m in team_members]
+    rows = []
+    for policy, label in SEQUENCING_POLICIES.items():
+        kpis = outcome_kpis({m: cache[m][1][policy] for m in team_members})
+        rows.append(
+            {
+                "Policy": label,
+                "Members using it": in_use.count(policy),
+                "Overtime needed (hrs)": kpis["overtime_needed_hours"],
+                "Members needing overtime": kpis["overtime_members"],
+                "On-time jobs %": kpis["on_time_pct"],
+                "On-time jobs": f"{kpis['on_time_jobs']} of {kpis['due_tracked_jobs']}",
+                "Last finish": kpis["last_finish"],
+            }
+        )
+    return pd.DataFrame(rows)
+
+def session_delivery_risk(team_members: list[str], member_hours: dict, samples: int, run: bool) -> dict | None:
+    # The last simulation while the plan and estimate ranges are unchanged; a new one only on request.
+    sdate = date.today()
+    daily = {m: float(member_hours.get(m, 8.0)) for m in team_members}
+    ranges = st.session_state["estimate_ranges"]
+    key = (plan_key(team_members, daily, sdate), _payload_digest(ranges), int(samples))
+    cached = st.session_state.get("delivery_risk")
+    if run:
+        result = simulate_delivery_risk(
+            _jobs_store()["partitions"],
+            {m: st.session_state["member_settings"][m] for m in team_members},
+            daily,
+            sdate,
+            get_team_shutdown_mask(),
+            ranges,
+            samples,
+        )
+        cached = (key, result)
+        st.session_state["delivery_risk"] = cached
+    return cached[1] if cached is not None and cached[0] == key else None
+
+def apply_job_moves(edits: list[dict], member_hours: dict) -> tuple[bool, str]:
+    # All-or-nothing: the overlay is built from the live partitions first, then every touched member's
+    # partition is swapped in the same run. If any move no longer applies, nothing is.
+    overlay = apply_scenario_edits(
+        _jobs_store()["partitions"],
+        st.session_state["member_settings"],
+        {m: float(member_hours.get(m, 8.0)) for m in st.session_state["member_settings"]},
+        edits,
+        st.session_state["shared_jobs"],
+    )
+    if overlay["skipped"]:
+        # The plan changed since the moves were proposed; drop the cached proposals so they are rebuilt.
+        st.session_state.pop("rebalance_proposals", None)
+        return False, (
+            f"No moves applied: {len(overlay['skipped'])} of {len(edits)} no longer match the plan. "
+            "The suggestions have been refreshed; review them and apply again."
+        )
+    # Moved parts of shared jobs carry their share along; swap the specs in before the partitions
+    # so each member's rows are fitted to the new holders.
+    st.session_state["shared_jobs"] = overlay["shared"]
+    mark_state_changed()
+    for member, part in overlay["jobs"].items():
+        replace_member_jobs(member, part, validated=True)
+    reset_job_editors()
+    return True, f"Applied {len(edits)} moves"
+
+def parse_share_text(text, members: list[str]) -> tuple[dict[str, float], list[str]]:
+    # "SL 2, LS 1" (or SL:2, SL=2h, SL 60%) into {member: value}; a bare member counts 1. Unknown
+    # members are returned separately.
+    shares: dict[str, float] = {}
+    unknown = []
+    for token in str(text if isinstance(text, str) else "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        match = re.fullmatch(r"(.+?)[\s:=]+([0-9]*\.?[0-9]+)\s*[h%]?", token)
+        member, value = (match.group(1).strip(), float(match.group(2))) if match else (token, 1.0)
+        if member in members:
+            shares[member] = shares.get(member, 0.0) + value
+        else:
+            unknown.append(member)
+    return shares, unknown
+
+def apply_shared_jobs(shared: dict) -> None:
+    # Swap in new share specs and rewrite the partitions they touch. Members dropped from a share lose
+    # their row of it; a job shared for the first time moves off its one current assignee if they are
+    # left out.
+    old = st.session_state["shared_jobs"]
+    partitions = _jobs_store()["partitions"]
+    holders: dict[str, list[str]] = {}
+    for member, part in partitions.items():
+        for name in set(part["Job name"].astype(str)) & set(shared):
+            holders.setdefault(name, []).append(member)
+    previous = {
+        name: list(old[name]["shares"]) if name in old else (holders.get(name, []) if len(holders.get(name, [])) == 1 else [])
+        for name in shared
+    }
+    st.session_state["shared_jobs"] = shared
+    mark_state_changed()
+    for member, part in apply_job_shares(partitions, shared, previous=previous).items():
+        replace_member_jobs(member, part, validated=True)
+    reset_job_editors()
+
+def get_jobs_table() -> pd.DataFrame:
+    # Flat view over all partitions, rebuilt only when a partition version changes. Treat as read-only.
+    store = _jobs_store()
+    key = tuple(sorted(store["versions"].items()))
+    if store["flat"] is not None and store["flat"][0] == key:
+        return store["flat"][1]
+    parts = list(store["partitions"].values())
+    if len(parts) == 0:
+        flat = empty_jobs_df()
+    else:
+        active = [p[p["Priority"] >= 1] for p in parts]
+        hold = [p[p["Priority"] == 0] for p in parts]
+        flat = apply_job_dtypes(pd.concat(active + hold, ignore_index=True))
+    store["flat"] = (key, flat)
+    return flat
+
+def adopt_shared_dataset(entry: dict) -> None:
+    # Copy-on-write handoff: containers are copied per session, job frames stay shared because the
+    # store replaces a partition on edit instead of mutating it.
+    state = entry["state"]
+    if state is None:
+        apply_state_payload(entry["payload"])
+        store = _jobs_store()
+        get_shared_dataset_cache().attach_state(
+            entry,
+            {
+                "team": st.session_state["team"].copy(),
+                "jobs_store": {"partitions": dict(store["partitions"]), "versions": dict(store["versions"])},
+                "member_settings": copy.deepcopy(st.session_state["member_settings"]),
+                "team_shutdowns": list(st.session_state["team_shutdowns"]),
+                "estimate_ranges": copy.deepcopy(st.session_state["estimate_ranges"]),
+                "dependencies": copy.deepcopy(st.session_state["dependencies"]),
+                "shared_jobs": copy.deepcopy(st.session_state["shared_jobs"]),
+                "calendar_sync": _calendar_state_clean_for_save(
+                    entry["payload"]["calendar_sync"] if isinstance(entry["payload"].get("calendar_sync"), dict) else {}
+                ),
+            },
+        )
+    else:
+        st.session_state["team"] = state["team"].copy()
+        store = state["jobs_store"]
+        # Each session builds its own flat view rather than share one frame with other sessions.
+        st.session_state["jobs_store"] = {"partitions": dict(store["partitions"]), "versions": dict(store["versions"]), "flat": None}
+        st.session_state["member_settings"] = copy.deepcopy(state["member_settings"])
+        st.session_state["team_shutdowns"] = list(state["team_shutdowns"])
+        st.session_state["estimate_ranges"] = copy.deepcopy(state["estimate_ranges"])
+        reset_risk_widgets()
+        st.session_state["dependencies"] = copy.deepcopy(state["dependencies"])
+        st.session_state["shared_jobs"] = copy.deepcopy(state["shared_jobs"])
+        ensure_calendar_sync_state()
+        st.session_state["calendar_sync"].update(copy.deepcopy(state["calendar_sync"]))
+        st.session_state.pop("member_schedule_cache", None)
+        mark_state_changed()
+    st.session_state["shared_dataset_entry"] = entry
 
 init_local_state_if_missing()
 cloud_load_key = f"cloud_load_attempted_{get_active_state_id()}"
 if cloud_load_key not in st.session_state:
     st.session_state[cloud_load_key] = True
-    payload, msg = fetch_state_from_cloud()
+    shared_cache = get_shared_dataset_cache()
+    state_id = get_active_state_id()
+    with shared_cache.load_lock(state_id):
+        shared_entry = shared_cache.entry(state_id)
+        if shared_entry is not None:
+            payload, msg = shared_entry["payload"], f"Shared snapshot reused (dataset: {state_id})."
+        else:
+            payload, msg = fetch_state_from_cloud()
+            if payload is None:
+                cached_payload, cache_msg = read_local_state_cache(state_id)
+                if cached_payload is not None:
+                    payload = cached_payload
+                    msg = f"{msg} {cache_msg}"
+            else:
+                write_local_state_cache(state_id, payload)
+                shared_entry = shared_cache.publish(state_id, payload)
     st.session_state["cloud_sync_message"] = msg
-    if payload is not None:
+    if shared_entry is not None:
+        adopt_shared_dataset(shared_entry)
+    elif payload is not None:
         apply_state_payload(payload)
 
 process_microsoft_oauth_callback_if_present()
 
-def add_status_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["Status"] = df["Priority"].apply(lambda p: "Active" if int(p) >= 1 else "On hold")
-    return df
-
 def style_schedule(df: pd.DataFrame):
     def apply_styles(data: pd.DataFrame):
         styles = pd.DataFrame("", index=data.index, columns=data.columns)
@@ -1736,9 +2368,9 @@ def style_schedule(df: pd.DataFrame):
 
         if "Due date" in data.columns and "Finish date" in data.columns:
             for i in data.index:
-                due = data.loc[i, "Due date"]
-                fin = data.loc[i, "Finish date"]
-                if pd.isna(due) or due is None or pd.isna(fin) or fin is None:
+                due = _safe_date(data.loc[i, "Due date"])
+                fin = _safe_date(data.loc[i, "Finish date"])
+                if due is None or fin is None:
                     continue
                 if fin < due:
                     styles.loc[i, "Due date"] = "background-color: rgba(46, 204, 113, 0.25);"
@@ -1881,6 +2513,49 @@ def render_leave_month_preview(anchor_month: date, leave_dates: set[date], unava
     html += "</tbody></table>"
     st.markdown("<div class='leave-mini'>" + html + "</div>", unsafe_allow_html=True)
 
+def reset_job_editors() -> None:
+    st.session_state.pop("jobs_editor", None)
+    staff_keys = [k for k in list(st.session_state.keys()) if str(k).startswith("member_jobs_editor_")]
+    for k in staff_keys:
+        st.session_state.pop(k, None)
+
+def editor_pending_changes(editor_key: str) -> int:
+    state = st.session_state.get(editor_key)
+    if not isinstance(state, dict):
+        return 0
+    return len(state.get("edited_rows", {})) + len(state.get("added_rows", [])) + len(state.get("deleted_rows", []))
+
+@st.fragment
+def render_batch_jobs_editor(
+    editor_key: str,
+    base_df: pd.DataFrame,
+    column_config: dict,
+    on_apply: Callable[[pd.DataFrame], None],
+) -> None:
+    # Edits rerun only this fragment; the app reschedules once when they are applied.
+    edited = st.data_editor(
+        base_df,
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config=column_config,
+        key=editor_key,
+    )
+    pending = editor_pending_changes(editor_key)
+    info_col, apply_col, discard_col = st.columns([2, 1, 1], gap="small")
+    with info_col:
+        st.caption(f"{pending} pending change{'s' if pending != 1 else ''}")
+    with apply_col:
+        if st.button("Apply", key=f"{editor_key}_apply", disabled=pending == 0, use_container_width=True):
+            on_apply(edited)
+            st.session_state.pop(editor_key, None)
+            st.rerun()
+    with discard_col:
+        if st.button("Discard", key=f"{editor_key}_discard", disabled=pending == 0, use_container_width=True):
+            st.session_state.pop(editor_key, None)
+            st.rerun(scope="fragment")
+
+
 with st.sidebar:
     st.subheader("Team")
 
@@ -1899,8 +2574,38 @@ with st.sidebar:
     st.markdown('</div>', unsafe_allow_html=True)
     team_df = team_df.dropna(subset=["Member", "Daily hours"], how="any")
     team_df = team_df[team_df["Member"].astype(str).str.len() > 0].reset_index(drop=True)
+    if not team_df.equals(st.session_state["team"]):
+        mark_state_changed()
     st.session_state["team"] = team_df
 
+    with st.expander("Team shutdowns", expanded=False):
+        shutdown_ranges = get_team_shutdown_mask().ranges
+        for shutdown_idx, (shutdown_start, shutdown_end) in enumerate(shutdown_ranges):
+            sd_l, sd_r = st.columns([3, 1], gap="small")
+            with sd_l:
+                label = shutdown_start.isoformat() if shutdown_start == shutdown_end else f"{shutdown_start.isoformat()} to {shutdown_end.isoformat()}"
+                st.caption(label)
+            with sd_r:
+                if st.button("Remove", key=f"shutdown_remove_{shutdown_idx}", use_container_width=True):
+                    st.session_state["team_shutdowns"] = shutdown_ranges[:shutdown_idx] + shutdown_ranges[shutdown_idx + 1:]
+                    mark_state_changed()
+                    st.rerun()
+        shutdown_pick = st.date_input("Shutdown dates", value=(date.today(), date.today()), key="team_shutdown_pick")
+        if st.button("Add shutdown", key="team_shutdown_add", use_container_width=True):
+            picked_range = list(shutdown_pick) if isinstance(shutdown_pick, (list, tuple)) else [shutdown_pick]
+            if len(picked_range) > 0:
+                st.session_state["team_shutdowns"] = DateRangeMask(shutdown_ranges + [(picked_range[0], picked_range[-1])]).ranges
+                mark_state_changed()
+                st.rerun()
+        st.caption("Shutdown days are non-working for every member.")
+
+    st.toggle(
+        "Batch job edits",
+        key="jobs_batch_edit",
+        on_change=reset_job_editors,
+        help="Collect job table edits and apply them in one go instead of rescheduling after every cell.",
+    )
+
     st.divider()
     st.subheader("Cloud sync")
     if st.button("Save to cloud", use_container_width=True):
@@ -1914,18 +2619,49 @@ with st.sidebar:
         payload, msg = fetch_state_from_cloud()
         st.session_state["cloud_sync_message"] = msg
         if payload is not None:
-            apply_state_payload(payload)
+            adopt_shared_dataset(get_shared_dataset_cache().publish(get_active_state_id(), payload))
+            st.session_state.pop(f"autosave_digest_{get_active_state_id()}", None)
             st.success(msg)
             st.rerun()
         else:
             st.info(msg)
     if "cloud_sync_message" in st.session_state:
         st.caption(f"Status: {st.session_state['cloud_sync_message']}")
+    shared_datasets, shared_schedules = get_shared_dataset_cache().stats()
+    st.caption(f"Shared cache: {shared_datasets} dataset{'s' if shared_datasets != 1 else ''}, {shared_schedules} schedules")
+    st.toggle("Autosave", value=True, key="autosave_enabled", help="Queue changes and save them in the background after a short pause.")
+    autosave_url, autosave_key, autosave_ready = get_supabase_config()
+    if autosave_ready and st.session_state.get("autosave_enabled", True):
+        autosave_queue = get_autosave_queue(autosave_url, autosave_key, get_autosave_debounce_seconds())
+        latency_text = "-" if autosave_queue.last_flush_ms is None else f"{autosave_queue.last_flush_ms:.0f} ms"
+        st.caption(
+            f"Autosave: {autosave_queue.depth()} queued, "
+            f"{autosave_queue.pending_edits(get_active_state_id())} pending edits, last flush {latency_text}"
+        )
+        if autosave_queue.last_message:
+            st.caption(f"Last autosave: {autosave_queue.last_message}")
+    if st.button("Prepare snapshot", key="snapshot_prepare", use_container_width=True):
+        # Encoding the whole plan is only worth it on the run where someone asks to download it.
+        st.download_button(
+            "Download snapshot",
+            data=encode_state_snapshot(serialize_state_payload()),
+            file_name=f"hydraulic_resourcing_{get_active_state_id()}.hrsnap",
+            mime="application/octet-stream",
+            use_container_width=True,
+        )
+    uploaded_snapshot = st.file_uploader("Import snapshot", type=["hrsnap", "json"], key="snapshot_upload")
+    if uploaded_snapshot is not None and st.session_state.get("snapshot_upload_applied") != uploaded_snapshot.file_id:
+        st.session_state["snapshot_upload_applied"] = uploaded_snapshot.file_id
+        try:
+            imported_payload = load_state_snapshot_bytes(uploaded_snapshot.getvalue())
+        except Exception as exc:
+            st.session_state["cloud_sync_message"] = f"Snapshot import failed: {exc}"
+        else:
+            apply_state_payload(imported_payload)
+            st.session_state["cloud_sync_message"] = f"Snapshot imported from {uploaded_snapshot.name}."
+            st.rerun()
     if st.button("Refresh outputs", key="refresh_outputs_btn_sidebar", use_container_width=True):
-        st.session_state.pop("jobs_editor", None)
-        staff_keys = [k for k in list(st.session_state.keys()) if str(k).startswith("member_jobs_editor_")]
-        for k in staff_keys:
-            st.session_state.pop(k, None)
+        reset_job_editors()
         st.rerun()
 
     st.divider()
@@ -1942,6 +2678,29 @@ with st.sidebar:
             key="calendar_sync_member_sidebar",
         )
 
+    st.number_input(
+        "Snapshot horizon (days)",
+        min_value=1,
+        max_value=MS_SNAPSHOT_MAX_HORIZON_DAYS,
+        step=30,
+        value=get_calendar_snapshot_horizon_days(),
+        key="calendar_snapshot_horizon_days",
+    )
+
+    _, current_tz_name = get_calendar_timezone()
+    tz_input = st.text_input(
+        "Calendar timezone",
+        value=current_tz_name,
+        help="IANA timezone name, for example Australia/Sydney. Meeting hours are split into days in this timezone.",
+    ).strip()
+    if tz_input and tz_input != current_tz_name:
+        try:
+            ZoneInfo(tz_input)
+            st.session_state["calendar_sync"]["timezone"] = tz_input
+            mark_state_changed()
+        except Exception:
+            st.caption(f"Unknown timezone: {tz_input}")
+
     auth_url, auth_msg = build_microsoft_authorize_url()
     if auth_url:
         st.link_button("Link calander", auth_url, use_container_width=True)
@@ -1950,7 +2709,7 @@ with st.sidebar:
         st.caption(auth_msg)
 
     if st.button("Refresh calander snapshot", key="refresh_calander_snapshot_btn_sidebar", use_container_width=True):
-        ok, msg = refresh_microsoft_calendar_snapshot(sync_member)
+        ok, msg = refresh_microsoft_calendar_snapshot(sync_member, horizon_days=get_calendar_snapshot_horizon_days())
         st.session_state["calendar_sync_message"] = msg
         if ok:
             st.success(msg)
@@ -1958,6 +2717,27 @@ with st.sidebar:
         else:
             st.error(msg)
 
+    if len(get_calendar_member_mailboxes(sidebar_members)) > 0:
+        if st.button("Refresh team calendars", key="refresh_team_calendars_btn_sidebar", use_container_width=True):
+            team_progress = st.progress(0.0, text="Fetching team calendars")
+
+            def _report_team_progress(done: int, total: int, member: str) -> None:
+                team_progress.progress(done / max(total, 1), text=f"{done}/{total} calendars fetched ({member})")
+
+            ok, msg, team_summary = refresh_team_calendar_snapshots(
+                sidebar_members,
+                horizon_days=get_calendar_snapshot_horizon_days(),
+                on_progress=_report_team_progress,
+            )
+            st.session_state["calendar_sync_message"] = msg
+            st.session_state["calendar_bulk_summary"] = team_summary
+            if ok:
+                st.rerun()
+            else:
+                st.error(msg)
+        if st.session_state.get("calendar_bulk_summary"):
+            st.dataframe(pd.DataFrame(st.session_state["calendar_bulk_summary"]), use_container_width=True, hide_index=True)
+
     ensure_calendar_sync_state()
     sync_state = st.session_state.get("calendar_sync", {})
     linked_email = str(sync_state.get("linked_email", "")).strip()
@@ -1980,15 +2760,16 @@ if len(team_members) == 0:
     st.stop()
 
 ensure_member_settings(team_members)
+dependency_plan(team_members, member_hours)
 
-tabs = st.tabs(["Team dashboard", "Staff pages", "Availability"])
+tabs = st.tabs(["Team dashboard", "Staff pages", "Availability", "What-if"])
 
 with tabs[0]:
     st.markdown('<div class="section-title">Team dashboard</div>', unsafe_allow_html=True)
     st.subheader("All jobs input")
     st.caption("Priority 1 or higher means active, Priority 0 means on hold")
 
-    preview_jobs = clean_jobs_df(st.session_state.get("jobs_raw", pd.DataFrame(columns=JOB_COLS)))
+    preview_jobs = get_jobs_table()
     active_count = int((preview_jobs["Priority"] >= 1).sum()) if not preview_jobs.empty else 0
     hold_count = int((preview_jobs["Priority"] == 0).sum()) if not preview_jobs.empty else 0
     total_count = int(len(preview_jobs))
@@ -2007,31 +2788,35 @@ with tabs[0]:
         ),
         unsafe_allow_html=True,
     )
-    jobs_input = st.data_editor(
-        st.session_state["jobs_raw"],
-        num_rows="dynamic",
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            "Job name": st.column_config.TextColumn(required=True),
-            "Required hours": st.column_config.NumberColumn(min_value=0.0, step=0.5, required=True),
-            "Priority": st.column_config.NumberColumn(min_value=0, step=1, required=True),
-            "Assignee": st.column_config.SelectboxColumn(options=team_members, required=True),
-            "Due date": st.column_config.DateColumn(required=False),
-            "Notes": st.column_config.TextColumn(required=False),
-        },
-        key="jobs_editor",
-    )
+    jobs_column_config = {
+        "Job name": st.column_config.TextColumn(required=True),
+        "Required hours": st.column_config.NumberColumn(min_value=0.0, step=0.5, required=True),
+        "Priority": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+        "Assignee": st.column_config.SelectboxColumn(options=team_members, required=True),
+        "Due date": st.column_config.DateColumn(required=False),
+        "Notes": st.column_config.TextColumn(required=False),
+    }
+    if st.session_state.get("jobs_batch_edit", False):
+        render_batch_jobs_editor("jobs_editor", jobs_editor_view(preview_jobs), jobs_column_config, set_jobs_table)
+    else:
+        jobs_input = st.data_editor(
+            jobs_editor_view(preview_jobs),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config=jobs_column_config,
+            key="jobs_editor",
+        )
+        # The stored table is already clean; only re-validate when the editor holds changes.
+        if editor_pending_changes("jobs_editor") > 0:
+            jobs_clean = clean_jobs_df(jobs_input)
+            jobs_norm = normalize_active_priorities(jobs_clean)
+            set_jobs_table(jobs_norm, validated=True)
+            if not _priority_signature(jobs_norm).equals(_priority_signature(jobs_clean)):
+                st.session_state.pop("jobs_editor", None)
+                st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
-    jobs_clean = clean_jobs_df(jobs_input)
-    jobs_norm = normalize_active_priorities(jobs_clean)
-    st.session_state["jobs_raw"] = jobs_norm
-    if not _priority_signature(jobs_norm).equals(_priority_signature(jobs_clean)):
-        st.session_state.pop("jobs_editor", None)
-        st.rerun()
-    jobs_norm = add_status_columns(jobs_norm)
-
     st.divider()
     st.subheader("Schedule output")
 
@@ -2040,30 +2825,26 @@ with tabs[0]:
     member_working_cfg = {}
     member_active_sched = {}
 
+    warm_member_schedules(team_members, member_hours, ("active",))
     for member in team_members:
         ms = st.session_state["member_settings"][member]
         weekdays = ms["weekdays"]
-        non_working = set(ms["leave_dates"])
+        non_working = DateRangeMask(ms["leave_ranges"])
         daily_hours = float(member_hours.get(member, 8.0))
         unavailable_hours = get_effective_unavailable_hours(ms, daily_hours)
+        unavailable_rules = ms.get("unavailable_rules", [])
         sdate = date.today()
         member_working_cfg[member] = {
-            "capacity_days": build_capacity_days(
-                sdate,
-                weekdays,
-                non_working,
-                daily_hours,
-                unavailable_hours=unavailable_hours,
-                horizon_days=3650,
-            ),
+            "calendar": member_capacity_calendar(member, daily_hours, sdate),
             "daily_hours": daily_hours,
             "weekdays": weekdays,
             "non_working": non_working,
             "unavailable_hours": unavailable_hours,
+            "unavailable_rules": unavailable_rules,
             "sdate": sdate,
         }
 
-        member_jobs = jobs_norm[jobs_norm["Assignee"] == member].copy()
+        member_jobs = get_member_jobs(member)
         if member_jobs.empty:
             continue
 
@@ -2075,13 +2856,21 @@ with tabs[0]:
         if active.empty:
             continue
 
-        sched = schedule_member_jobs(
-            active,
-            sdate,
-            daily_hours,
-            weekdays,
-            non_working,
-            unavailable_hours=unavailable_hours,
+        sched = cached_member_schedule(
+            member,
+            "active",
+            member_capacity_key(member, daily_hours, sdate),
+            lambda: schedule_member_jobs(
+                active,
+                sdate,
+                daily_hours,
+                weekdays,
+                non_working,
+                unavailable_hours=unavailable_hours,
+                unavailable_rules=unavailable_rules,
+                calendar=member_working_cfg[member]["calendar"],
+                sequencing=st.session_state["member_settings"][member]["sequencing"],
+            ),
         )
         sched["Assignee"] = member
         scheduled_all.append(sched)
@@ -2104,9 +2893,11 @@ with tabs[0]:
 
     if len(show_frames) == 0:
         st.info("No jobs to schedule yet")
+        queue_autosave_if_changed()
         st.stop()
 
     show = pd.concat(show_frames, ignore_index=True)
+    show["Due date"] = show["Due date"].dt.date
     show = show.sort_values(["Assignee","Status","Priority","Job name"], ascending=[True, True, True, True]).reset_index(drop=True)
 
     active_only = show[show["Status"] == "Active"].copy()
@@ -2118,72 +2909,23 @@ with tabs[0]:
         if sched_member is None or sched_member.empty:
             continue
         cfg = member_working_cfg.get(member, {})
-        capacity_days = cfg.get("capacity_days", [])
-        if not capacity_days:
-            continue
-
-        due_rows = sched_member.dropna(subset=["Due date"]).copy()
-        if due_rows.empty:
+        calendar = cfg.get("calendar")
+        if calendar is None:
             continue
 
-        member_max_deficit = 0.0
-        for _, row in due_rows.iterrows():
-            due = row.get("Due date")
-            cutoff = due_cutoff_hours(due, capacity_days)
-            finish_h = float(row.get("Finish hour index", 0.0))
-            deficit = max(0.0, finish_h - cutoff)
-            if deficit > member_max_deficit:
-                member_max_deficit = deficit
-            if deficit > 0.0:
-                overtime_due_dates.append(due)
-
+        member_max_deficit, late_due_dates = member_due_deficit(sched_member, calendar)
+        overtime_due_dates.extend(late_due_dates)
         overtime_needed_hours += member_max_deficit
         if member_max_deficit > 0.0:
             overtime_members.add(member)
 
     def compute_offset_capacity_until(cutoff_date: date) -> float:
-        total = 0.0
         # Use all team members except overloaded ones so idle capacity is counted.
         helper_members = [m for m in team_members if m not in overtime_members]
-        for member in helper_members:
-            cfg = member_working_cfg.get(member, {})
-            weekdays = cfg.get("weekdays", st.session_state["member_settings"][member]["weekdays"])
-            non_working = set(cfg.get("non_working", set(st.session_state["member_settings"][member]["leave_dates"])))
-            sdate = cfg.get("sdate", date.today())
-            daily_hours = float(cfg.get("daily_hours", member_hours.get(member, 8.0)))
-            unavailable_hours = cfg.get(
-                "unavailable_hours",
-                get_effective_unavailable_hours(st.session_state["member_settings"][member], daily_hours),
-            )
-            sched_member = member_active_sched.get(member, pd.DataFrame())
-
-            capacity_days = cfg.get("capacity_days")
-            if capacity_days is None:
-                capacity_days = build_capacity_days(
-                    sdate,
-                    weekdays,
-                    non_working,
-                    daily_hours,
-                    unavailable_hours=unavailable_hours,
-                    horizon_days=3650,
-                )
-            horizon_workdays = len([d for d, _ in capacity_days if d <= cutoff_date])
-            if horizon_workdays <= 0:
-                continue
-
-            alloc = allocate_member_hours(
-                sched_member,
-                sdate,
-                daily_hours,
-                weekdays,
-                non_working,
-                horizon_workdays=horizon_workdays,
-                unavailable_hours=unavailable_hours,
-            )
-            alloc = alloc[(alloc["Date"] >= date.today()) & (alloc["Date"] <= cutoff_date)].copy()
-            if not alloc.empty:
-                total += float(alloc["Free hours"].sum())
-        return total
+        return sum(
+            free_hours_until(member_active_sched.get(member), member_working_cfg[member]["calendar"], cutoff_date)
+            for member in helper_members
+        )
 
     offset_capacity_hours = 0.0
     offset_before_first_overtime_hours = 0.0
@@ -2191,32 +2933,22 @@ with tabs[0]:
         offset_capacity_hours = compute_offset_capacity_until(max(overtime_due_dates))
         offset_before_first_overtime_hours = compute_offset_capacity_until(min(overtime_due_dates))
 
-    due_tracked = active_only.dropna(subset=["Due date", "Finish date"]).copy() if not active_only.empty else pd.DataFrame()
-    if due_tracked.empty:
+    on_time_count, due_tracked_count = on_time_counts(collapse_shared_jobs(active_only, st.session_state["shared_jobs"]))
+    if due_tracked_count == 0:
         on_time_pct_text = "N/A"
         on_time_note = "Set due dates to track on-time %"
     else:
-        on_time_count = int((due_tracked["Finish date"] <= due_tracked["Due date"]).sum())
-        on_time_pct = (on_time_count / len(due_tracked)) * 100.0
+        on_time_pct = (on_time_count / due_tracked_count) * 100.0
         on_time_pct_text = f"{on_time_pct:.0f}%"
-        on_time_note = f"{on_time_count} of {len(due_tracked)} due-dated active jobs on time"
-
-    if overtime_needed_hours <= 0:
-        health_label = "Healthy"
-        health_note = "No overtime currently required"
-        dot_class = "dot-healthy"
-    elif overtime_needed_hours > offset_before_first_overtime_hours and overtime_needed_hours > offset_capacity_hours:
-        health_label = "Critical"
-        health_note = "Offset capacity is below overtime needed"
-        dot_class = "dot-critical"
-    elif overtime_needed_hours > offset_before_first_overtime_hours:
-        health_label = "Warning"
-        health_note = "Overtime required to achieve due dates; immediate rebalance needed"
-        dot_class = "dot-warning"
-    else:
-        health_label = "Early warning"
-        health_note = "Resource overload; consider reallocation"
-        dot_class = "dot-early"
+        on_time_note = f"{on_time_count} of {due_tracked_count} due-dated active jobs on time"
+
+    health_label, health_note = delivery_health(overtime_needed_hours, offset_before_first_overtime_hours, offset_capacity_hours)
+    dot_class = {
+        "Healthy": "dot-healthy",
+        "Critical": "dot-critical",
+        "Warning": "dot-warning",
+        "Early warning": "dot-early",
+    }[health_label]
 
     cols = st.columns([1,1,1,1,1])
     with cols[0]:
@@ -2261,6 +2993,263 @@ with tabs[0]:
     st.dataframe(style_schedule(show), use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+    with st.expander("Dependencies", expanded=bool(st.session_state["dependencies"])):
+        st.caption(
+            "A job can wait for other jobs to finish, on any member. Linked members are scheduled together: a job starts "
+            "after its member's earlier work and, for a predecessor on another member, on the working day after it finishes."
+        )
+        links = st.session_state["dependencies"]
+        job_names = sorted(set(get_jobs_table()["Job name"].astype(str)))
+        links_edited = st.data_editor(
+            pd.DataFrame({"Job": [l["job"] for l in links], "Waits for": [l["after"] for l in links]}, dtype=object),
+            use_container_width=True,
+            hide_index=True,
+            num_rows="dynamic",
+            column_config={
+                "Job": st.column_config.SelectboxColumn("Job", options=job_names),
+                "Waits for": st.column_config.SelectboxColumn("Waits for", options=job_names),
+            },
+            key=f"dependency_links_{_payload_digest(links)[:12]}",
+        )
+        edited_links = normalize_dependencies(
+            [{"job": job, "after": after} for job, after in zip(links_edited["Job"].tolist(), links_edited["Waits for"].tolist())]
+        )
+        if edited_links != links:
+            st.session_state["dependencies"] = edited_links
+            mark_state_changed()
+            st.rerun()
+        plan = dependency_plan(team_members, member_hours)
+        st.caption("Where a job name repeats, a job waits for the one with that name on its own member, else the only one on the team.")
+        for link in plan["unresolved"]:
+            st.warning(f"{link['job']} waits for {link['after']}, but no such pair of jobs is on the team; the link is ignored")
+        for cycle in plan["cycles"]:
+            st.warning(f"These jobs wait on each other, so their links among themselves are ignored: {', '.join(cycle)}")
+        if plan["critical"]:
+            st.markdown("**Critical path**: the chain of jobs that sets the last active finish among linked members.")
+            st.dataframe(pd.DataFrame(plan["critical"]), use_container_width=True, hide_index=True)
+
+    with st.expander("Shared jobs", expanded=bool(st.session_state["shared_jobs"])):
+        st.caption(
+            "A job worked on by several members. Each assignee gets a row of the job in their own queue holding "
+            "their share of the hours; the job is finished when the last share is."
+        )
+        shared = st.session_state["shared_jobs"]
+        mode_names = list(SHARE_MODES.values())
+        shares_edited = st.data_editor(
+            pd.DataFrame(
+                {
+                    "Job": list(shared),
+                    "Split": [SHARE_MODES[spec["mode"]] for spec in shared.values()],
+                    "Total hours": [np.nan if spec["hours"] is None else spec["hours"] for spec in shared.values()],
+                    "Shares": [", ".join(f"{m} {v:g}" for m, v in spec["shares"].items()) for spec in shared.values()],
+                }
+            ).astype({"Job": object, "Split": object, "Total hours": float, "Shares": object}),
+            use_container_width=True,
+            hide_index=True,
+            num_rows="dynamic",
+            column_config={
+                "Job": st.column_config.SelectboxColumn("Job", options=sorted(set(get_jobs_table()["Job name"].astype(str)))),
+                "Split": st.column_config.SelectboxColumn("Split", options=mode_names),
+                "Total hours": st.column_config.NumberColumn("Total hours", min_value=0.0, step=0.5, help="Proportional split only; blank keeps the job's current hours."),
+                "Shares": st.column_config.TextColumn("Shares", help="Proportional: weights, e.g. SL 2, LS 1. Fixed hours: each member's hours, e.g. SL 30, LS 10."),
+            },
+            key=f"shared_jobs_{_payload_digest(shared)[:12]}",
+        )
+        edited_shared = {}
+        for job, split, total, text in zip(shares_edited["Job"], shares_edited["Split"], shares_edited["Total hours"], shares_edited["Shares"]):
+            shares, unknown = parse_share_text(text, team_members)
+            if unknown:
+                st.warning(f"{job}: {', '.join(unknown)} not on the team")
+            if isinstance(job, str) and job:
+                mode = next((k for k, v in SHARE_MODES.items() if v == split), "proportional")
+                edited_shared[job] = {"mode": mode, "hours": None if pd.isna(total) else float(total), "shares": shares}
+        edited_shared = normalize_shared_jobs(edited_shared)
+        if edited_shared != shared:
+            apply_shared_jobs(edited_shared)
+            st.rerun()
+        summary = shared_job_rows(show, shared)
+        if not summary.empty:
+            st.dataframe(
+                summary[["Job name", "Assignee", "Status", "Required hours", "Start date", "Finish date", "Due date"]].rename(columns={"Assignee": "Assignees"}),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    with st.expander("Sequencing policy", expanded=False):
+        st.caption(
+            "How each member's active jobs are ordered. Priority order follows Priority only; earliest due date, "
+            "least slack and the weighted blend pull work with close due dates forward."
+        )
+        policy_names = list(SEQUENCING_POLICIES)
+        team_sequencing = [st.session_state["member_settings"][m]["sequencing"] for m in team_members]
+        first_sequencing = team_sequencing[0] if team_sequencing else normalize_sequencing(None)
+        # Seeded once; a default that followed the members' settings would reset the user's pick.
+        st.session_state.setdefault("team_sequencing_policy", first_sequencing["policy"])
+        st.session_state.setdefault("team_sequencing_weight", float(first_sequencing["due_weight"]))
+        sq_l, sq_r = st.columns(2, gap="small")
+        with sq_l:
+            team_policy = st.selectbox(
+                "Policy",
+                options=policy_names,
+                format_func=SEQUENCING_POLICIES.get,
+                key="team_sequencing_policy",
+            )
+        with sq_r:
+            team_due_weight = st.slider(
+                "Due-date weight (weighted blend)",
+                min_value=0.0,
+                max_value=1.0,
+                step=0.05,
+                key="team_sequencing_weight",
+                help="0 orders by Priority only, 1 by slack to the due date only.",
+            )
+        if any(seq != first_sequencing for seq in team_sequencing):
+            st.caption("Members use different policies; each member's policy is set on Staff pages.")
+        if st.toggle("Compare policies", key="sequencing_compare"):
+            st.dataframe(sequencing_policy_kpis(team_members, member_hours, float(team_due_weight)), use_container_width=True, hide_index=True)
+        if st.button("Use for every member", key="team_sequencing_apply", use_container_width=True):
+            for m in team_members:
+                st.session_state["member_settings"][m]["sequencing"] = {"policy": team_policy, "due_weight": float(team_due_weight)}
+                # Staff page widgets would otherwise write their old choice back.
+                st.session_state.pop(f"sequencing_policy_{m}", None)
+                st.session_state.pop(f"sequencing_weight_{m}", None)
+            mark_state_changed()
+            st.rerun()
+
+    if overtime_needed_hours > 0:
+        with st.expander("Rebalance suggestions", expanded=False):
+            rebalance = session_rebalance_proposals(team_members, member_hours)
+            proposals = rebalance["proposals"]
+            if st.session_state.get("rebalance_message"):
+                applied, apply_msg = st.session_state.pop("rebalance_message")
+                if applied:
+                    st.success(apply_msg)
+                else:
+                    st.warning(apply_msg)
+            if len(proposals) == 0:
+                st.info("No move reduces overtime: nobody has free hours before the late jobs are due")
+            else:
+                st.caption(
+                    f"Moving all {len(proposals)} jobs below cuts overtime from {rebalance['overtime_before']:.1f}h to "
+                    f"{rebalance['overtime_after']:.1f}h. Each saving assumes the moves above it are applied too."
+                )
+                review = pd.DataFrame(
+                    [
+                        {
+                            "Apply": True,
+                            "Job": p["job"],
+                            "From": p["member"],
+                            "To": p["to"],
+                            "Hours": p["hours"],
+                            "Split": "Yes" if p["op"] == "split_job" else "",
+                            "Priority on new assignee": "End of queue" if p["priority"] is None else str(p["priority"]),
+                            "Due date": p["due"],
+                            "Overtime saved (hrs)": p["overtime_saved"],
+                        }
+                        for p in proposals
+                    ]
+                )
+                reviewed = st.data_editor(
+                    review,
+                    use_container_width=True,
+                    hide_index=True,
+                    disabled=[c for c in review.columns if c != "Apply"],
+                    key=f"rebalance_review_{_payload_digest(rebalance_edits(proposals))[:12]}",
+                )
+                chosen = [p for p, keep in zip(proposals, reviewed["Apply"].tolist()) if keep]
+                rb_l, rb_r = st.columns(2, gap="small")
+                with rb_l:
+                    if st.button("Apply selected moves", key="rebalance_apply", use_container_width=True, disabled=len(chosen) == 0):
+                        applied, apply_msg = apply_job_moves(rebalance_edits(chosen), member_hours)
+                        st.session_state["rebalance_message"] = (applied, apply_msg)
+                        st.rerun()
+                with rb_r:
+                    if st.button("Open as what-if scenario", key="rebalance_scenario", use_container_width=True, disabled=len(chosen) == 0):
+                        scenarios = st.session_state.setdefault("scenarios", {})
+                        scenario_name = f"Rebalance {date.today().isoformat()}"
+                        scenarios[scenario_name] = rebalance_edits(chosen)
+                        st.session_state["scenario_selected"] = scenario_name
+                        st.session_state["rebalance_message"] = (True, f"Saved as {scenario_name} on the What-if tab")
+                        st.rerun()
+
+    with st.expander("Delivery risk", expanded=False):
+        st.caption(
+            "Required hours are single estimates. The simulation draws every active job's hours between a low and a high "
+            "estimate and shows how likely each due date is to hold."
+        )
+        ranges = st.session_state["estimate_ranges"]
+        rk_low, rk_likely, rk_high, rk_samples = st.columns(4, gap="small")
+        with rk_low:
+            spread_low = st.number_input("Low (x hours)", min_value=0.0, max_value=10.0, value=float(ranges["low"]), step=0.05, key="risk_spread_low")
+        with rk_likely:
+            spread_likely = st.number_input("Most likely (x hours)", min_value=0.0, max_value=10.0, value=float(ranges["likely"]), step=0.05, key="risk_spread_likely")
+        with rk_high:
+            spread_high = st.number_input("High (x hours)", min_value=0.0, max_value=10.0, value=float(ranges["high"]), step=0.05, key="risk_spread_high")
+        with rk_samples:
+            risk_samples = st.selectbox("Samples", RISK_SAMPLE_OPTIONS, index=RISK_SAMPLE_OPTIONS.index(RISK_DEFAULT_SAMPLES), key="risk_samples")
+
+        active_jobs = get_jobs_table()
+        active_jobs = active_jobs[active_jobs["Priority"] >= 1]
+        active_names = active_jobs["Job name"].astype(str).tolist()
+        job_ranges = ranges["jobs"]
+        ranges_view = pd.DataFrame(
+            {
+                "Job name": active_names,
+                "Assignee": active_jobs["Assignee"].astype(str).tolist(),
+                "Required hours": job_hours(active_jobs["Required hours"]),
+                "Low hours": [job_ranges[n][0] if n in job_ranges else np.nan for n in active_names],
+                "High hours": [job_ranges[n][1] if n in job_ranges else np.nan for n in active_names],
+            }
+        )
+        st.caption("Own ranges for jobs the spread does not fit; leave blank to use the spread. Applies to every job with that name.")
+        ranges_edited = st.data_editor(
+            ranges_view,
+            use_container_width=True,
+            hide_index=True,
+            disabled=["Job name", "Assignee", "Required hours"],
+            column_config={
+                "Low hours": st.column_config.NumberColumn("Low hours", min_value=0.0, step=0.5),
+                "High hours": st.column_config.NumberColumn("High hours", min_value=0.0, step=0.5),
+            },
+            key=f"risk_job_ranges_{_payload_digest(dict(_jobs_store()['versions']))[:12]}",
+        )
+        edited_ranges = {
+            name: [lo, hi]
+            for name, lo, hi in zip(ranges_edited["Job name"], ranges_edited["Low hours"], ranges_edited["High hours"])
+            if pd.notna(lo) and pd.notna(hi)
+        }
+        # Ranges for jobs not shown here (on hold or removed) are kept.
+        kept_ranges = {name: bounds for name, bounds in job_ranges.items() if name not in set(active_names)}
+        update_state(
+            st.session_state,
+            "estimate_ranges",
+            normalize_estimate_ranges({"low": spread_low, "likely": spread_likely, "high": spread_high, "jobs": {**kept_ranges, **edited_ranges}}),
+        )
+
+        run_risk = st.button("Run simulation", key="risk_run", use_container_width=True)
+        risk = session_delivery_risk(team_members, member_hours, risk_samples, run_risk)
+        if risk is None:
+            st.info("Run the simulation to see on-time chances for the current plan")
+        else:
+            summary = risk["summary"]
+            tracked = summary["due_tracked_jobs"]
+            rk_cols = st.columns(4)
+            with rk_cols[0]:
+                render_kpi("Expected on-time jobs", f"{summary['expected_on_time_jobs']:.1f} of {tracked}", f"Average over {summary['samples']} samples")
+            with rk_cols[1]:
+                render_kpi("On-time jobs % (P50)", "-" if tracked == 0 else f"{summary['on_time_pct_p50']:.1f}%", "Half the samples do at least this well")
+            with rk_cols[2]:
+                render_kpi("On-time jobs % (P10)", "-" if tracked == 0 else f"{summary['on_time_pct_p10']:.1f}%", "Nine samples in ten do at least this well")
+            with rk_cols[3]:
+                render_kpi("All due dates met", "-" if tracked == 0 else f"{summary['all_on_time_chance_pct']:.1f}%", "Chance every due-dated active job is on time")
+            for member, error in risk["errors"].items():
+                st.warning(f"{member}: {error}")
+            st.dataframe(
+                risk["jobs"].sort_values(["On-time chance %", "Due date"], na_position="last"),
+                use_container_width=True,
+                hide_index=True,
+            )
+
     st.divider()
     st.subheader("Export")
     csv_bytes = show.to_csv(index=False).encode("utf-8")
@@ -2274,7 +3263,7 @@ with tabs[1]:
 
     with left:
         st.write("Calendar")
-        st.session_state["member_settings"][selected_member]["start_date"] = date.today()
+        update_state(st.session_state["member_settings"][selected_member], "start_date", date.today())
 
         weekday_labels = [INT_TO_LABEL[i] for i in sorted(list(st.session_state["member_settings"][selected_member]["weekdays"]))]
         chosen = st.multiselect(
@@ -2283,7 +3272,120 @@ with tabs[1]:
             default=weekday_labels,
             key=f"weekdays_{selected_member}",
         )
-        st.session_state["member_settings"][selected_member]["weekdays"] = set(LABEL_TO_INT[x] for x in chosen)
+        update_state(st.session_state["member_settings"][selected_member], "weekdays", set(LABEL_TO_INT[x] for x in chosen))
+
+        hours_profile = normalize_hours_profile(st.session_state["member_settings"][selected_member].get("hours_profile"))
+        profile_modes = ["Daily hours", "Weekly pattern", "Fortnightly pattern"]
+        profile_mode = st.selectbox(
+            "Hours per day",
+            options=profile_modes,
+            index=0 if not hours_profile else (1 if len(hours_profile["hours"]) == 7 else 2),
+            key=f"hours_profile_mode_{selected_member}",
+            help="Patterns set hours for each weekday. A day set to 0 is non-working.",
+        )
+        if profile_mode == "Daily hours":
+            update_state(st.session_state["member_settings"][selected_member], "hours_profile", {})
+        else:
+            profile_days = 7 if profile_mode == "Weekly pattern" else 14
+            profile_hours = list(hours_profile.get("hours", []))
+            if len(profile_hours) != profile_days:
+                member_daily = float(member_hours.get(selected_member, 8.0))
+                week = [member_daily if i in st.session_state["member_settings"][selected_member]["weekdays"] else 0.0 for i in range(7)]
+                profile_hours = (profile_hours[:7] if len(profile_hours) == 7 else week) * (profile_days // 7)
+            profile_grid = pd.DataFrame(
+                [profile_hours[i:i + 7] for i in range(0, profile_days, 7)],
+                columns=[k for k, _ in WEEKDAY_MAP],
+                index=["Week 1", "Week 2"][:profile_days // 7],
+            )
+            edited_grid = st.data_editor(
+                profile_grid,
+                use_container_width=True,
+                column_config={k: st.column_config.NumberColumn(min_value=0.0, max_value=24.0, step=0.5) for k, _ in WEEKDAY_MAP},
+                key=f"hours_profile_editor_{selected_member}_{profile_days}",
+            )
+            profile_anchor = hours_profile.get("anchor", date.today() - timedelta(days=date.today().weekday()))
+            if profile_days == 14:
+                profile_anchor = st.date_input("Week 1 starts", value=profile_anchor, key=f"hours_profile_anchor_{selected_member}")
+            update_state(
+                st.session_state["member_settings"][selected_member],
+                "hours_profile",
+                normalize_hours_profile({"hours": edited_grid.fillna(0.0).to_numpy(dtype=float).ravel().tolist(), "anchor": profile_anchor}),
+            )
+
+        member_sequencing = st.session_state["member_settings"][selected_member]["sequencing"]
+        member_policy = st.selectbox(
+            "Job order",
+            options=list(SEQUENCING_POLICIES),
+            index=list(SEQUENCING_POLICIES).index(member_sequencing["policy"]),
+            format_func=SEQUENCING_POLICIES.get,
+            key=f"sequencing_policy_{selected_member}",
+            help="Priority order follows Priority only; the other policies pull work with close due dates forward.",
+        )
+        member_due_weight = member_sequencing["due_weight"]
+        if member_policy == "weighted":
+            member_due_weight = st.slider(
+                "Due-date weight",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(member_due_weight),
+                step=0.05,
+                key=f"sequencing_weight_{selected_member}",
+            )
+        update_state(st.session_state["member_settings"][selected_member], "sequencing", {"policy": member_policy, "due_weight": float(member_due_weight)})
+
+        work_window = parse_work_window(st.session_state["member_settings"][selected_member].get("calendar_work_window"))
+        limit_window = st.checkbox(
+            "Count meetings only inside working hours",
+            value=work_window is not None,
+            key=f"calendar_window_on_{selected_member}",
+        )
+        if limit_window:
+            win_l, win_r = st.columns(2, gap="small")
+            with win_l:
+                window_start = st.time_input(
+                    "From",
+                    value=(work_window[0] if work_window else datetime.strptime("08:00", "%H:%M")).time(),
+                    step=1800,
+                    key=f"calendar_window_start_{selected_member}",
+                )
+            with win_r:
+                window_end = st.time_input(
+                    "To",
+                    value=(work_window[1] if work_window else datetime.strptime("17:00", "%H:%M")).time(),
+                    step=1800,
+                    key=f"calendar_window_end_{selected_member}",
+                )
+            candidate_window = [window_start.strftime("%H:%M"), window_end.strftime("%H:%M")]
+            if parse_work_window(candidate_window) is None:
+                st.caption("Working hours must end after they start.")
+            else:
+                update_state(st.session_state["member_settings"][selected_member], "calendar_work_window", candidate_window)
+        else:
+            update_state(st.session_state["member_settings"][selected_member], "calendar_work_window", [])
+
+        member_intraday = st.session_state["member_settings"][selected_member]["intraday"]
+        intraday_on = st.checkbox(
+            "Schedule into time slots",
+            value=member_intraday["enabled"],
+            key=f"intraday_on_{selected_member}",
+            help="Plans work into the gaps between synced calendar events inside working hours (from 09:00 without them), skipping gaps shorter than the minimum block.",
+        )
+        min_block = member_intraday["min_block_hours"]
+        if intraday_on:
+            min_block = st.number_input(
+                "Minimum block (hours)",
+                min_value=0.25,
+                max_value=12.0,
+                value=float(min_block),
+                step=0.25,
+                key=f"intraday_block_{selected_member}",
+            )
+            busy_spans = st.session_state["member_settings"][selected_member].get("calendar_busy", [])
+            if busy_spans:
+                st.caption(f"{len(busy_spans)} busy calendar spans from the last sync shape the slots.")
+            else:
+                st.caption("No calendar events synced for this member yet; slots follow working hours only.")
+        update_state(st.session_state["member_settings"][selected_member], "intraday", normalize_intraday({"enabled": intraday_on, "min_block_hours": min_block}))
 
         st.caption("Leave dates and shutdown dates")
         st.markdown('<div class="table-shell" style="padding:6px;">', unsafe_allow_html=True)
@@ -2308,85 +3410,147 @@ with tabs[1]:
                 st.session_state[leave_month_key] = add_months(st.session_state[leave_month_key], 1)
                 st.rerun()
 
-        leave_set = set()
-        for d in st.session_state["member_settings"][selected_member]["leave_dates"]:
-            parsed = pd.to_datetime(d, errors="coerce")
-            if pd.notna(parsed):
-                leave_set.add(parsed.date())
-        manual_unavailable_map = {}
-        for kd, hv in (st.session_state["member_settings"][selected_member].get("unavailable_hours", {}) or {}).items():
-            parsed = pd.to_datetime(kd, errors="coerce")
-            if pd.isna(parsed):
-                continue
-            try:
-                hours_val = float(hv)
-            except Exception:
-                continue
-            if hours_val > 0:
-                manual_unavailable_map[parsed.date()] = hours_val
+        leave_mask = DateRangeMask(st.session_state["member_settings"][selected_member]["leave_ranges"])
+        preview_ords = np.arange(
+            st.session_state[leave_month_key].toordinal(),
+            month_end(st.session_state[leave_month_key]).toordinal() + 1,
+            dtype=np.int64,
+        )
+        leave_set = set(_ordinals_to_dates(preview_ords[leave_mask.contains(preview_ords)]))
+        shutdown_days = set(_ordinals_to_dates(preview_ords[get_team_shutdown_mask().contains(preview_ords)]))
+        manual_unavailable_map = _safe_date_hours(st.session_state["member_settings"][selected_member].get("unavailable_hours", {}))
         selected_daily_hours = float(member_hours.get(selected_member, 8.0))
         preview_unavailable_map = get_effective_unavailable_hours(
             st.session_state["member_settings"][selected_member],
             selected_daily_hours,
         )
+        member_rules = normalize_unavailable_rules(st.session_state["member_settings"][selected_member].get("unavailable_rules", []))
+        if member_rules:
+            preview_rule_hours = expand_unavailable_rules(member_rules, preview_ords)
+            for d, h in zip(_ordinals_to_dates(preview_ords), preview_rule_hours.tolist()):
+                if h > 0:
+                    preview_unavailable_map[d] = min(selected_daily_hours, float(preview_unavailable_map.get(d, 0.0)) + h)
 
-        render_leave_month_preview(st.session_state[leave_month_key], leave_set, unavailable_hours=preview_unavailable_map)
+        render_leave_month_preview(st.session_state[leave_month_key], leave_set | shutdown_days, unavailable_hours=preview_unavailable_map)
 
-        pick_key = f"leave_pick_{selected_member}"
+        pick_key = f"leave_range_pick_{selected_member}"
         if pick_key not in st.session_state:
-            st.session_state[pick_key] = date.today()
-        picked = st.date_input("Select day to update", value=st.session_state[pick_key], key=pick_key)
-        picked_date = pd.to_datetime(picked, errors="coerce").date()
+            st.session_state[pick_key] = (date.today(), date.today())
+        picked = st.date_input("Select days to update", value=st.session_state[pick_key], key=pick_key)
+        picked_days = [d for d in _safe_dates(list(picked) if isinstance(picked, (list, tuple)) else [picked]) if d is not None]
+        picked_start = picked_days[0] if picked_days else date.today()
+        picked_end = picked_days[-1] if picked_days else picked_start
+        picked_range = [picked_start + timedelta(days=i) for i in range((picked_end - picked_start).days + 1)]
         unavail_hours = st.number_input(
-            "Unavailable hours for selected day",
+            "Unavailable hours for each selected day",
             min_value=0.0,
             max_value=24.0,
             step=0.5,
-            value=float(manual_unavailable_map.get(picked_date, 0.0)),
+            value=float(manual_unavailable_map.get(picked_start, 0.0)),
             key=f"unavail_hours_input_{selected_member}",
         )
         act1, act2, act3 = st.columns(3, gap="small")
         with act1:
             if st.button("Mark non-working", key=f"leave_mark_off_{selected_member}", use_container_width=True):
-                leave_set.add(picked_date)
-                if picked_date in manual_unavailable_map:
-                    del manual_unavailable_map[picked_date]
-                st.session_state["member_settings"][selected_member]["leave_dates"] = sorted(list(leave_set))
+                for d in picked_range:
+                    manual_unavailable_map.pop(d, None)
+                st.session_state["member_settings"][selected_member]["leave_ranges"] = leave_mask.with_range(picked_start, picked_end)
                 st.session_state["member_settings"][selected_member]["unavailable_hours"] = manual_unavailable_map
+                mark_state_changed()
                 st.rerun()
         with act2:
             if st.button("Mark working", key=f"leave_mark_on_{selected_member}", use_container_width=True):
-                if picked_date in leave_set:
-                    leave_set.remove(picked_date)
-                if picked_date in manual_unavailable_map:
-                    del manual_unavailable_map[picked_date]
-                st.session_state["member_settings"][selected_member]["leave_dates"] = sorted(list(leave_set))
+                for d in picked_range:
+                    manual_unavailable_map.pop(d, None)
+                st.session_state["member_settings"][selected_member]["leave_ranges"] = leave_mask.without_range(picked_start, picked_end)
                 st.session_state["member_settings"][selected_member]["unavailable_hours"] = manual_unavailable_map
+                mark_state_changed()
                 st.rerun()
         with act3:
             if st.button("Mark unavailable", key=f"leave_mark_unavailable_{selected_member}", use_container_width=True):
-                if picked_date in leave_set:
-                    leave_set.remove(picked_date)
-                if float(unavail_hours) <= 0:
-                    if picked_date in manual_unavailable_map:
-                        del manual_unavailable_map[picked_date]
-                else:
-                    manual_unavailable_map[picked_date] = float(unavail_hours)
-                st.session_state["member_settings"][selected_member]["leave_dates"] = sorted(list(leave_set))
+                for d in picked_range:
+                    if float(unavail_hours) <= 0:
+                        manual_unavailable_map.pop(d, None)
+                    else:
+                        manual_unavailable_map[d] = float(unavail_hours)
+                st.session_state["member_settings"][selected_member]["leave_ranges"] = leave_mask.without_range(picked_start, picked_end)
                 st.session_state["member_settings"][selected_member]["unavailable_hours"] = manual_unavailable_map
+                mark_state_changed()
                 st.rerun()
 
-        st.caption("Use buttons to mark full non-working days, clear to working, or set partial unavailable hours.")
+        if len(leave_mask) > 0:
+            with st.expander(f"Leave ranges ({len(leave_mask)})", expanded=False):
+                for leave_idx, (leave_start, leave_end) in enumerate(leave_mask.ranges):
+                    lv_l, lv_r = st.columns([4, 1], gap="small")
+                    with lv_l:
+                        leave_days = (leave_end - leave_start).days + 1
+                        st.caption(f"{leave_start.isoformat()} to {leave_end.isoformat()} ({leave_days} day{'s' if leave_days != 1 else ''})")
+                    with lv_r:
+                        if st.button("Remove", key=f"leave_remove_{selected_member}_{leave_idx}", use_container_width=True):
+                            st.session_state["member_settings"][selected_member]["leave_ranges"] = leave_mask.without_range(leave_start, leave_end)
+                            mark_state_changed()
+                            st.rerun()
+
+        st.caption("Pick one day or a range, then mark it non-working, clear it to working, or set partial unavailable hours.")
+
+        with st.expander("Recurring unavailability", expanded=bool(member_rules)):
+            for rule_idx, rule in enumerate(member_rules):
+                rule_l, rule_r = st.columns([4, 1], gap="small")
+                with rule_l:
+                    st.caption(describe_unavailable_rule(rule))
+                with rule_r:
+                    if st.button("Remove", key=f"rule_remove_{selected_member}_{rule_idx}", use_container_width=True):
+                        member_rules.pop(rule_idx)
+                        st.session_state["member_settings"][selected_member]["unavailable_rules"] = member_rules
+                        mark_state_changed()
+                        st.rerun()
+            rule_freq = st.radio("Repeats", options=["Weekly", "Monthly"], horizontal=True, key=f"rule_freq_{selected_member}")
+            rule_c1, rule_c2 = st.columns(2, gap="small")
+            with rule_c1:
+                rule_interval = st.number_input("Every", min_value=1, max_value=52, value=1, step=1, key=f"rule_interval_{selected_member}")
+                if rule_freq == "Weekly":
+                    rule_weekday = st.selectbox("Weekday", options=[k for k, _ in WEEKDAY_MAP], index=4, key=f"rule_weekday_{selected_member}")
+                else:
+                    rule_day = st.number_input(
+                        "Day of month",
+                        min_value=1,
+                        max_value=31,
+                        value=1,
+                        step=1,
+                        key=f"rule_day_{selected_member}",
+                        help="Days past the end of a short month fall on its last day.",
+                    )
+            with rule_c2:
+                rule_hours = st.number_input("Hours", min_value=0.5, max_value=24.0, value=4.0, step=0.5, key=f"rule_hours_{selected_member}")
+                rule_start = st.date_input("From", value=date.today(), key=f"rule_start_{selected_member}")
+            rule_has_end = st.checkbox("Ends", value=False, key=f"rule_has_end_{selected_member}")
+            rule_end = st.date_input("Until", value=add_months(date.today(), 3), key=f"rule_end_{selected_member}") if rule_has_end else None
+            if st.button("Add rule", key=f"rule_add_{selected_member}", use_container_width=True):
+                new_rule = {
+                    "freq": rule_freq.lower(),
+                    "interval": int(rule_interval),
+                    "hours": float(rule_hours),
+                    "start": rule_start,
+                    "end": rule_end,
+                }
+                if rule_freq == "Weekly":
+                    new_rule["weekday"] = LABEL_TO_INT[rule_weekday]
+                else:
+                    new_rule["day"] = int(rule_day)
+                added = normalize_unavailable_rules([new_rule])
+                if not added:
+                    st.caption("Rule end must be on or after its start.")
+                else:
+                    st.session_state["member_settings"][selected_member]["unavailable_rules"] = member_rules + added
+                    mark_state_changed()
+                    st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
     with right:
         st.write("Jobs for selected staff member")
 
-        jobs_all = clean_jobs_df(st.session_state.get("jobs_raw", pd.DataFrame(columns=JOB_COLS)))
-        member_jobs = jobs_all[jobs_all["Assignee"] == selected_member].copy()
-        if member_jobs.empty:
-            member_jobs = pd.DataFrame(columns=JOB_COLS)
+        member_jobs = get_member_jobs(selected_member)
         active_count_staff = int((member_jobs["Priority"] >= 1).sum()) if not member_jobs.empty else 0
         hold_count_staff = int((member_jobs["Priority"] == 0).sum()) if not member_jobs.empty else 0
         total_count_staff = int(len(member_jobs))
@@ -2406,50 +3570,55 @@ with tabs[1]:
             ),
             unsafe_allow_html=True,
         )
-        edited = st.data_editor(
-            member_jobs,
-            num_rows="dynamic",
-            use_container_width=True,
-            hide_index=True,
-            column_config={
-                "Job name": st.column_config.TextColumn(required=True),
-                "Required hours": st.column_config.NumberColumn(min_value=0.0, step=0.5, required=True),
-                "Priority": st.column_config.NumberColumn(min_value=0, step=1, required=True),
-                "Assignee": st.column_config.SelectboxColumn(options=[selected_member], required=True),
-                "Due date": st.column_config.DateColumn(required=False),
-                "Notes": st.column_config.TextColumn(required=False),
-            },
-            key=editor_key,
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
+        staff_column_config = {
+            "Job name": st.column_config.TextColumn(required=True),
+            "Required hours": st.column_config.NumberColumn(min_value=0.0, step=0.5, required=True),
+            "Priority": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+            "Assignee": st.column_config.SelectboxColumn(options=[selected_member], required=True),
+            "Due date": st.column_config.DateColumn(required=False),
+            "Notes": st.column_config.TextColumn(required=False),
+        }
+        if st.session_state.get("jobs_batch_edit", False):
+            render_batch_jobs_editor(
+                editor_key,
+                jobs_editor_view(member_jobs),
+                staff_column_config,
+                lambda edited_jobs, member=selected_member: replace_member_jobs(member, edited_jobs),
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
+        else:
+            edited = st.data_editor(
+                jobs_editor_view(member_jobs),
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                column_config=staff_column_config,
+                key=editor_key,
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
 
-        edited = clean_jobs_df(edited)
-        if not edited.empty:
-            edited["Assignee"] = selected_member
-
-        jobs_all = jobs_all[jobs_all["Assignee"] != selected_member].copy()
-        combined_clean = clean_jobs_df(pd.concat([jobs_all, edited], ignore_index=True))
-        combined_norm = normalize_active_priorities(combined_clean)
-        st.session_state["jobs_raw"] = combined_norm
-        selected_norm = combined_norm[combined_norm["Assignee"] == selected_member][JOB_COLS].reset_index(drop=True)
-        edited_cmp = edited[JOB_COLS].reset_index(drop=True)
-        selected_norm_cmp = clean_jobs_df(selected_norm).reset_index(drop=True)
-        edited_norm_cmp = clean_jobs_df(edited_cmp).reset_index(drop=True)
-        if len(selected_norm_cmp) == 0 and len(edited_norm_cmp) == 0:
-            pass
-        elif not _priority_signature(selected_norm_cmp).equals(_priority_signature(edited_norm_cmp)):
-            st.session_state.pop(editor_key, None)
-            st.rerun()
+            if editor_pending_changes(editor_key) > 0:
+                edited = clean_jobs_df(edited)
+                if not edited.empty:
+                    edited = edited.assign(Assignee=selected_member)
+
+                # Only this member's partition is replaced; other members' jobs are untouched.
+                replace_member_jobs(selected_member, edited, validated=True)
+                selected_norm_cmp = get_member_jobs(selected_member)
+                if len(selected_norm_cmp) == 0 and len(edited) == 0:
+                    pass
+                elif not _priority_signature(selected_norm_cmp).equals(_priority_signature(edited)):
+                    st.session_state.pop(editor_key, None)
+                    st.rerun()
 
         ms = st.session_state["member_settings"][selected_member]
         weekdays = ms["weekdays"]
-        non_working = set(ms["leave_dates"])
+        non_working = DateRangeMask(ms["leave_ranges"])
         daily_hours = float(member_hours.get(selected_member, 8.0))
         unavailable_hours = get_effective_unavailable_hours(ms, daily_hours)
+        unavailable_rules = ms.get("unavailable_rules", [])
 
-        jobs_norm = normalize_active_priorities(clean_jobs_df(combined_norm))
-        jobs_norm = add_status_columns(jobs_norm)
-        member_norm = jobs_norm[jobs_norm["Assignee"] == selected_member].copy()
+        member_norm = add_status_columns(get_member_jobs(selected_member))
 
         active = member_norm[member_norm["Priority"] >= 1].copy()
         hold = member_norm[member_norm["Priority"] == 0].copy()
@@ -2458,13 +3627,21 @@ with tabs[1]:
 
         frames = []
         if not active.empty:
-            sched = schedule_member_jobs(
-                active,
-                date.today(),
-                daily_hours,
-                weekdays,
-                non_working,
-                unavailable_hours=unavailable_hours,
+            sched = cached_member_schedule(
+                selected_member,
+                "active",
+                member_capacity_key(selected_member, daily_hours, date.today()),
+                lambda: schedule_member_jobs(
+                    active,
+                    date.today(),
+                    daily_hours,
+                    weekdays,
+                    non_working,
+                    unavailable_hours=unavailable_hours,
+                    unavailable_rules=unavailable_rules,
+                    calendar=member_capacity_calendar(selected_member, daily_hours, date.today()),
+                    sequencing=ms["sequencing"],
+                ),
             )
             sched = add_status_columns(sched)
             frames.append(sched)
@@ -2476,96 +3653,93 @@ with tabs[1]:
         else:
             view = pd.concat(frames, ignore_index=True)
             view = view[["Job name","Priority","Status","Required hours","Start date","Finish date","Due date","Notes"]].copy()
+            view["Due date"] = view["Due date"].dt.date
             view = view.sort_values(["Status","Priority","Job name"], ascending=[True, True, True]).reset_index(drop=True)
             st.markdown('<div class="table-shell">', unsafe_allow_html=True)
             st.dataframe(style_schedule(view), use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
+            member_shared = [
+                f"{name} with {', '.join(m for m in spec['shares'] if m != selected_member)}"
+                for name, spec in st.session_state["shared_jobs"].items()
+                if selected_member in spec["shares"] and len(spec["shares"]) > 1
+            ]
+            if member_shared:
+                st.caption(f"Shared jobs (hours here are this member's share): {'; '.join(member_shared)}")
+            if ms["intraday"]["enabled"] and not active.empty:
+                with st.expander("Time slots", expanded=False):
+                    slots = job_time_slots(sched, member_capacity_calendar(selected_member, daily_hours, date.today()))
+                    st.dataframe(slots, use_container_width=True, hide_index=True)
 
 with tabs[2]:
     st.markdown('<div class="section-title">Availability</div>', unsafe_allow_html=True)
     st.caption("Next available date for active work, and next available date if on hold backlog is scheduled after active work")
 
-    jobs_all = clean_jobs_df(st.session_state.get("jobs_raw", pd.DataFrame(columns=JOB_COLS)))
-    jobs_norm = normalize_active_priorities(jobs_all)
-    jobs_norm = add_status_columns(jobs_norm)
-
     rows = []
     member_context = {}
 
+    warm_member_schedules(team_members, member_hours, ("active", "all"))
     for member in team_members:
         ms = st.session_state["member_settings"][member]
         weekdays = ms["weekdays"]
-        non_working = set(ms["leave_dates"])
+        non_working = DateRangeMask(ms["leave_ranges"])
         daily_hours = float(member_hours.get(member, 8.0))
         unavailable_hours = get_effective_unavailable_hours(ms, daily_hours)
+        unavailable_rules = ms.get("unavailable_rules", [])
         sdate = date.today()
+        calendar = member_capacity_calendar(member, daily_hours, sdate)
+        capacity_key = member_capacity_key(member, daily_hours, sdate)
 
-        member_jobs = jobs_norm[jobs_norm["Assignee"] == member].copy()
+        member_jobs = add_status_columns(get_member_jobs(member))
         active = member_jobs[member_jobs["Priority"] >= 1].copy()
         hold = member_jobs[member_jobs["Priority"] == 0].copy()
-        if not hold.empty:
-            hold = hold.sort_values(["Due date","Job name"], ascending=[True, True])
+
+        def calendar_from(day: date, member=member, daily_hours=daily_hours) -> CapacityCalendar:
+            return member_capacity_calendar(member, daily_hours, day)
 
         if active.empty:
             next_free_active = sdate
             sched_active = pd.DataFrame()
         else:
-            sched_active = schedule_member_jobs(
-                active,
-                sdate,
-                daily_hours,
-                weekdays,
-                non_working,
-                unavailable_hours=unavailable_hours,
-            )
-            last_finish = max(sched_active["Finish date"].tolist())
-            future_caps = build_capacity_days(
-                last_finish + timedelta(days=1),
-                weekdays,
-                non_working,
-                daily_hours,
-                unavailable_hours=unavailable_hours,
-                horizon_days=3650,
+            sched_active = cached_member_schedule(
+                member,
+                "active",
+                capacity_key,
+                lambda: schedule_member_jobs(
+                    active,
+                    sdate,
+                    daily_hours,
+                    weekdays,
+                    non_working,
+                    unavailable_hours=unavailable_hours,
+                    unavailable_rules=unavailable_rules,
+                    calendar=calendar,
+                    sequencing=ms["sequencing"],
+                ),
             )
-            future_days = [d for d, cap in future_caps if cap > 1e-9]
-            next_free_active = future_days[0] if len(future_days) else last_finish + timedelta(days=1)
+            next_free_active = next_available_date(sched_active, sdate, calendar_from)
 
         if active.empty and hold.empty:
             next_free_all = sdate
             sched_all = pd.DataFrame()
         else:
-            if not active.empty:
-                if not hold.empty:
-                    maxp = int(active["Priority"].max())
-                    hold2 = hold.copy()
-                    hold2["Priority"] = range(maxp + 1, maxp + 1 + len(hold2))
-                    combined = pd.concat([active, hold2], ignore_index=True)
-                else:
-                    combined = active.copy()
-            else:
-                combined = hold.copy()
-                combined["Priority"] = range(1, len(combined) + 1)
-
-            combined = combined.sort_values(["Priority","Job name"], ascending=[True, True])
-            sched_all = schedule_member_jobs(
-                combined,
-                sdate,
-                daily_hours,
-                weekdays,
-                non_working,
-                unavailable_hours=unavailable_hours,
-            )
-            last_finish_all = max(sched_all["Finish date"].tolist())
-            future_caps_all = build_capacity_days(
-                last_finish_all + timedelta(days=1),
-                weekdays,
-                non_working,
-                daily_hours,
-                unavailable_hours=unavailable_hours,
-                horizon_days=3650,
+            combined = backlog_queue(active, hold)
+            sched_all = cached_member_schedule(
+                member,
+                "all",
+                capacity_key,
+                lambda: schedule_member_jobs(
+                    combined,
+                    sdate,
+                    daily_hours,
+                    weekdays,
+                    non_working,
+                    unavailable_hours=unavailable_hours,
+                    unavailable_rules=unavailable_rules,
+                    calendar=calendar,
+                    sequencing=ms["sequencing"],
+                ),
             )
-            future_days_all = [d for d, cap in future_caps_all if cap > 1e-9]
-            next_free_all = future_days_all[0] if len(future_days_all) else last_finish_all + timedelta(days=1)
+            next_free_all = next_available_date(sched_all, sdate, calendar_from)
 
         member_context[member] = {
             "sched_active": sched_active if isinstance(sched_active, pd.DataFrame) else pd.DataFrame(),
@@ -2575,6 +3749,8 @@ with tabs[2]:
             "non_working": non_working,
             "daily_hours": daily_hours,
             "unavailable_hours": unavailable_hours,
+            "unavailable_rules": unavailable_rules,
+            "calendar": calendar,
         }
 
         rows.append(
@@ -2602,6 +3778,7 @@ with tabs[2]:
     non_working = ctx["non_working"]
     daily_hours = ctx["daily_hours"]
     unavailable_hours = ctx.get("unavailable_hours", {})
+    unavailable_rules = ctx.get("unavailable_rules", [])
 
     month_key = "avail_month_anchor"
     if month_key not in st.session_state:
@@ -2623,15 +3800,8 @@ with tabs[2]:
     view_start = month_start(st.session_state[month_key])
     view_end = month_end(st.session_state[month_key])
 
-    all_capacity_days = build_capacity_days(
-        sdate,
-        weekdays,
-        non_working,
-        daily_hours,
-        unavailable_hours=unavailable_hours,
-        horizon_days=3650,
-    )
-    horizon_workdays = max(1, len([d for d, _ in all_capacity_days if d <= view_end]))
+    member_calendar = ctx.get("calendar") or member_capacity_calendar(chosen_member, daily_hours, sdate)
+    horizon_workdays = max(1, len(member_calendar.days_through(view_end)))
 
     sched_used = ctx["sched_active"] if mode == "Active only" else ctx["sched_all"]
     alloc = allocate_member_hours(
@@ -2642,6 +3812,8 @@ with tabs[2]:
         non_working,
         horizon_workdays=horizon_workdays,
         unavailable_hours=unavailable_hours,
+        unavailable_rules=unavailable_rules,
+        calendar=member_calendar,
     )
     day_jobs = build_day_job_details(
         sched_used,
@@ -2651,9 +3823,168 @@ with tabs[2]:
         non_working,
         horizon_workdays=horizon_workdays,
         unavailable_hours=unavailable_hours,
+        unavailable_rules=unavailable_rules,
+        calendar=member_calendar,
+        shared=st.session_state["shared_jobs"],
     )
 
-    if len(all_capacity_days) == 0:
+    if len(member_calendar.workdays(1)) == 0:
         st.info("No working days available for this member")
     else:
         render_capacity_calendar(alloc, view_start, view_end, weekdays, day_jobs=day_jobs)
+
+with tabs[3]:
+    st.markdown('<div class="section-title">What-if scenarios</div>', unsafe_allow_html=True)
+    st.caption("Try changes without touching the live plan. Only the members a scenario changes are rescheduled.")
+
+    scenarios = st.session_state.setdefault("scenarios", {})
+    new_l, new_r = st.columns([3, 1], gap="small")
+    with new_l:
+        new_scenario_name = st.text_input("New scenario", placeholder="e.g. Move pump rebuild to LB", key="scenario_new_name")
+    with new_r:
+        st.write("")
+        if st.button("Create", key="scenario_create", use_container_width=True):
+            scenario_name = new_scenario_name.strip() or f"Scenario {len(scenarios) + 1}"
+            scenarios.setdefault(scenario_name, [])
+            st.session_state["scenario_selected"] = scenario_name
+
+    if len(scenarios) == 0:
+        st.info("No scenarios yet")
+    else:
+        scenario_names = list(scenarios)
+        if st.session_state.get("scenario_selected") not in scenario_names:
+            st.session_state["scenario_selected"] = scenario_names[0]
+        selected_scenario = st.selectbox("Edit scenario", options=scenario_names, key="scenario_selected")
+        edits = scenarios[selected_scenario]
+        overlay = apply_scenario_edits(
+            _jobs_store()["partitions"],
+            st.session_state["member_settings"],
+            {m: float(member_hours.get(m, 8.0)) for m in team_members},
+            edits,
+            st.session_state["shared_jobs"],
+        )
+
+        for edit_idx, edit in enumerate(edits):
+            ed_l, ed_r = st.columns([4, 1], gap="small")
+            with ed_l:
+                stale_note = " (no longer applies)" if edit_idx in overlay["skipped"] else ""
+                st.caption(describe_scenario_edit(edit) + stale_note)
+            with ed_r:
+                if st.button("Remove", key=f"scenario_edit_remove_{selected_scenario}_{edit_idx}", use_container_width=True):
+                    edits.pop(edit_idx)
+                    st.rerun()
+
+        change_kind = st.radio(
+            "Change",
+            options=["Move job", "Edit job", "Time off", "Working weekdays", "Daily hours"],
+            horizontal=True,
+            key="scenario_change_kind",
+        )
+        change_member = st.selectbox("Member", options=team_members, key="scenario_change_member")
+        new_edit = None
+        if change_kind in ("Move job", "Edit job"):
+            member_jobs = overlay["jobs"].get(change_member, get_member_jobs(change_member))
+            job_names = member_jobs["Job name"].astype(str).tolist()
+            if len(job_names) == 0:
+                st.caption("This member has no jobs in the scenario.")
+            else:
+                change_job = st.selectbox("Job", options=job_names, key="scenario_change_job")
+                job_idx = job_names.index(change_job)
+                job_row = member_jobs.iloc[job_idx]
+                job_key = f"{change_member}_{job_idx}"
+                ch_l, ch_r = st.columns(2, gap="small")
+                if change_kind == "Move job":
+                    with ch_l:
+                        move_to = st.selectbox("Move to", options=[m for m in team_members if m != change_member] or team_members, key="scenario_move_to")
+                    with ch_r:
+                        move_priority = st.number_input(
+                            "Priority on new assignee",
+                            min_value=0,
+                            value=0,
+                            step=1,
+                            key="scenario_move_priority",
+                            help="0 keeps an active job at the end of their queue and an on hold job on hold.",
+                        )
+                    new_edit = {"op": "move_job", "member": change_member, "job": change_job, "to": move_to}
+                    if int(move_priority) > 0:
+                        new_edit["priority"] = int(move_priority)
+                else:
+                    with ch_l:
+                        edit_hours = st.number_input("Required hours", min_value=0.0, value=job_hours(member_jobs["Required hours"])[job_idx], step=1.0, key=f"scenario_edit_hours_{job_key}")
+                        edit_priority = st.number_input("Priority", min_value=0, value=int(job_row["Priority"]), step=1, key=f"scenario_edit_priority_{job_key}")
+                    with ch_r:
+                        current_due = _safe_date(job_row["Due date"])
+                        edit_due = st.date_input("Due date", value=current_due or date.today(), key=f"scenario_edit_due_{job_key}")
+                    new_edit = {"op": "update_job", "member": change_member, "job": change_job, "hours": float(edit_hours), "priority": int(edit_priority)}
+                    if current_due is not None or edit_due != date.today():
+                        new_edit["due"] = edit_due.isoformat()
+        elif change_kind == "Time off":
+            off_pick = st.date_input("Days off", value=(date.today(), date.today()), key="scenario_off_pick")
+            off_range = list(off_pick) if isinstance(off_pick, (list, tuple)) else [off_pick]
+            if len(off_range) > 0:
+                new_edit = {"op": "leave", "member": change_member, "start": off_range[0].isoformat(), "end": off_range[-1].isoformat()}
+        elif change_kind == "Working weekdays":
+            current_days = overlay["settings"].get(change_member, st.session_state["member_settings"][change_member])["weekdays"]
+            picked_days = st.multiselect(
+                "Working weekdays",
+                options=[k for k, _ in WEEKDAY_MAP],
+                default=[INT_TO_LABEL[i] for i in sorted(current_days)],
+                key=f"scenario_weekdays_{change_member}",
+            )
+            if picked_days:
+                new_edit = {"op": "weekdays", "member": change_member, "weekdays": sorted(LABEL_TO_INT[x] for x in picked_days)}
+        else:
+            current_daily = overlay["daily"].get(change_member, float(member_hours.get(change_member, 8.0)))
+            new_daily = st.number_input("Daily hours", min_value=0.0, max_value=24.0, value=float(current_daily), step=0.5, key=f"scenario_daily_{change_member}")
+            new_edit = {"op": "daily_hours", "member": change_member, "hours": float(new_daily)}
+
+        sc_l, sc_r = st.columns(2, gap="small")
+        with sc_l:
+            if st.button("Add change", key="scenario_add_edit", use_container_width=True, disabled=new_edit is None):
+                edits.append(new_edit)
+                st.rerun()
+        with sc_r:
+            if st.button("Delete scenario", key="scenario_delete", use_container_width=True):
+                scenarios.pop(selected_scenario, None)
+                st.session_state.get("scenario_results", {}).pop(selected_scenario, None)
+                st.rerun()
+
+        st.divider()
+        st.subheader("Compare with the live plan")
+        compare_names = st.multiselect("Scenarios", options=scenario_names, default=scenario_names, key="scenario_compare")
+        baseline = scenario_baseline_outcomes(team_members, member_hours)
+        results = evaluate_session_scenarios(compare_names, team_members, member_hours)
+
+        def scenario_row(label: str, outcomes: dict, rescheduled: int) -> dict:
+            kpis = outcome_kpis(outcomes)
+            return {
+                "Plan": label,
+                "Overtime needed (hrs)": kpis["overtime_needed_hours"],
+                "Members needing overtime": kpis["overtime_members"],
+                "On-time jobs %": kpis["on_time_pct"],
+                "On-time jobs": f"{kpis['on_time_jobs']} of {kpis['due_tracked_jobs']}",
+                "Last finish": kpis["last_finish"],
+                "Members rescheduled": rescheduled,
+            }
+
+        compare_rows = [scenario_row("Live plan", baseline, 0)]
+        for name in compare_names:
+            compare_rows.append(scenario_row(name, {**baseline, **results[name]["outcomes"]}, len(results[name]["outcomes"])))
+        st.markdown('<div class="table-shell">', unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame(compare_rows), use_container_width=True, hide_index=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        if selected_scenario in results:
+            scenario_notes = [f"{m}: {o['note']}" for m, o in results[selected_scenario]["outcomes"].items() if o["note"]]
+            for note in scenario_notes:
+                st.warning(note)
+            changes = finish_date_changes(baseline, results[selected_scenario]["outcomes"])
+            st.caption(f"Finish date changes in {selected_scenario}")
+            if changes.empty:
+                st.info("No finish dates change")
+            else:
+                st.markdown('<div class="table-shell">', unsafe_allow_html=True)
+                st.dataframe(changes, use_container_width=True, hide_index=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+queue_autosave_if_changed()
@@ -0,0 +1,289 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from resourcing_core import _payload_digest, _safe_date, load_state_snapshot_bytes, parse_state_payload, team_report
+
+API_DEFAULT_PORT = 8765
+# The app's local snapshot cache, wherever the API is started from.
+API_DEFAULT_SOURCE_DIR = Path(__file__).resolve().parent / ".state_cache"
+API_CLOUD_REFRESH_SECONDS = 30.0
+SUPABASE_STATE_TABLE = "app_state"
+
+def _safe_dataset_id(dataset_id: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in dataset_id)
+
+def _json_value(value):
+    if value is None or value != value:
+        # NaN hours and NaT dates both compare unequal to themselves.
+        return None
+    if isinstance(value, date):
+        return _safe_date(value).isoformat()
+    return value.item() if hasattr(value, "item") else value
+
+def _records(df) -> list[dict]:
+    return [{k: _json_value(v) for k, v in row.items()} for row in df.to_dict(orient="records")]
+
+class DatasetSource:
+    # Latest payload per dataset from a snapshot folder (the app's .state_cache/) or the Supabase table.
+    def __init__(self, source_dir: Path | None, supabase_url: str = "", supabase_key: str = "", refresh_seconds: float = API_CLOUD_REFRESH_SECONDS):
+        self.source_dir = source_dir
+        self.supabase_url = supabase_url.strip().rstrip("/")
+        self.supabase_key = supabase_key.strip()
+        self.refresh_seconds = max(float(refresh_seconds), 0.0)
+        self._seen: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _file_for(self, dataset_id: str) -> Path | None:
+        if self.source_dir is None:
+            return None
+        safe_id = _safe_dataset_id(dataset_id)
+        for suffix in (".hrsnap", ".json"):
+            path = self.source_dir / f"{safe_id}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _fetch_cloud(self, dataset_id: str) -> dict | None:
+        if not (self.supabase_url and self.supabase_key):
+            return None
+        resp = requests.get(
+            f"{self.supabase_url}/rest/v1/{SUPABASE_STATE_TABLE}",
+            headers={"apikey": self.supabase_key, "Authorization": f"Bearer {self.supabase_key}"},
+            params={"select": "payload", "id": f"eq.{dataset_id}", "limit": "1"},
+            timeout=12,
+        )
+        resp.raise_for_status()
+        rows = resp.json()
+        payload = rows[0].get("payload") if rows else None
+        return payload if isinstance(payload, dict) else None
+
+    def load(self, dataset_id: str) -> tuple[str, dict] | None:
+        # Returns (version, payload); files are only re-read when their mtime or size changes and
+        # the cloud is polled at most every refresh_seconds.
+        path = self._file_for(dataset_id)
+        with self._lock:
+            seen = self._seen.get(dataset_id)
+        if path is not None:
+            stat = path.stat()
+            marker = ("file", stat.st_mtime_ns, stat.st_size)
+            if seen is not None and seen[0] == marker:
+                return seen[1], seen[2]
+            payload = load_state_snapshot_bytes(path.read_bytes())
+        else:
+            if seen is not None and seen[0][0] == "cloud" and time.monotonic() - seen[0][1] < self.refresh_seconds:
+                return seen[1], seen[2]
+            payload = self._fetch_cloud(dataset_id)
+            if payload is None:
+                return None
+            marker = ("cloud", time.monotonic())
+        version = _payload_digest(payload)[:16]
+        with self._lock:
+            self._seen[dataset_id] = (marker, version, payload)
+        return version, payload
+
+class ReportCache:
+    # One computed team report and its encoded responses per dataset, dropped as soon as the
+    # dataset version (payload digest) or the schedule day changes.
+    def __init__(self, source: DatasetSource, workers: int | None = None):
+        self.source = source
+        self.workers = workers
+        self._entries: dict[str, dict] = {}
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, dataset_id: str) -> dict | None:
+        loaded = self.source.load(dataset_id)
+        if loaded is None:
+            return None
+        version, payload = loaded
+        key = (version, date.today())
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None and entry["key"] == key:
+                return entry
+            build_lock = self._build_locks.setdefault(dataset_id, threading.Lock())
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(dataset_id)
+            if entry is None or entry["key"] != key:
+                state = parse_state_payload(payload)
+                entry = {
+                    "key": key,
+                    "etag": f'"{version}-{key[1].isoformat()}"',
+                    "members": frozenset(state["team"]["Member"].astype(str)),
+                    "report": team_report(state, key[1], self.workers),
+                    "responses": {},
+                }
+                with self._lock:
+                    self._entries[dataset_id] = entry
+        return entry
+
+    def response(self, dataset_id: str, view: str, member: str = "") -> tuple[str, bytes] | None:
+        # Raises LookupError for a member outside the dataset's team, before anything is cached for it.
+        entry = self._entry(dataset_id)
+        if entry is None:
+            return None
+        if view == "kpis":
+            # KPIs are team-wide, so a member filter would only add copies of the same response.
+            member = ""
+        if member and member not in entry["members"]:
+            raise LookupError(f"Member {member} is not in dataset {dataset_id}")
+        cache_key = (view, member)
+        with self._lock:
+            body = entry["responses"].get(cache_key)
+            if body is not None:
+                self.hits += 1
+                return entry["etag"], body
+            self.misses += 1
+        report = entry["report"]
+        doc = {"dataset": dataset_id, "version": entry["key"][0], "start_date": entry["key"][1].isoformat()}
+        if view == "schedules":
+            schedules = report["schedules"]
+            if member:
+                schedules = schedules[schedules["Assignee"].astype(str) == member]
+            doc["jobs"] = _records(schedules)
+        elif view == "availability":
+            availability = report["availability"]
+            if member and not availability.empty:
+                availability = availability[availability["Member"].astype(str) == member]
+            doc["members"] = _records(availability)
+        else:
+            doc["kpis"] = report["kpis"]
+        body = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            entry["responses"][cache_key] = body
+        return entry["etag"], body
+
+class ResourcingApiHandler(BaseHTTPRequestHandler):
+    server_version = "ResourcingAPI/1"
+    protocol_version = "HTTP/1.1"
+    cache: ReportCache
+
+    def _send(self, status: int, body: bytes = b"", etag: str | None = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            self._send(200, json.dumps({"ok": True, "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}).encode("utf-8"))
+            return
+        if len(parts) != 3 or parts[0] != "datasets" or parts[2] not in ("schedules", "availability", "kpis"):
+            self._error(404, "Use /datasets/<id>/schedules, /datasets/<id>/availability or /datasets/<id>/kpis")
+            return
+        member = parse_qs(url.query).get("member", [""])[0].strip()
+        try:
+            result = self.cache.response(parts[1], parts[2], member)
+        except LookupError as exc:
+            self._error(404, str(exc))
+            return
+        except Exception as exc:
+            self._error(502, f"Could not load dataset {parts[1]}: {exc}")
+            return
+        if result is None:
+            self._error(404, f"Dataset {parts[1]} not found")
+            return
+        etag, body = result
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self._send(304, etag=etag)
+            return
+        self._send(200, body, etag=etag)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def serve(cache: ReportCache, host: str, port: int, verbose: bool = False) -> None:
+    handler = type("Handler", (ResourcingApiHandler,), {"cache": cache})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    print(f"Serving resourcing API on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def bench(url: str, total: int, concurrency: int) -> None:
+    # Local load check: keep-alive sessions per worker, half the requests revalidate with the ETag.
+    local = threading.local()
+
+    def one(i: int) -> tuple[int, float]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        headers = {"If-None-Match": local.etag} if i % 2 and getattr(local, "etag", None) else {}
+        started = time.perf_counter()
+        resp = session.get(url, headers=headers, timeout=30)
+        local.etag = resp.headers.get("ETag")
+        return resp.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(r[1] for r in results)
+    statuses: dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(
+        f"{total} requests in {elapsed:.2f}s = {total / elapsed:.0f} req/s; "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms; "
+        f"statuses {statuses}"
+    )
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="resourcing_api", description="Read-only JSON API for schedules, availability and KPIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=API_DEFAULT_PORT)
+    parser.add_argument(
+        "--source-dir",
+        default=str(API_DEFAULT_SOURCE_DIR),
+        help="Folder of <dataset>.hrsnap or <dataset>.json files (default: the app's .state_cache next to this file)",
+    )
+    parser.add_argument("--supabase-url", default="", help="Fetch datasets without a local file from this Supabase project")
+    parser.add_argument("--supabase-key", default="")
+    parser.add_argument("--refresh-seconds", type=float, default=API_CLOUD_REFRESH_SECONDS, help="How often cloud datasets are re-checked")
+    parser.add_argument("--workers", type=int, default=None, help="Scheduling processes per report build (default: one per CPU; 1 = serial)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--bench", default="", help="Instead of serving, load-test this URL")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench(args.bench, max(args.requests, 1), max(args.concurrency, 1))
+        return 0
+    source_dir = Path(args.source_dir) if args.source_dir else None
+    source = DatasetSource(source_dir, args.supabase_url, args.supabase_key, args.refresh_seconds)
+    serve(ReportCache(source, args.workers), args.host, args.port, args.verbose)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
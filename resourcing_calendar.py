@@ -0,0 +1,445 @@
+# Microsoft Graph calendar sync shared by the app: paged and windowed calendarView fetches, per-window
+# delta sync into a compact event cache, and busy-time mapping. Nothing here touches Streamlit; callers
+# pass tokens, days and the stored delta state in explicitly.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from urllib.parse import quote, urlencode
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import requests
+
+from resourcing_core import _safe_float, normalize_busy_spans, parse_work_window
+
+MS_GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+MS_SNAPSHOT_WINDOW_DAYS = 30
+MS_GRAPH_PAGE_SIZE = 500
+MS_BULK_MAX_WORKERS = 4
+# Upper bound for the MS_BULK_MAX_WORKERS secret. Each mailbox also fetches its windows four at a time
+# (Graph's per-mailbox concurrency limit), so 16 mailboxes in flight means up to 64 requests.
+MS_BULK_WORKERS_LIMIT = 16
+MS_GRAPH_MAX_RETRIES = 4
+
+def _parse_iso_datetime_text(raw: str) -> datetime | None:
+    text = raw.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    # Graph sends seven fractional digits; datetime.fromisoformat only takes six on Python 3.10.
+    dot = text.find(".")
+    if dot != -1:
+        end = dot + 1
+        while end < len(text) and text[end].isdigit():
+            end += 1
+        text = text[:dot] + text[dot:end][:7] + text[end:]
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        parsed = pd.to_datetime(raw, errors="coerce")
+        return None if pd.isna(parsed) else parsed.to_pydatetime()
+
+def _graph_parse_datetime(dt_obj: dict | None) -> datetime | None:
+    if not isinstance(dt_obj, dict):
+        return None
+    dt_raw = str(dt_obj.get("dateTime", "")).strip()
+    if len(dt_raw) == 0:
+        return None
+    dt_val = _parse_iso_datetime_text(dt_raw)
+    if dt_val is None:
+        return None
+    tz_raw = str(dt_obj.get("timeZone", "")).strip()
+    if dt_val.tzinfo is None:
+        if tz_raw and tz_raw.upper() != "UTC":
+            try:
+                dt_val = dt_val.replace(tzinfo=ZoneInfo(tz_raw))
+            except Exception:
+                dt_val = dt_val.replace(tzinfo=timezone.utc)
+        else:
+            dt_val = dt_val.replace(tzinfo=timezone.utc)
+    return dt_val.astimezone(timezone.utc)
+
+class GraphThrottle:
+    # Shared back-off for concurrent Graph calls: one 429 pauses every worker until Retry-After passes.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + max(float(seconds), 0.0))
+
+def _graph_get(url: str, headers: dict, params: dict | None = None, throttle: GraphThrottle | None = None) -> requests.Response:
+    for attempt in range(MS_GRAPH_MAX_RETRIES + 1):
+        if throttle is not None:
+            throttle.wait()
+        resp = requests.get(url, headers=headers, params=params, timeout=20)
+        if resp.status_code not in {429, 503, 504} or attempt == MS_GRAPH_MAX_RETRIES:
+            return resp
+        retry_after = _safe_float(resp.headers.get("Retry-After", 0), 0.0) or float(2 ** attempt)
+        if throttle is not None:
+            throttle.pause(retry_after)
+        else:
+            time.sleep(retry_after)
+    return resp
+
+def fetch_microsoft_calendar_events(
+    access_token: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    user_id: str | None = None,
+    throttle: GraphThrottle | None = None,
+    base_url: str = MS_GRAPH_BASE_URL,
+) -> tuple[list[dict] | None, str]:
+    start_iso = start_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    end_iso = end_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Prefer": 'outlook.timezone="UTC"',
+    }
+    params = {
+        "startDateTime": start_iso,
+        "endDateTime": end_iso,
+        "$select": "id,subject,start,end,isCancelled,showAs",
+        "$top": str(MS_GRAPH_PAGE_SIZE),
+    }
+    events: list[dict] = []
+    owner_path = "me" if not user_id else f"users/{quote(str(user_id), safe='')}"
+    next_url = f"{base_url}/{owner_path}/calendarView"
+    try:
+        while next_url:
+            if next_url.endswith("/calendarView"):
+                resp = _graph_get(next_url, headers, params=params, throttle=throttle)
+            else:
+                resp = _graph_get(next_url, headers, throttle=throttle)
+            data = resp.json()
+            if resp.status_code >= 400:
+                err = str(data.get("error", data))[:240]
+                return None, f"Calendar fetch failed ({resp.status_code}): {err}"
+            values = data.get("value", [])
+            if isinstance(values, list):
+                events.extend([v for v in values if isinstance(v, dict)])
+            next_url = data.get("@odata.nextLink")
+    except Exception as exc:
+        return None, f"Calendar fetch failed: {exc}"
+    return events, f"Fetched {len(events)} calendar events."
+
+def calendar_sync_windows(start_day: date, end_day: date, window_days: int = MS_SNAPSHOT_WINDOW_DAYS) -> list[tuple[date, date]]:
+    # Windows sit on fixed day-ordinal blocks, so a window's delta link stays valid while the horizon rolls forward.
+    window_days = max(int(window_days), 1)
+    windows: list[tuple[date, date]] = []
+    k = (start_day.toordinal() // window_days) * window_days
+    while k <= end_day.toordinal():
+        windows.append((date.fromordinal(max(k, 1)), date.fromordinal(k + window_days - 1)))
+        k += window_days
+    return windows
+
+def fetch_microsoft_calendar_events_windowed(
+    access_token: str,
+    start_day: date,
+    end_day: date,
+    user_id: str | None = None,
+    throttle: GraphThrottle | None = None,
+    max_workers: int = MS_BULK_MAX_WORKERS,
+    base_url: str = MS_GRAPH_BASE_URL,
+) -> tuple[list[dict] | None, str]:
+    windows = [(max(ws, start_day), min(we, end_day)) for ws, we in calendar_sync_windows(start_day, end_day)]
+    results: list[tuple[list[dict] | None, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(windows))), thread_name_prefix="calendar-window") as pool:
+        futures = [
+            pool.submit(
+                fetch_microsoft_calendar_events,
+                access_token,
+                datetime.combine(ws, datetime.min.time(), tzinfo=timezone.utc),
+                datetime.combine(we + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc),
+                user_id,
+                throttle,
+                base_url,
+            )
+            for ws, we in windows
+        ]
+        results = [f.result() for f in futures]
+    merged: dict[str, dict] = {}
+    for events, msg in results:
+        if events is None:
+            return None, msg
+        for ev in events:
+            # Events that cross a window edge come back from both windows.
+            merged[str(ev.get("id", len(merged)))] = ev
+    return list(merged.values()), f"Fetched {len(merged)} calendar events in {len(windows)} windows."
+
+def fetch_microsoft_calendar_delta(
+    access_token: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    delta_link: str = "",
+    throttle: GraphThrottle | None = None,
+    base_url: str = MS_GRAPH_BASE_URL,
+) -> tuple[dict | None, str]:
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Prefer": f'outlook.timezone="UTC", odata.maxpagesize={MS_GRAPH_PAGE_SIZE}',
+    }
+    full = len(delta_link.strip()) == 0
+    if full:
+        start_iso = start_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+        end_iso = end_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+        next_url = f"{base_url}/me/calendarView/delta?{urlencode({'startDateTime': start_iso, 'endDateTime': end_iso})}"
+    else:
+        next_url = delta_link
+    events: list[dict] = []
+    new_delta_link = ""
+    try:
+        while next_url:
+            resp = _graph_get(next_url, headers, throttle=throttle)
+            data = resp.json()
+            if resp.status_code >= 400:
+                err = str(data.get("error", data))[:240]
+                return None, f"Calendar fetch failed ({resp.status_code}): {err}"
+            values = data.get("value", [])
+            if isinstance(values, list):
+                events.extend([v for v in values if isinstance(v, dict)])
+            next_url = data.get("@odata.nextLink")
+            new_delta_link = str(data.get("@odata.deltaLink", new_delta_link) or "")
+    except Exception as exc:
+        return None, f"Calendar fetch failed: {exc}"
+    if not new_delta_link:
+        return None, "Calendar fetch failed: Microsoft Graph did not return a delta link."
+    return {"events": events, "delta_link": new_delta_link, "full": full}, f"Fetched {len(events)} calendar changes."
+
+def _sync_calendar_window(
+    access_token: str,
+    window_start: date,
+    window_end: date,
+    delta_link: str,
+    throttle: GraphThrottle,
+    base_url: str = MS_GRAPH_BASE_URL,
+) -> tuple[dict | None, str]:
+    start_dt = datetime.combine(window_start, datetime.min.time(), tzinfo=timezone.utc)
+    end_dt = datetime.combine(window_end + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    result, msg = fetch_microsoft_calendar_delta(access_token, start_dt, end_dt, delta_link, throttle=throttle, base_url=base_url)
+    if result is None and delta_link:
+        # Expired or rejected delta token: fall back to a full sync of this window.
+        result, msg = fetch_microsoft_calendar_delta(access_token, start_dt, end_dt, "", throttle=throttle, base_url=base_url)
+    return result, msg
+
+def _compact_graph_event(ev: dict) -> dict | None:
+    st_dt = _graph_parse_datetime(ev.get("start"))
+    en_dt = _graph_parse_datetime(ev.get("end"))
+    if st_dt is None or en_dt is None:
+        return None
+    return {
+        "start": {"dateTime": st_dt.isoformat(), "timeZone": "UTC"},
+        "end": {"dateTime": en_dt.isoformat(), "timeZone": "UTC"},
+        "showAs": str(ev.get("showAs", "")),
+        "isCancelled": bool(ev.get("isCancelled", False)),
+    }
+
+def _event_days(ev: dict, tz: tzinfo = timezone.utc) -> set[date]:
+    st_dt = _graph_parse_datetime(ev.get("start"))
+    en_dt = _graph_parse_datetime(ev.get("end"))
+    if st_dt is None or en_dt is None or en_dt <= st_dt:
+        return set()
+    first = st_dt.astimezone(tz).date()
+    last = (en_dt - timedelta(microseconds=1)).astimezone(tz).date()
+    return {first + timedelta(days=i) for i in range((last - first).days + 1)}
+
+def _event_overlaps_days(ev: dict, first_day: date, last_day: date, tz: tzinfo = timezone.utc) -> bool:
+    st_dt = _graph_parse_datetime(ev.get("start"))
+    en_dt = _graph_parse_datetime(ev.get("end"))
+    if st_dt is None or en_dt is None:
+        return False
+    lo = datetime.combine(first_day, datetime.min.time(), tzinfo=tz)
+    hi = datetime.combine(last_day + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+    return en_dt > lo and st_dt < hi
+
+def apply_calendar_delta(
+    cache: dict[str, dict],
+    changes: list[dict],
+    window_key: str,
+    tz: tzinfo = timezone.utc,
+) -> tuple[dict[str, dict], set[date]]:
+    # Returns the updated event cache and every day touched by an old or new event version.
+    # Each cached event records the sync windows that reported it, so an event leaving one
+    # window but still inside a neighbouring one is kept.
+    cache = dict(cache)
+    affected: set[date] = set()
+    for ev in changes:
+        ev_id = str(ev.get("id", "")).strip()
+        if len(ev_id) == 0:
+            continue
+        old = cache.get(ev_id)
+        windows = set(old.get("windows", [])) if old is not None else set()
+        if old is not None:
+            affected |= _event_days(old, tz)
+        compact = None if "@removed" in ev else _compact_graph_event(ev)
+        if compact is None:
+            windows.discard(window_key)
+            if old is not None and windows:
+                cache[ev_id] = {**old, "windows": sorted(windows)}
+            else:
+                cache.pop(ev_id, None)
+            continue
+        windows.add(window_key)
+        compact["windows"] = sorted(windows)
+        cache[ev_id] = compact
+        affected |= _event_days(compact, tz)
+    return cache, affected
+
+def drop_calendar_windows(cache: dict[str, dict], keep: set[str], tz: tzinfo = timezone.utc) -> tuple[dict[str, dict], set[date]]:
+    out: dict[str, dict] = {}
+    affected: set[date] = set()
+    for ev_id, ev in cache.items():
+        windows = [w for w in ev.get("windows", []) if w in keep]
+        if len(windows) == len(ev.get("windows", [])):
+            out[ev_id] = ev
+            continue
+        affected |= _event_days(ev, tz)
+        if windows:
+            out[ev_id] = {**ev, "windows": windows}
+    return out, affected
+
+def sync_calendar_windows(
+    access_token: str,
+    start_day: date,
+    end_day: date,
+    stored_windows: dict,
+    cached: dict[str, dict],
+    tz: tzinfo = timezone.utc,
+    max_workers: int = MS_BULK_MAX_WORKERS,
+    base_url: str = MS_GRAPH_BASE_URL,
+) -> tuple[dict | None, str]:
+    # One delta sync per calendar_sync_windows window, resuming from stored_windows' links, folded into
+    # the event cache. Returns the new cache and window links plus every day whose busy time may have
+    # changed; None (and the message) when any window fails, so the stored state stays as it was.
+    windows = calendar_sync_windows(start_day, end_day)
+    window_keys = [ws.isoformat() for ws, _ in windows]
+    throttle = GraphThrottle()
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(windows))), thread_name_prefix="calendar-delta") as pool:
+        futures = [
+            pool.submit(
+                _sync_calendar_window,
+                access_token,
+                ws,
+                we,
+                str(stored_windows.get(ws.isoformat(), {}).get("link", "")),
+                throttle,
+                base_url,
+            )
+            for ws, we in windows
+        ]
+        results = [f.result() for f in futures]
+    for result, fetch_msg in results:
+        if result is None:
+            return None, fetch_msg
+
+    cache, affected = drop_calendar_windows(cached, set(window_keys), tz)
+    change_count = 0
+    full_windows = 0
+    for (ws, we), key, (result, _) in zip(windows, window_keys, results):
+        if result["full"]:
+            full_windows += 1
+            cache, dropped = drop_calendar_windows(cache, set(window_keys) - {key}, tz)
+            # Windows are UTC-aligned, so a local-day split can spill one day either side.
+            affected |= dropped | {ws + timedelta(days=i) for i in range(-1, (we - ws).days + 2)}
+        else:
+            change_count += len(result["events"])
+        cache, touched = apply_calendar_delta(cache, result["events"], key, tz)
+        affected |= touched
+    return {
+        "cache": cache,
+        "affected": affected,
+        "delta_windows": {
+            key: {"end": we.isoformat(), "link": result["delta_link"]}
+            for (_, we), key, (result, _) in zip(windows, window_keys, results)
+        },
+        "windows": len(windows),
+        "full_windows": full_windows,
+        "changes": change_count,
+    }, f"Synced {len(windows)} calendar windows."
+
+def merge_busy_events(events: list[dict], range_start: float, range_end: float) -> tuple[list[tuple[float, float]], int]:
+    # Busy event spans clipped to [range_start, range_end) timestamps, merged by a sweep; also the event count.
+    spans: list[tuple[float, float]] = []
+    for ev in events:
+        if bool(ev.get("isCancelled", False)):
+            continue
+        show_as = str(ev.get("showAs", "")).strip().lower()
+        if show_as == "free":
+            continue
+        st_dt = _graph_parse_datetime(ev.get("start"))
+        en_dt = _graph_parse_datetime(ev.get("end"))
+        if st_dt is None or en_dt is None or en_dt <= st_dt:
+            continue
+        span_start = max(st_dt.timestamp(), range_start)
+        span_end = min(en_dt.timestamp(), range_end)
+        if span_end <= span_start:
+            continue
+        spans.append((span_start, span_end))
+    spans.sort()
+
+    merged: list[tuple[float, float]] = []
+    for span_start, span_end in spans:
+        if merged and span_start <= merged[-1][1]:
+            if span_end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], span_end)
+        else:
+            merged.append((span_start, span_end))
+    return merged, len(spans)
+
+def map_events_to_busy_spans(
+    events: list[dict],
+    start_day: date,
+    end_day: date,
+    tz: tzinfo | None = None,
+) -> list[tuple[datetime, datetime]]:
+    # Merged busy spans over the days in local wall-clock time, kept for intraday slot scheduling.
+    if end_day < start_day:
+        return []
+    tz = tz or timezone.utc
+    range_start = datetime.combine(start_day, datetime.min.time(), tzinfo=tz).timestamp()
+    range_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), tzinfo=tz).timestamp()
+    merged, _ = merge_busy_events(events, range_start, range_end)
+    return normalize_busy_spans([(datetime.fromtimestamp(a, tz), datetime.fromtimestamp(b, tz)) for a, b in merged])
+
+def map_events_to_daily_unavailable(
+    events: list[dict],
+    start_day: date,
+    end_day: date,
+    tz: tzinfo | None = None,
+    work_window: list[str] | None = None,
+) -> tuple[dict[date, float], int]:
+    if end_day < start_day:
+        return {}, 0
+    tz = tz or timezone.utc
+    n_days = (end_day - start_day).days + 1
+    days = [start_day + timedelta(days=i) for i in range(n_days + 1)]
+    day_starts = [datetime.combine(d, datetime.min.time(), tzinfo=tz).timestamp() for d in days]
+    window = parse_work_window(work_window)
+    if window is None:
+        clip_lo = day_starts[:-1]
+        clip_hi = day_starts[1:]
+    else:
+        clip_lo = [datetime.combine(d, window[0].time(), tzinfo=tz).timestamp() for d in days[:-1]]
+        clip_hi = [datetime.combine(d, window[1].time(), tzinfo=tz).timestamp() for d in days[:-1]]
+    merged, counted_events = merge_busy_events(events, day_starts[0], day_starts[-1])
+
+    # Split each merged busy span at day boundaries.
+    totals: dict[date, float] = {}
+    day_idx = 0
+    for span_start, span_end in merged:
+        while day_starts[day_idx + 1] <= span_start:
+            day_idx += 1
+        i = day_idx
+        while i < n_days and day_starts[i] < span_end:
+            overlap = min(span_end, clip_hi[i]) - max(span_start, clip_lo[i])
+            if overlap > 0:
+                totals[days[i]] = totals.get(days[i], 0.0) + overlap / 3600.0
+            i += 1
+    return totals, counted_events
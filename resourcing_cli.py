@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from resourcing_core import DateRangeMask, load_state_snapshot_bytes, parse_state_payload, simulate_delivery_risk, team_report
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="resourcing_cli",
+        description="Build schedules, availability and KPI reports from a saved payload or snapshot without Streamlit.",
+    )
+    parser.add_argument("source", help="Payload JSON export or .hrsnap snapshot file")
+    parser.add_argument("--out", default="resourcing_report", help="Output directory (default: resourcing_report)")
+    parser.add_argument("--start", default=None, help="Schedule start date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="Format for the schedule and availability tables")
+    parser.add_argument("--members", default="", help="Comma-separated members to include (default: whole team)")
+    parser.add_argument("--workers", type=int, default=None, help="Scheduling processes (default: one per CPU; 1 = serial)")
+    parser.add_argument("--risk-samples", type=int, default=0, help="Also simulate delivery risk with this many samples (default: off)")
+    return parser.parse_args(argv)
+
+def write_table(df, path: Path, fmt: str) -> Path:
+    target = path.with_suffix(f".{fmt}")
+    if fmt == "json":
+        target.write_text(df.to_json(orient="records", date_format="iso", indent=1), encoding="utf-8")
+    else:
+        df.to_csv(target, index=False)
+    return target
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        start_date = date.fromisoformat(args.start) if args.start else date.today()
+    except ValueError:
+        print(f"Invalid --start date: {args.start}", file=sys.stderr)
+        return 2
+    try:
+        payload = load_state_snapshot_bytes(Path(args.source).read_bytes())
+    except (OSError, ValueError) as exc:
+        print(f"Could not read {args.source}: {exc}", file=sys.stderr)
+        return 2
+
+    state = parse_state_payload(payload)
+    wanted = [m.strip() for m in args.members.split(",") if m.strip()]
+    if wanted:
+        unknown = sorted(set(wanted) - set(state["team"]["Member"].astype(str)))
+        if unknown:
+            print(f"Unknown members: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        state["team"] = state["team"][state["team"]["Member"].astype(str).isin(wanted)].reset_index(drop=True)
+        state["jobs"] = state["jobs"][state["jobs"]["Assignee"].astype(str).isin(wanted)].reset_index(drop=True)
+    report = team_report(state, start_date, args.workers)
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = [
+        write_table(report["schedules"], out_dir / "schedules", args.format),
+        write_table(report["availability"], out_dir / "availability", args.format),
+    ]
+    if args.risk_samples > 0:
+        jobs = state["jobs"]
+        partitions = {str(m): part for m, part in jobs.groupby("Assignee", sort=False, observed=True)} if not jobs.empty else {}
+        daily = dict(zip(state["team"]["Member"].astype(str).tolist(), state["team"]["Daily hours"].astype(float).tolist()))
+        risk = simulate_delivery_risk(
+            partitions,
+            {m: state["member_settings"][m] for m in daily},
+            daily,
+            start_date,
+            DateRangeMask(state["team_shutdowns"]),
+            state["estimate_ranges"],
+            args.risk_samples,
+        )
+        written.append(write_table(risk["jobs"], out_dir / "delivery_risk", args.format))
+        report["kpis"]["delivery_risk"] = risk["summary"]
+    kpi_path = out_dir / "kpis.json"
+    kpi_path.write_text(json.dumps(report["kpis"], indent=1), encoding="utf-8")
+    written.append(kpi_path)
+
+    elapsed = time.perf_counter() - started
+    kpis = report["kpis"]
+    print(
+        f"{kpis['members']} members, {kpis['active_jobs']} active and {kpis['on_hold_jobs']} on hold jobs "
+        f"in {elapsed:.2f}s; delivery health {kpis['delivery_health']}, overtime needed {kpis['overtime_needed_hours']:.1f}h"
+    )
+    for path in written:
+        print(f"  {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2844 @@
+# Streamlit-free scheduling engine shared by the app and the batch CLI. Nothing here touches
+# session state, secrets or the network; callers pass settings and jobs in explicitly.
+from bisect import bisect_right
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+
+CAPACITY_CHUNK_DAYS = 56
+CAPACITY_MAX_CHUNK_DAYS = 1456
+UNAVAILABLE_RULE_FREQUENCIES = ("weekly", "monthly")
+STATE_SNAPSHOT_MAGIC = b"HRSNAP"
+STATE_SNAPSHOT_VERSION = 1
+# Below this many queued jobs per run, pool start-up and pickling cost more than parallel scheduling saves.
+PARALLEL_MIN_JOBS = 4000
+PARALLEL_CHUNKS_PER_WORKER = 4
+REBALANCE_MAX_MOVES = 200
+REBALANCE_MIN_MOVE_HOURS = 1.0
+REBALANCE_SEARCH_HELPERS = 8
+RISK_DEFAULT_SAMPLES = 10000
+RISK_BLOCK_VALUES = 2_000_000
+# Job sequencing policies: strict priority order (the original behaviour) and due-date-aware ones.
+SEQUENCING_POLICIES = {
+    "priority": "Priority order",
+    "edf": "Earliest due date",
+    "least_slack": "Least slack",
+    "weighted": "Weighted blend",
+}
+DEFAULT_SEQUENCING = {"policy": "priority", "due_weight": 0.5}
+DEFAULT_INTRADAY = {"enabled": False, "min_block_hours": 1.0}
+INTRADAY_DAY_START_MINUTES = 9 * 60
+INTRADAY_FIT_SEARCH_SLOTS = 64
+# Week 1 of an hours profile saved without an anchor; the app stores the Monday it was created on instead.
+HOURS_PROFILE_DEFAULT_ANCHOR = date(2024, 1, 1)
+# Team-wide estimate spread: each job's Required hours times a triangular(low, likely, high) multiplier.
+DEFAULT_ESTIMATE_SPREAD = {"low": 0.9, "likely": 1.0, "high": 1.3}
+SHARE_MODES = {"proportional": "Proportional", "fixed": "Fixed hours"}
+
+WEEKDAY_MAP = [("Mon", 0), ("Tue", 1), ("Wed", 2), ("Thu", 3), ("Fri", 4), ("Sat", 5), ("Sun", 6)]
+LABEL_TO_INT = {k: v for k, v in WEEKDAY_MAP}
+INT_TO_LABEL = {v: k for k, v in WEEKDAY_MAP}
+
+JOB_COLS = ["Job name", "Required hours", "Priority", "Assignee", "Due date", "Notes"]
+# Canonical dtypes for validated jobs tables; hours are rounded back to this many decimals when leaving float32.
+JOB_DTYPES = {
+    "Job name": "object",
+    "Required hours": "float32",
+    "Priority": "int16",
+    "Assignee": "category",
+    "Due date": "datetime64[ns]",
+    "Notes": "string",
+}
+JOB_HOURS_DECIMALS = 4
+
+DEFAULT_TEAM_ROWS = [
+    {"Member": "SL", "Daily hours": 8.0},
+    {"Member": "LS", "Daily hours": 8.0},
+    {"Member": "LB", "Daily hours": 8.0},
+]
+
+DEFAULT_JOBS_ROWS = [
+    {"Job name": "Job B", "Required hours": 8.0, "Priority": 1, "Assignee": "SL", "Due date": None, "Notes": ""},
+    {"Job name": "Job A", "Required hours": 16.0, "Priority": 2, "Assignee": "SL", "Due date": None, "Notes": ""},
+    {"Job name": "Backlog item", "Required hours": 6.0, "Priority": 0, "Assignee": "SL", "Due date": None, "Notes": "On hold"},
+]
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _ordinals_to_dates(ordinals: np.ndarray) -> list[date]:
+    return (ordinals.astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]").tolist()
+
+def normalize_unavailable_hours(unavailable_hours: dict | None, daily_hours: float) -> dict[date, float]:
+    cap = float(daily_hours)
+    return {d: min(h, cap) for d, h in _safe_date_hours(unavailable_hours).items()}
+
+def normalize_unavailable_rules(raw_rules) -> list[dict]:
+    rules: list[dict] = []
+    if not isinstance(raw_rules, (list, tuple)):
+        return rules
+    for item in raw_rules:
+        if not isinstance(item, dict):
+            continue
+        freq = str(item.get("freq", "weekly")).strip().lower()
+        hours = _safe_float(item.get("hours", 0.0))
+        start = _safe_date(item.get("start"))
+        end = _safe_date(item.get("end"))
+        if freq not in UNAVAILABLE_RULE_FREQUENCIES or hours <= 0 or start is None:
+            continue
+        if end is not None and end < start:
+            continue
+        rule = {
+            "freq": freq,
+            "interval": max(_safe_int(item.get("interval", 1), 1), 1),
+            "hours": hours,
+            "start": start,
+            "end": end,
+        }
+        if freq == "weekly":
+            rule["weekday"] = _safe_int(item.get("weekday", start.weekday()), start.weekday()) % 7
+        else:
+            rule["day"] = min(max(_safe_int(item.get("day", start.day), start.day), 1), 31)
+        rules.append(rule)
+    return rules
+
+def expand_unavailable_rules(rules: list[dict] | None, ordinals: np.ndarray) -> np.ndarray:
+    # Unavailable hours contributed by recurrence rules on each day ordinal.
+    hours = np.zeros(len(ordinals), dtype=np.float64)
+    if not rules or len(ordinals) == 0:
+        return hours
+    weekday = (ordinals - 1) % 7
+    days = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    month_idx = months.astype(np.int64)
+    month_first = months.astype("datetime64[D]")
+    day_of_month = (days - month_first).astype(np.int64) + 1
+    month_len = ((months + 1).astype("datetime64[D]") - month_first).astype(np.int64)
+    for rule in rules:
+        start = rule["start"]
+        mask = ordinals >= start.toordinal()
+        if rule.get("end") is not None:
+            mask &= ordinals <= rule["end"].toordinal()
+        if rule["freq"] == "weekly":
+            anchor = start.toordinal() + (rule["weekday"] - start.weekday()) % 7
+            mask &= (weekday == rule["weekday"]) & (((ordinals - anchor) // 7) % rule["interval"] == 0)
+        else:
+            # Days past the end of a short month fall on its last day.
+            start_month = (start.year - 1970) * 12 + start.month - 1
+            mask &= (day_of_month == np.minimum(rule["day"], month_len)) & ((month_idx - start_month) % rule["interval"] == 0)
+        hours[mask] += float(rule["hours"])
+    return hours
+
+def describe_unavailable_rule(rule: dict) -> str:
+    every = "" if rule["interval"] == 1 else f" {rule['interval']}"
+    if rule["freq"] == "weekly":
+        unit = "week" if rule["interval"] == 1 else "weeks"
+        when = f"{INT_TO_LABEL[rule['weekday']]} every{every} {unit}"
+    else:
+        unit = "month" if rule["interval"] == 1 else "months"
+        when = f"day {rule['day']} every{every} {unit}"
+    until = f" until {rule['end'].isoformat()}" if rule.get("end") else ""
+    return f"{rule['hours']:g}h on {when} from {rule['start'].isoformat()}{until}"
+
+def normalize_hours_profile(raw_profile) -> dict:
+    # A one- or two-week cycle of daily hours starting on the anchor Monday; {} means use Daily hours.
+    if not isinstance(raw_profile, dict):
+        return {}
+    raw_hours = raw_profile.get("hours", [])
+    if not isinstance(raw_hours, (list, tuple)) or len(raw_hours) not in (7, 14):
+        return {}
+    hours = [min(max(_safe_float(h), 0.0), 24.0) for h in raw_hours]
+    if max(hours) <= 0:
+        return {}
+    anchor = _safe_date(raw_profile.get("anchor")) or HOURS_PROFILE_DEFAULT_ANCHOR
+    anchor = anchor - timedelta(days=anchor.weekday())
+    return {"hours": hours, "anchor": anchor}
+
+def normalize_sequencing(raw) -> dict:
+    raw = raw if isinstance(raw, dict) else {}
+    policy = str(raw.get("policy", DEFAULT_SEQUENCING["policy"]))
+    return {
+        "policy": policy if policy in SEQUENCING_POLICIES else DEFAULT_SEQUENCING["policy"],
+        "due_weight": min(max(_safe_float(raw.get("due_weight"), DEFAULT_SEQUENCING["due_weight"]), 0.0), 1.0),
+    }
+
+def normalize_intraday(raw) -> dict:
+    # Intraday mode schedules into free time slots of at least min_block_hours instead of daily totals.
+    raw = raw if isinstance(raw, dict) else {}
+    return {
+        "enabled": bool(raw.get("enabled", DEFAULT_INTRADAY["enabled"])),
+        "min_block_hours": min(max(_safe_float(raw.get("min_block_hours"), DEFAULT_INTRADAY["min_block_hours"]), 0.25), 12.0),
+    }
+
+class DateRangeMask:
+    # Sorted, coalesced [start, end] day ranges with vectorized membership tests on day ordinals.
+    def __init__(self, ranges=None):
+        spans = []
+        for item in ranges or []:
+            if not isinstance(item, (list, tuple)) or len(item) != 2:
+                continue
+            start, end = _safe_date(item[0]), _safe_date(item[1])
+            if start is None or end is None:
+                continue
+            spans.append((min(start, end).toordinal(), max(start, end).toordinal()))
+        spans.sort()
+        merged: list[list[int]] = []
+        for start_ord, end_ord in spans:
+            if merged and start_ord <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end_ord)
+            else:
+                merged.append([start_ord, end_ord])
+        self.starts = np.array([a for a, _ in merged], dtype=np.int64)
+        self.ends = np.array([b for _, b in merged], dtype=np.int64)
+
+    @classmethod
+    def from_ordinals(cls, starts: np.ndarray, ends: np.ndarray) -> "DateRangeMask":
+        # Rebuild an already coalesced mask without re-validating, e.g. from a worker payload.
+        mask = cls()
+        mask.starts = np.asarray(starts, dtype=np.int64)
+        mask.ends = np.asarray(ends, dtype=np.int64)
+        return mask
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def ranges(self) -> list[tuple[date, date]]:
+        return [(date.fromordinal(int(a)), date.fromordinal(int(b))) for a, b in zip(self.starts, self.ends)]
+
+    @property
+    def last_day(self) -> date | None:
+        return date.fromordinal(int(self.ends[-1])) if len(self.ends) else None
+
+    def contains(self, ordinals: np.ndarray) -> np.ndarray:
+        if len(self.starts) == 0:
+            return np.zeros(len(ordinals), dtype=bool)
+        pos = np.searchsorted(self.starts, ordinals, side="right") - 1
+        return (pos >= 0) & (ordinals <= self.ends[np.maximum(pos, 0)])
+
+    def ordinals(self) -> np.ndarray:
+        if len(self.starts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b + 1, dtype=np.int64) for a, b in zip(self.starts, self.ends)])
+
+    def with_range(self, start: date, end: date) -> list[tuple[date, date]]:
+        return DateRangeMask(self.ranges + [(start, end)]).ranges
+
+    def without_range(self, start: date, end: date) -> list[tuple[date, date]]:
+        out: list[tuple[date, date]] = []
+        for a, b in self.ranges:
+            if b < start or a > end:
+                out.append((a, b))
+                continue
+            if a < start:
+                out.append((a, start - timedelta(days=1)))
+            if b > end:
+                out.append((end + timedelta(days=1), b))
+        return out
+
+def member_leave_ranges(cfg: dict) -> list[tuple[date, date]]:
+    # Legacy payloads list single leave days; they are coalesced into ranges with any stored ranges.
+    legacy_days = [(d, d) for d in _safe_dates(cfg.get("leave_dates", []) or []) if d is not None]
+    return DateRangeMask(list(cfg.get("leave_ranges", []) or []) + legacy_days).ranges
+
+class CapacityCalendar:
+    # Working days and cumulative capacity from start_date, grown in chunks only as far as callers ask.
+    def __init__(
+        self,
+        start_date: date,
+        weekdays: set[int],
+        non_working_dates: DateRangeMask | set[date],
+        daily_hours: float,
+        unavailable_hours: dict | None = None,
+        unavailable_rules: list[dict] | None = None,
+        hours_profile: dict | None = None,
+        shutdown: DateRangeMask | None = None,
+    ):
+        self.start_date = start_date
+        self.weekdays = {int(x) for x in weekdays}
+        if not isinstance(non_working_dates, DateRangeMask):
+            non_working_dates = DateRangeMask([(d, d) for d in non_working_dates])
+        self.leave = non_working_dates
+        self.hours_profile = normalize_hours_profile(hours_profile)
+        self.shutdown = shutdown if shutdown is not None else DateRangeMask()
+        self.daily_hours = max([float(daily_hours)] + self.hours_profile.get("hours", []))
+        self.unavailable_hours = normalize_unavailable_hours(unavailable_hours, self.daily_hours)
+        self.unavailable_rules = normalize_unavailable_rules(unavailable_rules)
+        self._base_hours = np.array(self.hours_profile.get("hours", [float(daily_hours)]), dtype=np.float64)
+        self._profile_anchor = self.hours_profile["anchor"].toordinal() if self.hours_profile else 0
+        self._weekday_list = np.array(sorted(self.weekdays), dtype=np.int64)
+        unavailable_items = sorted((d.toordinal(), h) for d, h in self.unavailable_hours.items())
+        self._unavailable_ords = np.array([o for o, _ in unavailable_items], dtype=np.int64)
+        self._unavailable_vals = np.array([h for _, h in unavailable_items], dtype=np.float64)
+        self.days: list[tuple[date, float]] = []
+        self.dates: list[date] = []
+        self.segments: list[tuple[int, date, float, float]] = []
+        self.seg_dates: list[date] = []
+        self.seg_ends: list[float] = []
+        self.total_capacity = 0.0
+        self.next_day = start_date
+        self.chunk_days = CAPACITY_CHUNK_DAYS
+        irregular = [d for d in self.unavailable_hours if d >= start_date]
+        if self.leave.last_day is not None:
+            irregular.append(self.leave.last_day)
+        irregular.extend(r["start"] for r in self.unavailable_rules)
+        irregular.extend(r["end"] for r in self.unavailable_rules if r.get("end") is not None)
+        if self.shutdown.last_day is not None:
+            irregular.append(self.shutdown.last_day)
+        # Past the last leave/unavailable/shutdown day (and every rule boundary) the calendar only
+        # repeats a periodic pattern, so an empty chunk there means no capacity ever.
+        self.last_irregular_day = max(irregular + [start_date])
+
+    def _grow(self) -> None:
+        first = self.next_day.toordinal()
+        ords = np.arange(first, first + self.chunk_days, dtype=np.int64)
+        base = self._base_hours[(ords - self._profile_anchor) % len(self._base_hours)]
+        working = np.isin((ords - 1) % 7, self._weekday_list) & (base > 0)
+        working &= ~self.leave.contains(ords) & ~self.shutdown.contains(ords)
+        ords = ords[working]
+        base = base[working]
+
+        unavailable = expand_unavailable_rules(self.unavailable_rules, ords)
+        if len(self._unavailable_ords):
+            pos = np.searchsorted(self._unavailable_ords, ords)
+            pos_clip = np.minimum(pos, len(self._unavailable_ords) - 1)
+            hit = self._unavailable_ords[pos_clip] == ords
+            unavailable[hit] += self._unavailable_vals[pos_clip[hit]]
+        caps = self._day_capacity(ords, base, np.maximum(base - unavailable, 0.0))
+
+        base_idx = len(self.days)
+        dates = _ordinals_to_dates(ords)
+        self.days.extend(zip(dates, caps.tolist()))
+        self.dates.extend(dates)
+        open_idx = np.flatnonzero(caps > 1e-9)
+        if len(open_idx):
+            # Accumulate sequentially from the running total so segment bounds stay stable as chunks grow.
+            ends = np.cumsum(np.concatenate(([self.total_capacity], caps[open_idx])))
+            starts = ends[:-1].tolist()
+            ends = ends[1:].tolist()
+            self.segments.extend(
+                (base_idx + int(i), dates[i], seg_start, seg_end)
+                for i, seg_start, seg_end in zip(open_idx.tolist(), starts, ends)
+            )
+            self.seg_dates.extend(dates[i] for i in open_idx.tolist())
+            self.seg_ends.extend(ends)
+            self.total_capacity = ends[-1]
+        self.next_day = self.next_day + timedelta(days=self.chunk_days)
+        self.chunk_days = min(self.chunk_days * 2, CAPACITY_MAX_CHUNK_DAYS)
+
+    def _day_capacity(self, ords: np.ndarray, base: np.ndarray, caps: np.ndarray) -> np.ndarray:
+        return caps
+
+    def _exhausted(self, before: int, after: int) -> bool:
+        return after <= before and self.next_day > self.last_irregular_day
+
+    def extend_to_date(self, end_date: date) -> None:
+        while self.next_day <= end_date:
+            self._grow()
+
+    def extend_to_hours(self, hours: float) -> None:
+        while self.total_capacity <= hours:
+            before = len(self.segments)
+            self._grow()
+            if self._exhausted(before, len(self.segments)):
+                raise ValueError("No project capacity available for this member calendar")
+
+    def days_through(self, end_date: date) -> list[tuple[date, float]]:
+        self.extend_to_date(end_date)
+        return self.days[:bisect_right(self.dates, end_date)]
+
+    def workdays(self, count: int) -> list[tuple[date, float]]:
+        while len(self.days) < count:
+            before = len(self.days)
+            self._grow()
+            if self._exhausted(before, len(self.days)):
+                break
+        return self.days[:count]
+
+    def hours_through(self, end_date: date) -> float:
+        return float(sum(cap for _, cap in self.days_through(end_date)))
+
+    def capacity_through(self, end_date: date) -> float:
+        # Cumulative capacity at the end of end_date: the hour index where the next day's work starts.
+        self.extend_to_date(end_date)
+        pos = bisect_right(self.seg_dates, end_date)
+        return self.seg_ends[pos - 1] if pos else 0.0
+
+    def hour_to_date(self, h: float) -> date:
+        h = max(float(h), 0.0)
+        self.extend_to_hours(h)
+        return self.segments[bisect_right(self.seg_ends, h)][1]
+
+    def first_available_day(self) -> date | None:
+        try:
+            return self.hour_to_date(0.0)
+        except ValueError:
+            return None
+
+    def fit_start(self, h: float, hours: float) -> float:
+        # Where a job of the given hours can start at or after hour index h; daily capacity has no gaps.
+        return h
+
+class SlotCalendar(CapacityCalendar):
+    # Intraday variant: each working day's capacity is the free time inside the work window (from
+    # 09:00 for the day's hours without one) minus busy calendar spans, keeping only gaps of at least
+    # the minimum block and no more than the day's plain capacity. The kept slots are parallel sorted
+    # lists, wall-clock minutes since the epoch and their place on the capacity hour axis, grown with
+    # the calendar, so hour/time lookups are bisections however far the schedule reaches.
+    def __init__(self, *args, intraday: dict, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.window = intraday.get("window")
+        self.busy_starts = np.asarray(intraday["busy"][0], dtype=np.int64).tolist()
+        self.busy_ends = np.asarray(intraday["busy"][1], dtype=np.int64).tolist()
+        self.min_block = float(intraday["min_block"])
+        self.slot_starts: list[float] = []
+        self.slot_ends: list[float] = []
+        self.slot_axis_starts: list[float] = []
+        self.slot_axis_ends: list[float] = []
+        if self.busy_ends:
+            last_busy = date.fromordinal(self.busy_ends[-1] // 1440 + _EPOCH_ORDINAL)
+            self.last_irregular_day = max(self.last_irregular_day, last_busy)
+
+    def _day_capacity(self, ords: np.ndarray, base: np.ndarray, caps: np.ndarray) -> np.ndarray:
+        caps = caps.copy()
+        running = self.total_capacity
+        for i, (day_ord, base_hours, cap) in enumerate(zip(ords.tolist(), base.tolist(), caps.tolist())):
+            if cap <= 1e-9:
+                continue
+            midnight = (day_ord - _EPOCH_ORDINAL) * 1440
+            lo, hi = self.window or (INTRADAY_DAY_START_MINUTES, min(INTRADAY_DAY_START_MINUTES + base_hours * 60.0, 1440.0))
+            lo, hi = midnight + lo, midnight + hi
+            # A block longer than the whole day's capacity means the day's capacity in one piece.
+            block = min(self.min_block, cap) * 60.0 - 1e-6
+            gaps = []
+            cursor = lo
+            j = bisect_right(self.busy_ends, lo)
+            while j < len(self.busy_starts) and self.busy_starts[j] < hi:
+                if self.busy_starts[j] - cursor >= block:
+                    gaps.append((cursor, self.busy_starts[j]))
+                cursor = max(cursor, self.busy_ends[j])
+                j += 1
+            if hi - cursor >= block:
+                gaps.append((cursor, hi))
+            left = cap * 60.0
+            kept = []
+            for a, b in gaps:
+                take = min(b - a, left)
+                if take < block:
+                    break
+                kept.append((a, a + take))
+                left -= take
+            usable = sum(b - a for a, b in kept) / 60.0
+            caps[i] = usable
+            if usable <= 1e-9:
+                continue
+            # The day's last slot ends exactly where the base class puts the day's segment end.
+            day_end = running + usable
+            pos = running
+            for k, (a, b) in enumerate(kept):
+                self.slot_starts.append(a)
+                self.slot_ends.append(b)
+                self.slot_axis_starts.append(pos)
+                pos = day_end if k == len(kept) - 1 else pos + (b - a) / 60.0
+                self.slot_axis_ends.append(pos)
+            running = day_end
+        return caps
+
+    def fit_start(self, h: float, hours: float) -> float:
+        # A job starts in the current slot only if both the piece there and the piece it ends with in a
+        # later slot hold the minimum block (or the whole job when that is shorter); otherwise it tries
+        # the next slot, leaving the rest idle. Slots in between are used whole and are never shorter
+        # than the block. When no start within INTRADAY_FIT_SEARCH_SLOTS slots meets both rules, the
+        # first one whose opening piece holds the block is used.
+        hours = float(hours)
+        block = min(self.min_block, hours)
+        fallback = None
+        for _ in range(INTRADAY_FIT_SEARCH_SLOTS):
+            try:
+                self.extend_to_hours(h + hours)
+            except ValueError:
+                break
+            i = bisect_right(self.slot_axis_ends, h)
+            first = self.slot_axis_ends[i] - h
+            if first >= block - 1e-9:
+                if fallback is None:
+                    fallback = h
+                rest = hours - first
+                j = i + 1
+                while rest > 1e-9 and rest > self.slot_axis_ends[j] - self.slot_axis_starts[j] + 1e-9:
+                    rest -= self.slot_axis_ends[j] - self.slot_axis_starts[j]
+                    j += 1
+                if rest <= 1e-9 or rest >= block - 1e-9:
+                    return h
+            h = self.slot_axis_ends[i]
+        return h if fallback is None else fallback
+
+    def hour_to_datetime(self, h: float, finish: bool = False) -> datetime:
+        # Wall-clock time of hour index h; a finish hour maps to the end of the slot it completes in.
+        h = max(float(h), 0.0)
+        self.extend_to_hours(h)
+        i = bisect_right(self.slot_axis_ends, max(h - 1e-9, 0.0) if finish else h)
+        minutes = self.slot_starts[i] + (h - self.slot_axis_starts[i]) * 60.0
+        return datetime(1970, 1, 1) + timedelta(minutes=round(minutes))
+
+    def slot_pieces(self, start_hour: float, finish_hour: float) -> list[tuple[datetime, datetime]]:
+        if finish_hour <= start_hour:
+            return []
+        self.extend_to_hours(finish_hour - 1e-9)
+        first = bisect_right(self.slot_axis_ends, start_hour)
+        last = bisect_right(self.slot_axis_ends, finish_hour - 1e-9)
+        pieces = []
+        for i in range(first, last + 1):
+            a = max(start_hour, self.slot_axis_starts[i])
+            b = min(finish_hour, self.slot_axis_ends[i])
+            if b - a <= 1e-9:
+                continue
+            lo = self.slot_starts[i] + (a - self.slot_axis_starts[i]) * 60.0
+            hi = self.slot_starts[i] + (b - self.slot_axis_starts[i]) * 60.0
+            pieces.append((datetime(1970, 1, 1) + timedelta(minutes=round(lo)), datetime(1970, 1, 1) + timedelta(minutes=round(hi))))
+        return pieces
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _fast_date(value) -> date | None:
+    # Handles the shapes stored in state and payloads without pandas; returns None when unsure.
+    if isinstance(value, datetime):
+        return None if value is pd.NaT else value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+def _safe_date(value) -> date | None:
+    if value is None:
+        return None
+    fast = _fast_date(value)
+    if fast is not None:
+        return fast
+    dt = pd.to_datetime(value, errors="coerce")
+    if pd.isna(dt):
+        return None
+    return dt.date()
+
+def _safe_dates(values) -> list[date | None]:
+    out: list[date | None] = []
+    odd_positions: list[int] = []
+    odd_values: list = []
+    for v in values:
+        fast = None if v is None else _fast_date(v)
+        if fast is None and v is not None:
+            odd_positions.append(len(out))
+            odd_values.append(v)
+        out.append(fast)
+    if odd_values:
+        # One pandas call for every value the fast path could not read.
+        parsed = pd.to_datetime(pd.Series(odd_values, dtype=object).astype(str), errors="coerce", format="mixed")
+        for pos, value in zip(odd_positions, parsed):
+            out[pos] = None if pd.isna(value) else value.date()
+    return out
+
+def _safe_date_hours(raw: dict | None) -> dict[date, float]:
+    if not raw:
+        return {}
+    out: dict[date, float] = {}
+    keys = list(raw.keys())
+    for kd, k in zip(_safe_dates(keys), keys):
+        if kd is None:
+            continue
+        try:
+            hv = float(raw[k])
+        except Exception:
+            continue
+        if hv > 0:
+            out[kd] = hv
+    return out
+
+def _safe_datetime(value) -> datetime | None:
+    if isinstance(value, str) and len(value) >= 19 and value[10] == "T":
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = None
+        if parsed is not None:
+            return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+    dt = pd.to_datetime(value, errors="coerce", utc=True)
+    if pd.isna(dt):
+        return None
+    return dt.to_pydatetime()
+
+def _safe_int(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except Exception:
+        return int(default)
+
+def _safe_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except Exception:
+        return float(default)
+
+def get_effective_unavailable_hours(cfg: dict, daily_hours: float) -> dict[date, float]:
+    manual_map = normalize_unavailable_hours(cfg.get("unavailable_hours", {}), daily_hours)
+    # In intraday mode the busy spans themselves shape each day, so the daily totals are not subtracted too.
+    if normalize_intraday(cfg.get("intraday"))["enabled"]:
+        calendar_map = {}
+    else:
+        calendar_map = normalize_unavailable_hours(cfg.get("calendar_unavailable_hours", {}), daily_hours)
+    out: dict[date, float] = {}
+    for d in set(list(manual_map.keys()) + list(calendar_map.keys())):
+        total = float(manual_map.get(d, 0.0)) + float(calendar_map.get(d, 0.0))
+        if total > 0:
+            out[d] = min(float(daily_hours), total)
+    return out
+
+def build_member_calendar(
+    cfg: dict,
+    daily_hours: float,
+    start_date: date,
+    shutdown: DateRangeMask | None = None,
+) -> CapacityCalendar:
+    args = (start_date, cfg["weekdays"], DateRangeMask(cfg["leave_ranges"]), daily_hours)
+    kwargs = {
+        "unavailable_hours": get_effective_unavailable_hours(cfg, daily_hours),
+        "unavailable_rules": cfg.get("unavailable_rules", []),
+        "hours_profile": cfg.get("hours_profile"),
+        "shutdown": shutdown,
+    }
+    intraday = intraday_inputs(cfg)
+    if intraday is not None:
+        return SlotCalendar(*args, intraday=intraday, **kwargs)
+    return CapacityCalendar(*args, **kwargs)
+
+def _default_member_settings(members: list[str]) -> dict:
+    out = {}
+    for m in members:
+        out[m] = {
+            "weekdays": {0, 1, 2, 3, 4},
+            "leave_ranges": [],
+            "start_date": date.today(),
+            "unavailable_hours": {},
+            "calendar_unavailable_hours": {},
+            "calendar_work_window": [],
+            "unavailable_rules": [],
+            "hours_profile": {},
+            "sequencing": dict(DEFAULT_SEQUENCING),
+            "calendar_busy": [],
+            "intraday": dict(DEFAULT_INTRADAY),
+        }
+    return out
+
+def _normalize_team_df(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
+        return pd.DataFrame(DEFAULT_TEAM_ROWS)
+    out = df.copy()
+    if "Member" not in out.columns:
+        out["Member"] = None
+    if "Daily hours" not in out.columns:
+        out["Daily hours"] = None
+    out = out[["Member", "Daily hours"]]
+    out = out.dropna(subset=["Member", "Daily hours"], how="any")
+    out = out[out["Member"].astype(str).str.len() > 0]
+    out["Daily hours"] = pd.to_numeric(out["Daily hours"], errors="coerce")
+    out = out[out["Daily hours"] >= 1.0]
+    out = out.reset_index(drop=True)
+    return out if not out.empty else pd.DataFrame(DEFAULT_TEAM_ROWS)
+
+def _serialize_member_settings(cfg: dict) -> dict:
+    weekdays = sorted([int(x) for x in cfg.get("weekdays", {0, 1, 2, 3, 4})])
+    leave_ranges = [[a.isoformat(), b.isoformat()] for a, b in member_leave_ranges(cfg)]
+    unavailable_hours = {d.isoformat(): h for d, h in _safe_date_hours(cfg.get("unavailable_hours", {})).items()}
+    calendar_unavailable_hours = {d.isoformat(): h for d, h in _safe_date_hours(cfg.get("calendar_unavailable_hours", {})).items()}
+    start = _safe_date(cfg.get("start_date", date.today()))
+    intraday = normalize_intraday(cfg.get("intraday"))
+    # Busy spans only shape intraday schedules, so other members keep them out of saved plans and digests.
+    busy = normalize_busy_spans(cfg.get("calendar_busy")) if intraday["enabled"] else []
+    return {
+        "weekdays": weekdays,
+        "leave_ranges": leave_ranges,
+        "start_date": date.today().isoformat() if start is None else start.isoformat(),
+        "unavailable_hours": unavailable_hours,
+        "calendar_unavailable_hours": calendar_unavailable_hours,
+        "calendar_work_window": list(cfg.get("calendar_work_window", []) or []) if parse_work_window(cfg.get("calendar_work_window")) else [],
+        "unavailable_rules": [
+            {k: (v.isoformat() if isinstance(v, date) else v) for k, v in rule.items()}
+            for rule in normalize_unavailable_rules(cfg.get("unavailable_rules", []))
+        ],
+        "hours_profile": {k: (v.isoformat() if isinstance(v, date) else v) for k, v in normalize_hours_profile(cfg.get("hours_profile")).items()},
+        "sequencing": normalize_sequencing(cfg.get("sequencing")),
+        "calendar_busy": [[a.isoformat(timespec="minutes"), b.isoformat(timespec="minutes")] for a, b in busy],
+        "intraday": intraday,
+    }
+
+def parse_member_settings(incoming, members: list[str]) -> dict:
+    defaults = _default_member_settings(members)
+    loaded = {}
+    if isinstance(incoming, dict):
+        for m in members:
+            cfg = incoming.get(m, {})
+            weekdays_raw = cfg.get("weekdays", [0, 1, 2, 3, 4])
+            weekdays = set()
+            for w in weekdays_raw:
+                try:
+                    wi = int(w)
+                except Exception:
+                    continue
+                if 0 <= wi <= 6:
+                    weekdays.add(wi)
+            if len(weekdays) == 0:
+                weekdays = {0, 1, 2, 3, 4}
+            leave_ranges = member_leave_ranges(cfg)
+            unavailable_hours = _safe_date_hours(cfg.get("unavailable_hours", {}))
+            calendar_unavailable_hours = _safe_date_hours(cfg.get("calendar_unavailable_hours", {}))
+            start = _safe_date(cfg.get("start_date"))
+            loaded[m] = {
+                "weekdays": weekdays,
+                "leave_ranges": leave_ranges,
+                "start_date": date.today() if start is None else start,
+                "unavailable_hours": unavailable_hours,
+                "calendar_unavailable_hours": calendar_unavailable_hours,
+                "calendar_work_window": list(cfg.get("calendar_work_window", [])) if parse_work_window(cfg.get("calendar_work_window")) else [],
+                "unavailable_rules": normalize_unavailable_rules(cfg.get("unavailable_rules", [])),
+                "hours_profile": normalize_hours_profile(cfg.get("hours_profile")),
+                "sequencing": normalize_sequencing(cfg.get("sequencing")),
+                "calendar_busy": normalize_busy_spans(cfg.get("calendar_busy")),
+                "intraday": normalize_intraday(cfg.get("intraday")),
+            }
+    for m in members:
+        if m not in loaded:
+            loaded[m] = defaults[m]
+    return loaded
+
+def parse_state_payload(payload: dict) -> dict:
+    # The parts of a saved payload the engine needs, validated the same way the app loads them.
+    team = _normalize_team_df(pd.DataFrame(payload.get("team", DEFAULT_TEAM_ROWS)))
+    members = team["Member"].astype(str).tolist()
+    jobs = normalize_active_priorities(clean_jobs_df(pd.DataFrame(payload.get("jobs_raw", DEFAULT_JOBS_ROWS))))
+    shared = normalize_shared_jobs(payload.get("shared_jobs"))
+    if shared and not jobs.empty:
+        # The app saves shares already applied; a hand-edited payload gets them applied here.
+        parts = {str(m): part.reset_index(drop=True) for m, part in jobs.groupby("Assignee", sort=False, observed=True)}
+        parts.update(apply_job_shares(parts, shared))
+        jobs = apply_job_dtypes(pd.concat(list(parts.values()), ignore_index=True))
+    return {
+        "team": team,
+        "jobs": jobs,
+        "member_settings": parse_member_settings(payload.get("member_settings", {}), members),
+        "team_shutdowns": DateRangeMask(payload.get("team_shutdowns", [])).ranges,
+        "estimate_ranges": normalize_estimate_ranges(payload.get("estimate_ranges")),
+        "dependencies": normalize_dependencies(payload.get("dependencies")),
+        "shared_jobs": shared,
+    }
+
+_SNAPSHOT_ARRAY_FIELDS = ("leave_dates", "leave_ranges", "unavailable_hours", "calendar_unavailable_hours", "calendar_busy")
+
+def encode_state_snapshot(payload: dict, compress: bool = True) -> bytes:
+    # Layout: magic | version u8 | flags u8 | body, where body (zlib-compressed when flags & 1) is
+    # header length u32 | JSON header | raw little-endian arrays listed in header["arrays"].
+    jobs = [j for j in payload.get("jobs_raw", []) if isinstance(j, dict)]
+    settings = payload.get("member_settings", {}) if isinstance(payload.get("member_settings"), dict) else {}
+    members = [str(m) for m in settings.keys()]
+
+    assignees = sorted({str(j.get("Assignee", "")) for j in jobs})
+    assignee_idx = {a: i for i, a in enumerate(assignees)}
+    dues = _safe_dates([j.get("Due date") for j in jobs])
+    arrays: dict[str, np.ndarray] = {
+        "job_hours": np.array([_safe_float(j.get("Required hours", 0.0)) for j in jobs], dtype="<f8"),
+        "job_priority": np.array([_safe_int(j.get("Priority", 0)) for j in jobs], dtype="<i4"),
+        "job_assignee": np.array([assignee_idx[str(j.get("Assignee", ""))] for j in jobs], dtype="<i4"),
+        "job_due": np.array([0 if d is None else d.toordinal() for d in dues], dtype="<i4"),
+    }
+
+    for field in ("unavailable_hours", "calendar_unavailable_hours"):
+        days: list[int] = []
+        hours: list[float] = []
+        offsets = [0]
+        for m in members:
+            for d, h in sorted(_safe_date_hours(settings[m].get(field, {})).items()):
+                days.append(d.toordinal())
+                hours.append(h)
+            offsets.append(len(days))
+        arrays[f"{field}_days"] = np.array(days, dtype="<i4")
+        arrays[f"{field}_hours"] = np.array(hours, dtype="<f4")
+        arrays[f"{field}_offsets"] = np.array(offsets, dtype="<i8")
+
+    busy_chunks = [busy_span_minutes(settings[m].get("calendar_busy")) for m in members]
+    arrays["calendar_busy_start"] = np.concatenate([a for a, _ in busy_chunks] + [np.zeros(0, dtype=np.int64)]).astype("<i8")
+    arrays["calendar_busy_end"] = np.concatenate([b for _, b in busy_chunks] + [np.zeros(0, dtype=np.int64)]).astype("<i8")
+    arrays["calendar_busy_offsets"] = np.cumsum([0] + [len(a) for a, _ in busy_chunks]).astype("<i8")
+
+    leave_base: list[int] = []
+    leave_len: list[int] = []
+    leave_chunks: list[np.ndarray] = []
+    leave_offsets = [0]
+    for m in members:
+        ords = DateRangeMask(member_leave_ranges(settings[m])).ordinals()
+        if len(ords) == 0:
+            leave_base.append(0)
+            leave_len.append(0)
+            packed = np.zeros(0, dtype=np.uint8)
+        else:
+            bits = np.zeros(int(ords[-1] - ords[0]) + 1, dtype=bool)
+            bits[ords - ords[0]] = True
+            leave_base.append(int(ords[0]))
+            leave_len.append(len(bits))
+            packed = np.packbits(bits)
+        leave_chunks.append(packed)
+        leave_offsets.append(leave_offsets[-1] + len(packed))
+    arrays["leave_base"] = np.array(leave_base, dtype="<i4")
+    arrays["leave_len"] = np.array(leave_len, dtype="<i4")
+    arrays["leave_bits"] = np.concatenate(leave_chunks) if leave_chunks else np.zeros(0, dtype=np.uint8)
+    arrays["leave_offsets"] = np.array(leave_offsets, dtype="<i8")
+
+    directory = {}
+    blobs = []
+    offset = 0
+    for name, arr in arrays.items():
+        raw = np.ascontiguousarray(arr).tobytes()
+        directory[name] = [arr.dtype.str, offset, len(raw)]
+        blobs.append(raw)
+        offset += len(raw)
+    header = {
+        "team": payload.get("team", []),
+        "members": members,
+        "member_meta": {m: {k: v for k, v in settings[m].items() if k not in _SNAPSHOT_ARRAY_FIELDS} for m in members},
+        "job_names": [str(j.get("Job name", "")) for j in jobs],
+        "job_notes": [str(j.get("Notes", "")) for j in jobs],
+        "assignees": assignees,
+        "extra": {k: v for k, v in payload.items() if k not in {"team", "jobs_raw", "member_settings"}},
+        "arrays": directory,
+    }
+    header_raw = json.dumps(header, separators=(",", ":"), default=str).encode("utf-8")
+    body = len(header_raw).to_bytes(4, "little") + header_raw + b"".join(blobs)
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= 1
+    return STATE_SNAPSHOT_MAGIC + bytes([STATE_SNAPSHOT_VERSION, flags]) + body
+
+def decode_state_snapshot(data: bytes) -> dict:
+    if not data.startswith(STATE_SNAPSHOT_MAGIC) or len(data) < len(STATE_SNAPSHOT_MAGIC) + 2:
+        raise ValueError("Not a resourcing snapshot file.")
+    version = data[len(STATE_SNAPSHOT_MAGIC)]
+    flags = data[len(STATE_SNAPSHOT_MAGIC) + 1]
+    if version > STATE_SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot format version {version} is newer than this app supports.")
+    body = data[len(STATE_SNAPSHOT_MAGIC) + 2:]
+    if flags & 1:
+        body = zlib.decompress(body)
+    header_len = int.from_bytes(body[:4], "little")
+    header = json.loads(body[4:4 + header_len].decode("utf-8"))
+    blob = memoryview(body)[4 + header_len:]
+    arrays = {
+        name: np.frombuffer(blob[offset:offset + length], dtype=np.dtype(dtype_str))
+        for name, (dtype_str, offset, length) in header["arrays"].items()
+    }
+
+    assignees = header["assignees"]
+    due_ords = arrays["job_due"]
+    due_dates = _ordinals_to_dates(np.where(due_ords > 0, due_ords, _EPOCH_ORDINAL))
+    jobs = [
+        {
+            "Job name": name,
+            "Required hours": hours,
+            "Priority": priority,
+            "Assignee": assignees[assignee],
+            "Due date": due if due_ord > 0 else None,
+            "Notes": notes,
+        }
+        for name, hours, priority, assignee, due, due_ord, notes in zip(
+            header["job_names"],
+            arrays["job_hours"].tolist(),
+            arrays["job_priority"].tolist(),
+            arrays["job_assignee"].tolist(),
+            due_dates,
+            due_ords.tolist(),
+            header["job_notes"],
+        )
+    ]
+
+    settings = {}
+    for i, m in enumerate(header["members"]):
+        cfg = dict(header["member_meta"].get(m, {}))
+        for field in ("unavailable_hours", "calendar_unavailable_hours"):
+            lo, hi = int(arrays[f"{field}_offsets"][i]), int(arrays[f"{field}_offsets"][i + 1])
+            days = _ordinals_to_dates(arrays[f"{field}_days"][lo:hi])
+            cfg[field] = dict(zip(days, arrays[f"{field}_hours"][lo:hi].astype(float).tolist()))
+        if "calendar_busy_offsets" in arrays:
+            lo, hi = int(arrays["calendar_busy_offsets"][i]), int(arrays["calendar_busy_offsets"][i + 1])
+            epoch = datetime(1970, 1, 1)
+            cfg["calendar_busy"] = [
+                [(epoch + timedelta(minutes=a)).isoformat(timespec="minutes"), (epoch + timedelta(minutes=b)).isoformat(timespec="minutes")]
+                for a, b in zip(arrays["calendar_busy_start"][lo:hi].tolist(), arrays["calendar_busy_end"][lo:hi].tolist())
+            ]
+        lo, hi = int(arrays["leave_offsets"][i]), int(arrays["leave_offsets"][i + 1])
+        n_bits = int(arrays["leave_len"][i])
+        if n_bits > 0:
+            bits = np.unpackbits(arrays["leave_bits"][lo:hi], count=n_bits).astype(np.int8)
+            # Runs of set bits become [start, end] leave ranges.
+            edges = np.diff(np.concatenate(([0], bits, [0])))
+            run_starts = np.flatnonzero(edges == 1) + int(arrays["leave_base"][i])
+            run_ends = np.flatnonzero(edges == -1) - 1 + int(arrays["leave_base"][i])
+            cfg["leave_ranges"] = list(zip(_ordinals_to_dates(run_starts), _ordinals_to_dates(run_ends)))
+        else:
+            cfg["leave_ranges"] = []
+        settings[m] = cfg
+
+    payload = dict(header.get("extra", {}))
+    payload["team"] = header["team"]
+    payload["jobs_raw"] = jobs
+    payload["member_settings"] = settings
+    return payload
+
+def load_state_snapshot_bytes(data: bytes) -> dict:
+    if data.startswith(STATE_SNAPSHOT_MAGIC):
+        return decode_state_snapshot(data)
+    payload = json.loads(data.decode("utf-8"))
+    if not isinstance(payload, dict):
+        raise ValueError("Snapshot JSON must be an object.")
+    return payload
+
+def _payload_digest(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def parse_work_window(raw) -> tuple[datetime, datetime] | None:
+    # Member working-hours window for calendar mapping, stored as ["HH:MM", "HH:MM"]; empty means the whole day.
+    if not isinstance(raw, (list, tuple)) or len(raw) != 2:
+        return None
+    try:
+        start_t = datetime.strptime(str(raw[0]).strip()[:5], "%H:%M")
+        end_t = datetime.strptime(str(raw[1]).strip()[:5], "%H:%M")
+    except ValueError:
+        return None
+    if end_t <= start_t:
+        return None
+    return start_t, end_t
+
+def normalize_busy_spans(raw) -> list[tuple[datetime, datetime]]:
+    # Busy calendar time as sorted, merged [start, end) spans in the calendar's local wall-clock time.
+    spans = []
+    for item in raw or []:
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            continue
+        pair = []
+        for value in item:
+            if isinstance(value, str):
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    value = None
+            pair.append(value.replace(tzinfo=None, second=0, microsecond=0) if isinstance(value, datetime) else None)
+        if pair[0] is not None and pair[1] is not None and pair[1] > pair[0]:
+            spans.append((pair[0], pair[1]))
+    spans.sort()
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def busy_span_minutes(spans) -> tuple[np.ndarray, np.ndarray]:
+    # Normalized busy spans as start and end minutes since the epoch, the form calendars and tasks carry.
+    epoch = datetime(1970, 1, 1)
+    merged = normalize_busy_spans(spans)
+    return (
+        np.array([(a - epoch) // timedelta(minutes=1) for a, _ in merged], dtype=np.int64),
+        np.array([(b - epoch) // timedelta(minutes=1) for _, b in merged], dtype=np.int64),
+    )
+
+def intraday_inputs(cfg: dict) -> dict | None:
+    # SlotCalendar inputs for a member in intraday mode; None keeps the plain daily calendar.
+    mode = normalize_intraday(cfg.get("intraday"))
+    if not mode["enabled"]:
+        return None
+    window = parse_work_window(cfg.get("calendar_work_window"))
+    return {
+        "window": None if window is None else tuple(float(t.hour * 60 + t.minute) for t in window),
+        "busy": busy_span_minutes(cfg.get("calendar_busy")),
+        "min_block": mode["min_block_hours"],
+    }
+
+def normalize_active_priorities(jobs: pd.DataFrame) -> pd.DataFrame:
+    if jobs.empty:
+        return jobs
+
+    dtypes = jobs.dtypes.to_dict()
+    jobs = jobs.copy()
+    jobs["Priority"] = pd.to_numeric(jobs["Priority"], errors="coerce").fillna(0).astype(int)
+
+    active = jobs[jobs["Priority"] >= 1].copy()
+    hold = jobs[jobs["Priority"] == 0].copy()
+
+    if not active.empty:
+        # Insert each member's rows at their requested position in table order, working on row
+        # positions so large tables reorder with a single take instead of rebuilding rows.
+        by_member: dict[str, list[int]] = {}
+        for pos, (member, p) in enumerate(zip(active["Assignee"].astype(str).tolist(), active["Priority"].tolist())):
+            ordered = by_member.setdefault(member, [])
+            idx = max(int(p), 1) - 1
+            if idx >= len(ordered):
+                ordered.append(pos)
+            else:
+                ordered.insert(idx, pos)
+        order = [pos for ordered in by_member.values() for pos in ordered]
+        priorities = [rank for ordered in by_member.values() for rank in range(1, len(ordered) + 1)]
+        active = active.iloc[order].reset_index(drop=True)
+        active["Priority"] = priorities
+
+    if not hold.empty:
+        hold = hold.reset_index(drop=True)
+
+    out = pd.concat([active, hold], ignore_index=True)
+    # Priority was widened above; restore the input dtypes.
+    return out.astype({c: t for c, t in dtypes.items() if c in out.columns})
+
+def _capacity_segments(capacity_days: list[tuple[date, float]]) -> tuple[list[tuple[int, date, float, float]], float]:
+    segments: list[tuple[int, date, float, float]] = []
+    running = 0.0
+    for day_idx, (d, cap) in enumerate(capacity_days):
+        cap_val = float(cap)
+        if cap_val <= 1e-9:
+            continue
+        seg_start = running
+        running = running + cap_val
+        segments.append((day_idx, d, seg_start, running))
+    return segments, running
+
+def capacity_through_days(calendar: CapacityCalendar, due_ords: np.ndarray) -> np.ndarray:
+    # due_cutoff_hours for many due day ordinals at once; 0 for undated jobs (ordinal 0).
+    if len(due_ords) == 0 or due_ords.max() <= 0:
+        return np.zeros(len(due_ords), dtype=np.float64)
+    calendar.extend_to_date(date.fromordinal(int(due_ords.max())))
+    if len(calendar.days) == 0:
+        return np.zeros(len(due_ords), dtype=np.float64)
+    day_ords = np.array([d.toordinal() for d in calendar.dates], dtype=np.int64)
+    cum_capacity = np.cumsum([cap for _, cap in calendar.days], dtype=np.float64)
+    idx = np.searchsorted(day_ords, due_ords, side="right")
+    return np.where(idx > 0, cum_capacity[np.maximum(idx - 1, 0)], 0.0)
+
+def sequence_rows(arrays: dict[str, np.ndarray], rows: np.ndarray, sequencing: dict | None, calendar: CapacityCalendar | None) -> np.ndarray:
+    # Dispatch order of active job rows under a sequencing policy. Priority order is the plain
+    # (Priority, Job name) sort. The due-aware policies pop jobs off a heap keyed by urgency, with
+    # undated jobs after dated ones and (Priority, Job name) breaking ties:
+    # - edf: due day.
+    # - least_slack: capacity through the due day minus the job's hours. Capacity already used is the
+    #   same for every waiting job, so scoring once gives the same order as re-scoring at each dispatch.
+    # - weighted: the job's rank in priority order and in slack order, scaled to 0..1 and blended by due_weight.
+    sequencing = normalize_sequencing(sequencing)
+    priority = arrays["priority"][rows]
+    name_rank = arrays["name_rank"][rows]
+    if sequencing["policy"] == "priority" or len(rows) < 2:
+        return rows[np.lexsort((name_rank, priority))]
+    due = arrays["due"][rows]
+    undated = due <= 0
+    if sequencing["policy"] == "edf":
+        urgency = due.astype(np.float64)
+    else:
+        urgency = capacity_through_days(calendar, due) - arrays["hours"][rows]
+        if sequencing["policy"] == "weighted":
+            scale = np.arange(len(rows), dtype=np.float64) / (len(rows) - 1)
+            priority_rank = np.empty(len(rows))
+            priority_rank[np.lexsort((name_rank, priority))] = scale
+            slack_rank = np.empty(len(rows))
+            slack_rank[np.lexsort((name_rank, priority, urgency, undated))] = scale
+            weight = sequencing["due_weight"]
+            urgency = (1.0 - weight) * priority_rank + weight * slack_rank
+            undated = np.zeros(len(rows), dtype=bool)
+    heap = list(zip(undated.tolist(), urgency.tolist(), priority.tolist(), name_rank.tolist(), rows.tolist()))
+    heapq.heapify(heap)
+    return np.array([heapq.heappop(heap)[-1] for _ in range(len(heap))], dtype=rows.dtype)
+
+def schedule_queue_order(df: pd.DataFrame, sequencing: dict | None = None, calendar: CapacityCalendar | None = None) -> pd.DataFrame:
+    if normalize_sequencing(sequencing)["policy"] == "priority":
+        return df.sort_values(["Priority", "Job name"], ascending=[True, True]).reset_index(drop=True)
+    # On-hold rows of a backlog_queue frame stay after the sequenced active work, in backlog order.
+    held = (df["Status"] == "On hold").to_numpy() if "Status" in df.columns else np.zeros(len(df), dtype=bool)
+    arrays = job_arrays(df)
+    tail = np.flatnonzero(held)
+    tail = tail[np.lexsort((arrays["name_rank"][tail], arrays["priority"][tail]))]
+    order = np.concatenate([sequence_rows(arrays, np.flatnonzero(~held), sequencing, calendar), tail])
+    return df.take(order).reset_index(drop=True)
+
+def queue_hour_bounds(hours: list[float], calendar: CapacityCalendar | None = None) -> tuple[list[float], list[float]]:
+    start_hour_index = []
+    finish_hour_index = []
+    running = 0.0
+    for hrs in hours:
+        if calendar is not None:
+            running = calendar.fit_start(running, float(hrs))
+        start_hour_index.append(running)
+        running = running + float(hrs)
+        finish_hour_index.append(running)
+    return start_hour_index, finish_hour_index
+
+def queue_dates(
+    calendar: CapacityCalendar,
+    start_hour_index: list[float],
+    finish_hour_index: list[float],
+) -> tuple[list[date], list[date]]:
+    if len(calendar.workdays(1)) == 0:
+        raise ValueError("No working days available for this member calendar")
+    # Grow the calendar once to cover the whole queue before mapping hours to dates.
+    calendar.extend_to_hours(max(finish_hour_index, default=0.0))
+    hour_index_to_date = calendar.hour_to_date
+
+    def finish_hour_to_date(h: float) -> date:
+        eps = 1e-9
+        return hour_index_to_date(max(h - eps, 0.0))
+
+    return [hour_index_to_date(h) for h in start_hour_index], [finish_hour_to_date(h) for h in finish_hour_index]
+
+def schedule_member_jobs(
+    df_member_active: pd.DataFrame,
+    start_date: date,
+    daily_hours: float,
+    weekdays: set[int],
+    non_working_dates: DateRangeMask | set[date],
+    unavailable_hours: dict | None = None,
+    calendar: CapacityCalendar | None = None,
+    unavailable_rules: list[dict] | None = None,
+    sequencing: dict | None = None,
+) -> pd.DataFrame:
+    if calendar is None:
+        calendar = CapacityCalendar(
+            start_date,
+            weekdays,
+            non_working_dates,
+            daily_hours,
+            unavailable_hours=unavailable_hours,
+            unavailable_rules=unavailable_rules,
+        )
+    df = schedule_queue_order(df_member_active, sequencing, calendar)
+
+    start_hour_index, finish_hour_index = queue_hour_bounds(job_hours(df["Required hours"]), calendar)
+    df["Start hour index"] = start_hour_index
+    df["Finish hour index"] = finish_hour_index
+    df["Start date"], df["Finish date"] = queue_dates(calendar, start_hour_index, finish_hour_index)
+    return df
+
+def allocate_member_hours(
+    schedule_df: pd.DataFrame,
+    start_date: date,
+    daily_hours: float,
+    weekdays: set[int],
+    non_working_dates: DateRangeMask | set[date],
+    horizon_workdays: int = 20,
+    unavailable_hours: dict | None = None,
+    unavailable_rules: list[dict] | None = None,
+    calendar: CapacityCalendar | None = None,
+) -> pd.DataFrame:
+    if calendar is None:
+        calendar = CapacityCalendar(
+            start_date,
+            weekdays,
+            non_working_dates,
+            daily_hours,
+            unavailable_hours=unavailable_hours,
+            unavailable_rules=unavailable_rules,
+        )
+    capacity_days = calendar.workdays(max(horizon_workdays, 1))
+    alloc = pd.DataFrame({"Date": [d for d, _ in capacity_days]})
+    if len(capacity_days) == 0:
+        alloc["Allocated hours"] = []
+        alloc["Free hours"] = []
+        return alloc
+    capacity_vals = [float(c) for _, c in capacity_days]
+    alloc["Allocated hours"] = 0.0
+    segments, total_capacity = _capacity_segments(capacity_days)
+    seg_ends = [seg_end for _, _, _, seg_end in segments]
+
+    if schedule_df is None or schedule_df.empty:
+        alloc["Free hours"] = capacity_vals
+        return alloc
+
+    allocated = [0.0] * len(capacity_days)
+    for sh, fh in zip(schedule_df["Start hour index"].tolist(), schedule_df["Finish hour index"].tolist()):
+        if len(segments) == 0:
+            break
+        sh = float(sh)
+        fh = float(fh)
+        if fh <= 0 or sh >= total_capacity:
+            continue
+        sh_clip = max(0.0, sh)
+        fh_clip = min(fh, total_capacity)
+        if fh_clip <= sh_clip:
+            continue
+
+        start_seg = bisect_right(seg_ends, sh_clip)
+        end_seg = bisect_right(seg_ends, max(fh_clip - 1e-9, 0.0))
+        if start_seg >= len(segments):
+            continue
+        if end_seg >= len(segments):
+            end_seg = len(segments) - 1
+
+        for seg_pos in range(start_seg, end_seg + 1):
+            day_idx, _, seg_start, seg_end = segments[seg_pos]
+            overlap = max(0.0, min(fh_clip, seg_end) - max(sh_clip, seg_start))
+            if overlap <= 0.0:
+                continue
+            allocated[day_idx] += overlap
+
+    alloc["Allocated hours"] = allocated
+    alloc["Free hours"] = (pd.Series(capacity_vals) - alloc["Allocated hours"]).clip(lower=0.0)
+    return alloc
+
+def build_day_job_details(
+    schedule_df: pd.DataFrame,
+    start_date: date,
+    daily_hours: float,
+    weekdays: set[int],
+    non_working_dates: DateRangeMask | set[date],
+    horizon_workdays: int = 20,
+    unavailable_hours: dict | None = None,
+    unavailable_rules: list[dict] | None = None,
+    calendar: CapacityCalendar | None = None,
+    shared: dict | None = None,
+) -> dict[date, list[str]]:
+    if calendar is None:
+        calendar = CapacityCalendar(
+            start_date,
+            weekdays,
+            non_working_dates,
+            daily_hours,
+            unavailable_hours=unavailable_hours,
+            unavailable_rules=unavailable_rules,
+        )
+    capacity_days = calendar.workdays(max(horizon_workdays, 1))
+    day_jobs = {d: [] for d, _ in capacity_days}
+
+    if schedule_df is None or schedule_df.empty:
+        return day_jobs
+
+    segments, total_capacity = _capacity_segments(capacity_days)
+    seg_ends = [seg_end for _, _, _, seg_end in segments]
+
+    for _, row in schedule_df.iterrows():
+        if len(segments) == 0:
+            break
+        sh = float(row["Start hour index"])
+        fh = float(row["Finish hour index"])
+        if fh <= 0 or sh >= total_capacity:
+            continue
+        sh_clip = max(0.0, sh)
+        fh_clip = min(fh, total_capacity)
+        if fh_clip <= sh_clip:
+            continue
+        start_seg = bisect_right(seg_ends, sh_clip)
+        end_seg = bisect_right(seg_ends, max(fh_clip - 1e-9, 0.0))
+        if start_seg >= len(segments):
+            continue
+        if end_seg >= len(segments):
+            end_seg = len(segments) - 1
+        job_name = str(row.get("Job name", "")).strip()
+        partners = [m for m in (shared or {}).get(job_name, {}).get("shares", {}) if m != str(row.get("Assignee", ""))]
+        for seg_pos in range(start_seg, end_seg + 1):
+            _, seg_date, seg_start, seg_end = segments[seg_pos]
+            overlap = max(0.0, min(fh_clip, seg_end) - max(sh_clip, seg_start))
+            if overlap <= 0:
+                continue
+            name = job_name if job_name else "Unnamed job"
+            with_note = f", shared with {', '.join(partners)}" if partners else ""
+            day_jobs[seg_date].append(f"{name} ({overlap:.1f}h{with_note})")
+    return day_jobs
+
+def job_time_slots(schedule_df: pd.DataFrame | None, calendar: CapacityCalendar) -> pd.DataFrame:
+    # One row per piece of work in an intraday schedule: the wall-clock span of a slot a job fills, and
+    # which of the job's pieces it is, so a job that could not be done in one block shows as split.
+    cols = ["Date", "From", "To", "Hours", "Job name", "Part"]
+    if schedule_df is None or schedule_df.empty or not isinstance(calendar, SlotCalendar):
+        return pd.DataFrame(columns=cols)
+    rows = []
+    for name, sh, fh in zip(
+        schedule_df["Job name"].astype(str).tolist(),
+        schedule_df["Start hour index"].tolist(),
+        schedule_df["Finish hour index"].tolist(),
+    ):
+        pieces = calendar.slot_pieces(float(sh), float(fh))
+        for k, (a, b) in enumerate(pieces, start=1):
+            to = "24:00" if b.date() > a.date() else b.strftime("%H:%M")
+            rows.append((a.date(), a.strftime("%H:%M"), to, round((b - a) / timedelta(hours=1), 2), name, f"{k} of {len(pieces)}"))
+    return pd.DataFrame(rows, columns=cols)
+
+def ordinal_day(n: int) -> str:
+    if 10 <= n % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+def add_months(d: date, months: int) -> date:
+    m = d.month - 1 + months
+    y = d.year + m // 12
+    m = m % 12 + 1
+    return date(y, m, 1)
+
+def month_end(d: date) -> date:
+    return add_months(month_start(d), 1) - timedelta(days=1)
+
+def due_cutoff_hours(due_date: date, calendar: CapacityCalendar) -> float:
+    # Capacity available up to and including due_date, based on member calendar.
+    return calendar.hours_through(due_date)
+
+def empty_jobs_df() -> pd.DataFrame:
+    return pd.DataFrame(columns=JOB_COLS).astype(JOB_DTYPES)
+
+def apply_job_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    # Cast an already validated table to the canonical dtypes; concat and row rebuilds drop them.
+    out = df.astype(JOB_DTYPES)
+    out["Assignee"] = out["Assignee"].cat.remove_unused_categories()
+    return out
+
+def clean_jobs_df(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
+        return empty_jobs_df()
+
+    df = df.copy()
+    for c in JOB_COLS:
+        if c not in df.columns:
+            df[c] = None
+    df = df[JOB_COLS]
+
+    df = df.dropna(subset=["Job name", "Required hours", "Priority", "Assignee"], how="any")
+    df = df[df["Job name"].astype(str).str.len() > 0]
+
+    df["Required hours"] = pd.to_numeric(df["Required hours"], errors="coerce")
+    df = df[df["Required hours"] >= 0]
+
+    df["Job name"] = df["Job name"].astype(str)
+    df["Priority"] = pd.to_numeric(df["Priority"], errors="coerce").fillna(0).astype(int)
+    df["Assignee"] = df["Assignee"].astype(str)
+
+    df["Due date"] = pd.to_datetime(df["Due date"], errors="coerce")
+    df["Notes"] = df["Notes"].astype(str).replace({"nan": "", "None": "", "<NA>": ""})
+
+    return apply_job_dtypes(df.reset_index(drop=True))
+
+def job_hours(values: pd.Series) -> list[float]:
+    # Stored hours are float32; round on the way out so 0.7 + 7.3 still lands on a day boundary.
+    return np.round(values.to_numpy(dtype=float), JOB_HOURS_DECIMALS).tolist()
+
+def add_status_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["Status"] = np.where(pd.to_numeric(df["Priority"]).to_numpy() >= 1, "Active", "On hold")
+    return df
+
+def backlog_queue(active: pd.DataFrame, hold: pd.DataFrame) -> pd.DataFrame:
+    # On-hold jobs queued after active work, in due date order, for the "including backlog" view.
+    if not hold.empty:
+        hold = hold.sort_values(["Due date", "Job name"], ascending=[True, True])
+    if not active.empty:
+        if not hold.empty:
+            maxp = int(active["Priority"].max())
+            hold2 = hold.copy()
+            hold2["Priority"] = range(maxp + 1, maxp + 1 + len(hold2))
+            combined = pd.concat([active, hold2], ignore_index=True)
+        else:
+            combined = active.copy()
+    else:
+        combined = hold.copy()
+        combined["Priority"] = range(1, len(combined) + 1)
+    return combined.sort_values(["Priority", "Job name"], ascending=[True, True])
+
+def next_available_date(
+    sched: pd.DataFrame | None,
+    start_date: date,
+    calendar_from: Callable[[date], CapacityCalendar],
+) -> date:
+    if sched is None or sched.empty:
+        return start_date
+    last_finish = max(sched["Finish date"].tolist())
+    return calendar_from(last_finish + timedelta(days=1)).first_available_day() or last_finish + timedelta(days=1)
+
+def member_due_deficit(sched: pd.DataFrame | None, calendar: CapacityCalendar) -> tuple[float, list[date]]:
+    # Overtime is the largest shortfall across a member's due-dated jobs, not the sum, to avoid double-counting.
+    worst = 0.0
+    late_due_dates: list[date] = []
+    if sched is None or sched.empty:
+        return worst, late_due_dates
+    due_rows = sched.dropna(subset=["Due date"])
+    for due_raw, finish_h in zip(due_rows["Due date"].tolist(), due_rows["Finish hour index"].tolist()):
+        due = _safe_date(due_raw)
+        if due is None:
+            continue
+        deficit = max(0.0, float(finish_h) - due_cutoff_hours(due, calendar))
+        if deficit > worst:
+            worst = deficit
+        if deficit > 0.0:
+            late_due_dates.append(due)
+    return worst, late_due_dates
+
+def free_hours_until(sched: pd.DataFrame | None, calendar: CapacityCalendar, cutoff_date: date) -> float:
+    horizon_workdays = len(calendar.days_through(cutoff_date))
+    if horizon_workdays <= 0:
+        return 0.0
+    alloc = allocate_member_hours(
+        sched if sched is not None else pd.DataFrame(),
+        calendar.start_date,
+        calendar.daily_hours,
+        calendar.weekdays,
+        calendar.leave,
+        horizon_workdays=horizon_workdays,
+        calendar=calendar,
+    )
+    alloc = alloc[(alloc["Date"] >= calendar.start_date) & (alloc["Date"] <= cutoff_date)]
+    return float(alloc["Free hours"].sum()) if not alloc.empty else 0.0
+
+def on_time_counts(active_rows: pd.DataFrame) -> tuple[int, int]:
+    if active_rows is None or active_rows.empty:
+        return 0, 0
+    finish = active_rows["Finish date"].map(_safe_date)
+    due = active_rows["Due date"].map(_safe_date)
+    tracked = finish.notna() & due.notna()
+    on_time = sum(1 for f, d in zip(finish[tracked], due[tracked]) if f <= d)
+    return on_time, int(tracked.sum())
+
+def delivery_health(overtime_hours: float, offset_before_first_hours: float, offset_hours: float) -> tuple[str, str]:
+    if overtime_hours <= 0:
+        return "Healthy", "No overtime currently required"
+    if overtime_hours > offset_before_first_hours and overtime_hours > offset_hours:
+        return "Critical", "Offset capacity is below overtime needed"
+    if overtime_hours > offset_before_first_hours:
+        return "Warning", "Overtime required to achieve due dates; immediate rebalance needed"
+    return "Early warning", "Resource overload; consider reallocation"
+
+def _due_ordinals(jobs: pd.DataFrame) -> np.ndarray:
+    days = pd.to_datetime(jobs["Due date"], errors="coerce").to_numpy(dtype="datetime64[D]")
+    return np.where(np.isnat(days), 0, days.astype(np.int64) + _EPOCH_ORDINAL)
+
+def job_arrays(jobs: pd.DataFrame) -> dict[str, np.ndarray]:
+    # The only job data scheduling workers see: hours, priority, job name sort rank and due day ordinal (0 = none).
+    _, name_rank = np.unique(jobs["Job name"].to_numpy(dtype=object), return_inverse=True)
+    return {
+        "hours": np.array(job_hours(jobs["Required hours"]), dtype=np.float64),
+        "priority": jobs["Priority"].to_numpy(dtype=np.int64),
+        "name_rank": name_rank.astype(np.int64),
+        "due": _due_ordinals(jobs),
+    }
+
+def member_schedule_task(
+    member: str,
+    cfg: dict,
+    daily_hours: float,
+    start_date: date,
+    shutdown: DateRangeMask | None,
+    arrays: dict[str, np.ndarray],
+    kinds: tuple[str, ...] = ("active", "all"),
+    due_for: tuple[str, ...] = (),
+    task_id=None,
+) -> dict:
+    # Picklable description of one member's scheduling work: calendar inputs as day ordinals plus
+    # job_arrays for their rows. The job frames themselves never leave the caller.
+    leave = DateRangeMask(cfg["leave_ranges"])
+    shutdown = shutdown if shutdown is not None else DateRangeMask()
+    unavailable = sorted((d.toordinal(), h) for d, h in get_effective_unavailable_hours(cfg, daily_hours).items())
+    return {
+        "id": member if task_id is None else task_id,
+        "member": member,
+        "start": start_date.toordinal(),
+        "daily_hours": float(daily_hours),
+        "weekdays": sorted(int(x) for x in cfg["weekdays"]),
+        "leave": (leave.starts, leave.ends),
+        "shutdown": (shutdown.starts, shutdown.ends),
+        "unavailable": (
+            np.array([o for o, _ in unavailable], dtype=np.int64),
+            np.array([h for _, h in unavailable], dtype=np.float64),
+        ),
+        "rules": cfg.get("unavailable_rules", []),
+        "hours_profile": cfg.get("hours_profile"),
+        "jobs": arrays,
+        "sequencing": normalize_sequencing(cfg.get("sequencing")),
+        "intraday": intraday_inputs(cfg),
+        "kinds": tuple(kinds),
+        "due_for": tuple(due_for),
+    }
+
+def _task_calendar(task: dict, start_ordinal: int) -> CapacityCalendar:
+    unavailable_ords, unavailable_vals = task["unavailable"]
+    args = (date.fromordinal(start_ordinal), set(task["weekdays"]), DateRangeMask.from_ordinals(*task["leave"]), task["daily_hours"])
+    kwargs = {
+        "unavailable_hours": dict(zip(_ordinals_to_dates(unavailable_ords), unavailable_vals.tolist())),
+        "unavailable_rules": task["rules"],
+        "hours_profile": task["hours_profile"],
+        "shutdown": DateRangeMask.from_ordinals(*task["shutdown"]),
+    }
+    if task.get("intraday") is not None:
+        return SlotCalendar(*args, intraday=task["intraday"], **kwargs)
+    return CapacityCalendar(*args, **kwargs)
+
+def queue_orders(
+    arrays: dict[str, np.ndarray],
+    kinds: tuple[str, ...],
+    sequencing: dict | None = None,
+    calendar: CapacityCalendar | None = None,
+) -> dict[str, np.ndarray]:
+    # Row orders of schedule_queue_order and backlog_queue on job_arrays; lexsort is stable like the
+    # multi-column sort_values it stands in for.
+    priority = arrays["priority"]
+    active = sequence_rows(arrays, np.flatnonzero(priority >= 1), sequencing, calendar)
+    hold = np.flatnonzero(priority == 0)
+    # Jobs without a due date sort last, as NaT does.
+    due = np.where(arrays["due"][hold] > 0, arrays["due"][hold], np.iinfo(np.int64).max)
+    hold = hold[np.lexsort((arrays["name_rank"][hold], due))]
+    orders = {}
+    if "active" in kinds and len(active):
+        orders["active"] = active
+    if "all" in kinds and len(active) + len(hold):
+        orders["all"] = np.concatenate([active, hold])
+    return orders
+
+def run_member_schedule_task(task: dict) -> dict:
+    # Per queue kind: row order, hour bounds, start/finish day ordinals, next free day and, for due_for
+    # kinds, the due-date deficit. The first calendar error stops the member, as the serial loop did.
+    calendar = _task_calendar(task, task["start"])
+    arrays = task["jobs"]
+    result = {"id": task["id"], "member": task["member"], "error": "", "queues": {}}
+    try:
+        for kind, order in queue_orders(arrays, task["kinds"], task["sequencing"], calendar).items():
+            start_hours, finish_hours = queue_hour_bounds(arrays["hours"][order].tolist(), calendar)
+            result["queues"][kind] = _queue_result(task, calendar, kind, order, start_hours, finish_hours)
+    except ValueError as exc:
+        result["error"] = str(exc)
+    return result
+
+def _queue_result(
+    task: dict,
+    calendar: CapacityCalendar,
+    kind: str,
+    order: np.ndarray,
+    start_hours: list[float],
+    finish_hours: list[float],
+) -> dict:
+    arrays = task["jobs"]
+    start_dates, finish_dates = queue_dates(calendar, start_hours, finish_hours)
+    after = max(finish_dates) + timedelta(days=1)
+    next_day = _task_calendar(task, after.toordinal()).first_available_day() or after
+    out = {
+        "order": order.astype(np.int32),
+        "start_hours": np.array(start_hours, dtype=np.float64),
+        "finish_hours": np.array(finish_hours, dtype=np.float64),
+        "start": np.array([d.toordinal() for d in start_dates], dtype=np.int32),
+        "finish": np.array([d.toordinal() for d in finish_dates], dtype=np.int32),
+        "next": next_day.toordinal(),
+    }
+    if kind in task["due_for"]:
+        worst = 0.0
+        late: list[int] = []
+        for due_ordinal, finish_h in zip(arrays["due"][order].tolist(), finish_hours):
+            if due_ordinal <= 0:
+                continue
+            deficit = max(0.0, float(finish_h) - due_cutoff_hours(date.fromordinal(due_ordinal), calendar))
+            worst = max(worst, deficit)
+            if deficit > 0.0:
+                late.append(due_ordinal)
+        out["deficit"] = worst
+        out["late"] = np.array(late, dtype=np.int32)
+    return out
+
+def scheduled_queue(member_jobs: pd.DataFrame, kind: str, queue: dict | None) -> pd.DataFrame:
+    # The schedule_member_jobs frame for one queue kind, rebuilt from a task result.
+    if queue is None:
+        return pd.DataFrame()
+    df = member_jobs.take(queue["order"]).reset_index(drop=True)
+    hold = df["Priority"].to_numpy() == 0
+    if kind == "all" and hold.any():
+        # As in backlog_queue, on-hold jobs take the priorities after the last active one.
+        first = 1 if hold.all() else int(df["Priority"].max()) + 1
+        priority = df["Priority"].to_numpy(dtype=np.int64)
+        priority[hold] = np.arange(first, first + int(hold.sum()))
+        df["Priority"] = priority
+    df["Start hour index"] = queue["start_hours"]
+    df["Finish hour index"] = queue["finish_hours"]
+    df["Start date"] = _ordinals_to_dates(queue["start"])
+    df["Finish date"] = _ordinals_to_dates(queue["finish"])
+    return df
+
+def schedule_task_cost(task: dict) -> float:
+    # Per-job date mapping dominates; long queues also pay for growing the calendar week by week.
+    arrays = task["jobs"]
+    weeks = float(arrays["hours"].sum()) / max(task["daily_hours"], 1.0) / 7.0
+    return 1.0 + len(task["kinds"]) * (len(arrays["hours"]) + weeks)
+
+def split_tasks_by_cost(tasks: list[dict], parts: int) -> list[list[dict]]:
+    # Longest-first greedy: each member goes to the chunk with the least estimated work so far.
+    chunks: list[list[dict]] = [[] for _ in range(max(parts, 1))]
+    loads = [(0.0, i) for i in range(len(chunks))]
+    for cost, task in sorted(((schedule_task_cost(t), t) for t in tasks), key=lambda item: item[0], reverse=True):
+        load, i = heapq.heappop(loads)
+        chunks[i].append(task)
+        heapq.heappush(loads, (load + cost, i))
+    return [chunk for chunk in chunks if chunk]
+
+def _run_schedule_chunk(tasks: list[dict]) -> list[dict]:
+    return [run_member_schedule_task(task) for task in tasks]
+
+_schedule_pool: ProcessPoolExecutor | None = None
+_schedule_pool_workers = 0
+_schedule_pool_lock = threading.Lock()
+
+def _schedule_executor(workers: int) -> ProcessPoolExecutor:
+    # One long-lived pool per process. Spawned workers only import this module, so none of the
+    # caller's threads or sockets (the Streamlit server's included) are inherited.
+    global _schedule_pool, _schedule_pool_workers
+    with _schedule_pool_lock:
+        if _schedule_pool is None or _schedule_pool_workers != workers:
+            if _schedule_pool is not None:
+                _schedule_pool.shutdown(wait=False)
+            _schedule_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _schedule_pool_workers = workers
+        return _schedule_pool
+
+def _drop_schedule_executor() -> None:
+    global _schedule_pool, _schedule_pool_workers
+    with _schedule_pool_lock:
+        if _schedule_pool is not None:
+            _schedule_pool.shutdown(wait=False)
+        _schedule_pool = None
+        _schedule_pool_workers = 0
+
+def run_member_schedule_tasks(
+    tasks: list[dict],
+    workers: int | None = None,
+    min_jobs: int = PARALLEL_MIN_JOBS,
+) -> dict[str, dict]:
+    # Results by task id (the member unless given). Small batches, or workers <= 1, run in-process
+    # through the same code path.
+    workers = (os.cpu_count() or 1) if workers is None else int(workers)
+    total_jobs = sum(len(task["jobs"]["hours"]) for task in tasks)
+    if workers <= 1 or len(tasks) < 2 or total_jobs < min_jobs:
+        results = _run_schedule_chunk(tasks)
+    else:
+        chunks = split_tasks_by_cost(tasks, min(len(tasks), workers * PARALLEL_CHUNKS_PER_WORKER))
+        try:
+            results = [r for chunk in _schedule_executor(workers).map(_run_schedule_chunk, chunks) for r in chunk]
+        except BrokenProcessPool:
+            _drop_schedule_executor()
+            results = _run_schedule_chunk(tasks)
+    return {r["id"]: r for r in results}
+
+def normalize_dependencies(raw) -> list[dict]:
+    # Predecessor links as [{"job": successor name, "after": predecessor name}], without blanks,
+    # self links or repeats.
+    links = []
+    seen = set()
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict):
+            continue
+        job, after = (item.get(k).strip() if isinstance(item.get(k), str) else "" for k in ("job", "after"))
+        if not job or not after or job == after or (job, after) in seen:
+            continue
+        seen.add((job, after))
+        links.append({"job": job, "after": after})
+    return links
+
+def dependency_edges(
+    names: dict[str, list[str]],
+    links: list[dict],
+    shared: dict | None = None,
+) -> tuple[list[tuple[str, int, str, int]], list[dict]]:
+    # (predecessor member, row, successor member, row) for each link, rows being positions in each
+    # member's job list. Names repeat across members, so a successor waits on every part of a shared
+    # job, otherwise on the predecessor-named jobs in its own list, or else on the one job of that name
+    # elsewhere; links that match nothing that way are returned as unresolved. Edges stay within jobs
+    # times duplicate names per member.
+    shared = shared or {}
+    where: dict[str, dict[str, list[int]]] = {}
+    for member, member_names in names.items():
+        for row, name in enumerate(member_names):
+            where.setdefault(str(name), {}).setdefault(member, []).append(row)
+    edges = []
+    unresolved = []
+    for link in links:
+        before = where.get(link["after"], {})
+        unique = [(m, rows[0]) for m, rows in before.items()] if sum(len(r) for r in before.values()) == 1 else []
+        parts = [(m, rows[0]) for m, rows in before.items() if m in shared[link["after"]]["shares"]] if link["after"] in shared else []
+        found = len(edges)
+        for sm, rows in where.get(link["job"], {}).items():
+            preds = parts or ([(sm, r) for r in before[sm]] if sm in before else unique)
+            edges.extend((pm, pr, sm, sr) for sr in rows for pm, pr in preds if (pm, pr) != (sm, sr))
+        if len(edges) == found:
+            unresolved.append(link)
+    return edges, unresolved
+
+def _strongly_connected(n: int, succ: list[list[int]]) -> list[list[int]]:
+    # Iterative Tarjan; only components with more than one node (the dependency cycles) are returned.
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: list[int] = []
+    found = []
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0 or not succ[root]:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, pos = work.pop()
+            if pos == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            for i in range(pos, len(succ[node])):
+                nxt = succ[node][i]
+                if index[nxt] < 0:
+                    work.append((node, i + 1))
+                    work.append((nxt, 0))
+                    recurse = True
+                    break
+                if on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+            if recurse:
+                continue
+            if low[node] == index[node]:
+                comp = []
+                while True:
+                    top = stack.pop()
+                    on_stack[top] = False
+                    comp.append(top)
+                    if top == node:
+                        break
+                if len(comp) > 1:
+                    found.append(comp)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return found
+
+def _dependency_pass(
+    tasks: list[dict],
+    calendars: list[CapacityCalendar],
+    offsets: list[int],
+    owner: list[int],
+    succ: list[list[int]],
+    ranked: list[np.ndarray],
+    state: dict,
+) -> None:
+    # One event-driven list-scheduling pass over the rows in ranked (each member's dispatch order).
+    # Members are advanced in order of the day of their next decision; each dispatches its best-ranked
+    # job whose predecessors are done, idling until the earliest release when none is. A predecessor on
+    # the same member releases at its finish hour, one elsewhere at the end of its finish day.
+    # Predecessors finished in an earlier pass only set releases; ones outside every pass are ignored.
+    clock, done, failed, driver = state["clock"], state["done"], state["failed"], state["driver"]
+    rank = {}
+    for t, rows in enumerate(ranked):
+        base = offsets[t]
+        for i, row in enumerate(rows.tolist()):
+            rank[base + row] = i
+    pending = dict.fromkeys(rank, 0)
+    release = dict.fromkeys(rank, 0.0)
+    bound: dict[int, int] = {}
+    avail: list[list] = [[] for _ in tasks]
+    wait: list[list] = [[] for _ in tasks]
+    stamps = [0] * len(tasks)
+    events: list[tuple[int, int, int]] = []
+
+    def handoff(pred: int, node: int) -> None:
+        finish_hour, finish_day = done[pred][:2]
+        if finish_hour is None:
+            return
+        t = owner[node]
+        at = finish_hour if owner[pred] == t else calendars[t].capacity_through(date.fromordinal(finish_day))
+        if at > release[node]:
+            release[node] = at
+            bound[node] = pred
+
+    for pred in range(len(succ)):
+        for node in succ[pred]:
+            if node not in rank:
+                continue
+            if pred in rank:
+                pending[node] += 1
+            elif pred in done:
+                handoff(pred, node)
+
+    def refresh(t: int) -> None:
+        stamps[t] += 1
+        if t in failed:
+            return
+        while wait[t] and wait[t][0][0] <= clock[t] + 1e-9:
+            _, r, node = heapq.heappop(wait[t])
+            heapq.heappush(avail[t], (r, node))
+        if avail[t]:
+            at = clock[t]
+        elif wait[t]:
+            at = wait[t][0][0]
+        else:
+            return
+        try:
+            day = calendars[t].hour_to_date(at).toordinal()
+        except ValueError as exc:
+            failed[t] = str(exc)
+            stranded = [node for _, node in avail[t]] + [node for _, _, node in wait[t]]
+            avail[t].clear()
+            wait[t].clear()
+            for node in stranded:
+                complete(node, None, 0)
+            return
+        heapq.heappush(events, (day, t, stamps[t]))
+
+    def complete(node: int, finish_hour: float | None, finish_day: int) -> None:
+        # Mark node done and release its successors; jobs of a failed member finish without a date.
+        todo = [(node, finish_hour, finish_day)]
+        touched = set()
+        while todo:
+            node, finish_hour, finish_day = todo.pop()
+            done[node] = (finish_hour, finish_day, owner[node])
+            for nxt in succ[node]:
+                if nxt not in pending:
+                    continue
+                handoff(node, nxt)
+                pending[nxt] -= 1
+                if pending[nxt]:
+                    continue
+                t = owner[nxt]
+                if t in failed:
+                    todo.append((nxt, None, 0))
+                else:
+                    heapq.heappush(wait[t], (release[nxt], rank[nxt], nxt))
+                    touched.add(t)
+        for t in touched:
+            refresh(t)
+
+    stranded = []
+    for node, count in pending.items():
+        if count == 0 and owner[node] in failed:
+            stranded.append(node)
+        elif count == 0:
+            heapq.heappush(wait[owner[node]], (release[node], rank[node], node))
+    for node in stranded:
+        complete(node, None, 0)
+    for t in range(len(tasks)):
+        refresh(t)
+    while events:
+        _, t, stamp = heapq.heappop(events)
+        if stamp != stamps[t] or t in failed:
+            continue
+        idle_until = clock[t]
+        if not avail[t]:
+            clock[t] = max(clock[t], wait[t][0][0])
+            while wait[t] and wait[t][0][0] <= clock[t] + 1e-9:
+                _, r, node = heapq.heappop(wait[t])
+                heapq.heappush(avail[t], (r, node))
+        _, node = heapq.heappop(avail[t])
+        hours = float(tasks[t]["jobs"]["hours"][node - offsets[t]])
+        # Jobs count as released within rounding of the clock, but never start before their release:
+        # a clock a hair short of the next day's first hour would put the job on its predecessor's day.
+        start = calendars[t].fit_start(max(clock[t], release[node]), hours)
+        if node in bound and release[node] > idle_until + 1e-9:
+            driver[node] = ("dependency", bound[node])
+        elif state["last"][t] is not None:
+            driver[node] = ("queue", state["last"][t])
+        else:
+            driver[node] = ("start", None)
+        finish = start + hours
+        clock[t] = finish
+        state["last"][t] = node
+        state["placed"][t].append((node - offsets[t], start, finish))
+        try:
+            complete(node, finish, calendars[t].hour_to_date(max(finish - 1e-9, 0.0)).toordinal())
+        except ValueError:
+            # Past the member's last capacity; the queue result reports it and successors go unconstrained.
+            complete(node, None, 0)
+        refresh(t)
+
+def run_dependency_schedule(tasks: list[dict], edges: list[tuple[str, int, str, int]]) -> tuple[dict[str, dict], dict]:
+    # run_member_schedule_task for a group of members whose jobs wait on each other. Edges come from
+    # dependency_edges. Active jobs are scheduled first across everyone, then each member's on-hold
+    # backlog after their active work, so both queue kinds keep the shape scheduled_queue expects.
+    # Edges inside a cycle are dropped and reported. Info holds "cycles" (lists of (member, row)) and
+    # "critical": the chain behind the latest active finish as (member, row, how its start was set,
+    # finish day ordinal), where how is "start", "queue" (after the member's previous job) or "dependency".
+    index = {task["id"]: t for t, task in enumerate(tasks)}
+    offsets = [0]
+    for task in tasks:
+        offsets.append(offsets[-1] + len(task["jobs"]["hours"]))
+    owner = np.repeat(np.arange(len(tasks)), np.diff(offsets)).tolist()
+    succ: list[list[int]] = [[] for _ in range(offsets[-1])]
+    for pm, pr, sm, sr in edges:
+        if pm in index and sm in index:
+            succ[offsets[index[pm]] + pr].append(offsets[index[sm]] + sr)
+    cycles = []
+    for comp in _strongly_connected(len(succ), succ):
+        inside = set(comp)
+        for node in comp:
+            succ[node] = [nxt for nxt in succ[node] if nxt not in inside]
+        cycles.append([(tasks[owner[n]]["id"], n - offsets[owner[n]]) for n in sorted(comp)])
+
+    calendars = [_task_calendar(task, task["start"]) for task in tasks]
+    orders = [queue_orders(task["jobs"], ("active", "all"), task["sequencing"], calendars[t]) for t, task in enumerate(tasks)]
+    empty = np.zeros(0, dtype=np.int64)
+    state = {
+        "clock": [0.0] * len(tasks),
+        "done": {},
+        "failed": {},
+        "driver": {},
+        "last": [None] * len(tasks),
+        "placed": [[] for _ in tasks],
+    }
+    active = [o.get("active", empty) for o in orders]
+    _dependency_pass(tasks, calendars, offsets, owner, succ, active, state)
+    split = [len(p) for p in state["placed"]]
+    failed_active = set(state["failed"])
+    critical_from = max(
+        (n for n, d in state["done"].items() if d[0] is not None),
+        key=lambda n: (state["done"][n][1], state["done"][n][0]),
+        default=None,
+    )
+    hold = [o["all"][len(a):] if "all" in o else empty for o, a in zip(orders, active)]
+    _dependency_pass(tasks, calendars, offsets, owner, succ, hold, state)
+
+    results = {}
+    for t, task in enumerate(tasks):
+        result = {"id": task["id"], "member": task["member"], "error": state["failed"].get(t, ""), "queues": {}}
+        placed = state["placed"][t]
+        try:
+            for kind, rows in (("active", placed[:split[t]]), ("all", placed)):
+                if kind not in task["kinds"] or not rows or t in failed_active or (result["error"] and kind == "all"):
+                    continue
+                order = np.array([r for r, _, _ in rows], dtype=np.int64)
+                result["queues"][kind] = _queue_result(task, calendars[t], kind, order, [s for _, s, _ in rows], [f for _, _, f in rows])
+        except ValueError as exc:
+            result["error"] = str(exc)
+        results[task["id"]] = result
+
+    critical = []
+    node = critical_from
+    while node is not None:
+        how, prev = state["driver"][node]
+        critical.append((tasks[owner[node]]["id"], node - offsets[owner[node]], how, state["done"][node][1]))
+        node = prev
+    return results, {"cycles": cycles, "critical": critical[::-1]}
+
+def team_report(state: dict, start_date: date, workers: int | None = None) -> dict:
+    # Schedules, availability and KPIs for every member of a parsed payload, as the dashboard computes them.
+    team = state["team"]
+    settings = state["member_settings"]
+    shutdown = DateRangeMask(state.get("team_shutdowns", []))
+    jobs = add_status_columns(state["jobs"]).reset_index(drop=True)
+    arrays = job_arrays(jobs)
+    no_rows = np.zeros(0, dtype=np.int64)
+    positions = {str(m): pos for m, pos in jobs.groupby("Assignee", sort=False, observed=True).indices.items()} if not jobs.empty else {}
+    members = list(zip(team["Member"].astype(str).tolist(), team["Daily hours"].astype(float).tolist()))
+
+    tasks = []
+    for member, daily in members:
+        pos = positions.get(member, no_rows)
+        member_arrays = {name: values[pos] for name, values in arrays.items()}
+        tasks.append(member_schedule_task(member, settings[member], daily, start_date, shutdown, member_arrays, due_for=("active",)))
+    links = state.get("dependencies", [])
+    edges = []
+    if links:
+        names = jobs["Job name"].astype(str).to_numpy()
+        edges, unresolved = dependency_edges({m: names[positions.get(m, no_rows)].tolist() for m, _ in members}, links, state.get("shared_jobs"))
+    # Members linked by dependencies are scheduled together; everyone else stays independent.
+    linked = {e[0] for e in edges} | {e[2] for e in edges}
+    results = run_member_schedule_tasks([t for t in tasks if t["id"] not in linked], workers)
+    dependency_info = {"cycles": [], "critical": []}
+    if linked:
+        dependent, dependency_info = run_dependency_schedule([t for t in tasks if t["id"] in linked], edges)
+        results.update(dependent)
+
+    rows = []
+    start_ords = []
+    finish_ords = []
+    availability_rows = []
+    helpers = []
+    overtime_hours = 0.0
+    overtime_members: set[str] = set()
+    overtime_due_dates: list[date] = []
+    for member, daily in members:
+        pos = positions.get(member, no_rows)
+        result = results[member]
+        done = result["queues"]
+        note = result["error"]
+        if note:
+            next_active = None
+            next_all = None
+        else:
+            next_active = date.fromordinal(done["active"]["next"]) if "active" in done else start_date
+            next_all = date.fromordinal(done["all"]["next"]) if "all" in done else start_date
+
+        deficit = 0.0
+        active = done.get("active")
+        if active is not None:
+            rows.append(pos[active["order"]])
+            start_ords.append(active["start"])
+            finish_ords.append(active["finish"])
+            deficit = active["deficit"]
+            overtime_hours += deficit
+        if deficit > 0.0:
+            overtime_members.add(member)
+            overtime_due_dates.extend(date.fromordinal(int(o)) for o in active["late"])
+        else:
+            helpers.append((member, daily, pos, active))
+        hold = pos[arrays["priority"][pos] == 0]
+        rows.append(hold)
+        start_ords.append(np.zeros(len(hold), dtype=np.int32))
+        finish_ords.append(np.zeros(len(hold), dtype=np.int32))
+        availability_rows.append(
+            {
+                "Member": member,
+                "Next available date, active only": next_active,
+                "Next available date, including on hold backlog": next_all,
+                "Overtime needed (hrs)": round(deficit, 2),
+                "Note": note,
+            }
+        )
+
+    offset_hours = 0.0
+    offset_before_first_hours = 0.0
+    if overtime_hours > 0 and len(overtime_due_dates) > 0:
+        # Idle capacity from everyone who is not overloaded, up to the first and last overtime due date.
+        for member, daily, pos, active in helpers:
+            calendar = build_member_calendar(settings[member], daily, start_date, shutdown)
+            sched = scheduled_queue(jobs.take(pos), "active", active)
+            offset_hours += free_hours_until(sched, calendar, max(overtime_due_dates))
+            offset_before_first_hours += free_hours_until(sched, calendar, min(overtime_due_dates))
+
+    schedule_cols = ["Assignee", "Job name", "Priority", "Status", "Required hours", "Start date", "Finish date", "Due date", "Notes"]
+    order = np.concatenate(rows) if rows else no_rows
+    if len(order):
+        schedules = jobs.take(order).reset_index(drop=True)
+        schedules["Assignee"] = schedules["Assignee"].astype(str)
+        for col, ords in (("Start date", np.concatenate(start_ords)), ("Finish date", np.concatenate(finish_ords))):
+            # On-hold rows carry ordinal 0 and stay unscheduled.
+            values = np.full(len(ords), None, dtype=object)
+            scheduled = ords > 0
+            values[scheduled] = _ordinals_to_dates(ords[scheduled])
+            schedules[col] = values
+        schedules = schedules[schedule_cols]
+        schedules["Due date"] = schedules["Due date"].map(_safe_date)
+        schedules["Required hours"] = job_hours(schedules["Required hours"])
+        schedules = schedules.sort_values(["Assignee", "Status", "Priority", "Job name"]).reset_index(drop=True)
+    else:
+        schedules = pd.DataFrame(columns=schedule_cols)
+    shared = state.get("shared_jobs", {})
+    active_rows = schedules[schedules["Status"] == "Active"]
+    on_time, tracked = on_time_counts(collapse_shared_jobs(active_rows, shared))
+    health, health_note = delivery_health(overtime_hours, offset_before_first_hours, offset_hours)
+    kpis = {
+        "start_date": start_date.isoformat(),
+        "members": int(len(team)),
+        "active_jobs": int(len(active_rows)),
+        "on_hold_jobs": int((schedules["Status"] == "On hold").sum()),
+        "overtime_needed_hours": round(overtime_hours, 2),
+        "overtime_members": sorted(overtime_members),
+        "offset_before_first_overtime_hours": round(offset_before_first_hours, 2),
+        "offset_capacity_hours": round(offset_hours, 2),
+        "on_time_jobs": on_time,
+        "due_tracked_jobs": tracked,
+        "on_time_pct": None if tracked == 0 else round(on_time / tracked * 100.0, 1),
+        "delivery_health": health,
+        "delivery_health_note": health_note,
+    }
+    if shared:
+        joined = shared_job_rows(schedules, shared)
+        kpis["shared_jobs"] = [
+            {
+                "job": name,
+                "assignees": assignees,
+                "status": status,
+                "finish": None if finish is None else finish.isoformat(),
+                "due": None if due is None else due.isoformat(),
+            }
+            for name, assignees, status, finish, due in zip(joined["Job name"], joined["Assignee"], joined["Status"], joined["Finish date"], joined["Due date"])
+        ]
+    if links:
+        job_name = {m: names[positions.get(m, no_rows)] for m in linked}
+        kpis["dependency_links"] = len(edges)
+        kpis["unresolved_dependencies"] = unresolved
+        kpis["dependency_cycles"] = [[{"member": m, "job": str(job_name[m][r])} for m, r in cycle] for cycle in dependency_info["cycles"]]
+        kpis["critical_path"] = [
+            {"member": m, "job": str(job_name[m][r]), "starts_after": how, "finish": date.fromordinal(finish).isoformat()}
+            for m, r, how, finish in dependency_info["critical"]
+        ]
+    availability = pd.DataFrame(availability_rows)
+    if not availability.empty:
+        availability = availability.sort_values(["Member"]).reset_index(drop=True)
+    return {"schedules": schedules, "availability": availability, "kpis": kpis}
+
+def _job_position(jobs: pd.DataFrame, job_name: str) -> int | None:
+    hits = np.flatnonzero(jobs["Job name"].astype(str).to_numpy() == str(job_name))
+    return int(hits[0]) if len(hits) else None
+
+def _queue_job(jobs: pd.DataFrame, row: pd.DataFrame) -> pd.DataFrame:
+    # Append and renumber, so a requested priority slots in ahead of the jobs already there.
+    return normalize_active_priorities(apply_job_dtypes(pd.concat([jobs, row], ignore_index=True)))
+
+def apply_scenario_edits(
+    partitions: dict[str, pd.DataFrame],
+    member_settings: dict,
+    daily_hours: dict[str, float],
+    edits: list[dict],
+    shared: dict | None = None,
+) -> dict:
+    # Copy-on-write overlay of a what-if scenario on the live state: only members an edit touches get
+    # new job frames or settings, everyone else keeps reading the base objects. Edits that no longer
+    # apply (job or member gone) are skipped and listed. Moving a member's part of a shared job hands
+    # their share to the new assignee; splitting a part, or moving it to someone already sharing the
+    # job, is skipped.
+    jobs_over: dict[str, pd.DataFrame] = {}
+    settings_over: dict[str, dict] = {}
+    daily_over: dict[str, float] = {}
+    shared_over = shared or {}
+    skipped: list[int] = []
+
+    def jobs_of(member: str) -> pd.DataFrame:
+        return jobs_over.get(member, partitions.get(member, empty_jobs_df()))
+
+    for i, edit in enumerate(edits):
+        op = edit.get("op")
+        member = str(edit.get("member", ""))
+        if member not in member_settings:
+            skipped.append(i)
+            continue
+        if op in ("move_job", "split_job", "update_job"):
+            jobs = jobs_of(member)
+            pos = _job_position(jobs, edit.get("job", ""))
+            target = str(edit.get("to", member)) if op != "update_job" else member
+            if pos is None or target not in member_settings:
+                skipped.append(i)
+                continue
+            name = str(jobs["Job name"].iloc[pos])
+            spec = shared_over.get(name)
+            if op != "update_job" and spec is not None and member in spec["shares"]:
+                if op == "split_job" or target in spec["shares"]:
+                    skipped.append(i)
+                    continue
+                shares = {(target if m == member else m): v for m, v in spec["shares"].items()}
+                shared_over = {**shared_over, name: {**spec, "shares": shares}}
+            row = jobs.iloc[[pos]].copy()
+            if op != "update_job":
+                row["Assignee"] = target
+                if edit.get("priority") is None and int(row["Priority"].iloc[0]) >= 1:
+                    # Without a requested priority an active job joins the end of the new assignee's queue.
+                    row["Priority"] = len(jobs_of(target)) + 1
+            if edit.get("priority") is not None:
+                row["Priority"] = max(_safe_int(edit["priority"]), 0)
+            if op == "update_job":
+                if edit.get("hours") is not None:
+                    row["Required hours"] = max(_safe_float(edit["hours"]), 0.0)
+                if edit.get("due") is not None:
+                    row["Due date"] = pd.Timestamp(edit["due"])
+            if op == "split_job":
+                # The moved hours become a job of their own; the original keeps the rest in place.
+                hours = jobs["Required hours"].to_numpy(dtype=float, copy=True)
+                part = min(max(_safe_float(edit.get("hours")), 0.0), hours[pos])
+                hours[pos] -= part
+                jobs_over[member] = apply_job_dtypes(jobs.assign(**{"Required hours": hours}))
+                row["Job name"] = f"{row['Job name'].iloc[0]} (split)"
+                row["Required hours"] = part
+            else:
+                jobs_over[member] = normalize_active_priorities(jobs.drop(jobs.index[pos]).reset_index(drop=True))
+            jobs_over[target] = _queue_job(jobs_of(target), row)
+        elif op == "leave":
+            start, end = _safe_date(edit.get("start")), _safe_date(edit.get("end"))
+            if start is None or end is None:
+                skipped.append(i)
+                continue
+            cfg = dict(settings_over.get(member, member_settings[member]))
+            cfg["leave_ranges"] = DateRangeMask(cfg["leave_ranges"]).with_range(start, end)
+            settings_over[member] = cfg
+        elif op == "weekdays":
+            cfg = dict(settings_over.get(member, member_settings[member]))
+            cfg["weekdays"] = {int(x) for x in edit.get("weekdays", []) if 0 <= _safe_int(x, -1) <= 6} or cfg["weekdays"]
+            settings_over[member] = cfg
+        elif op == "daily_hours":
+            daily_over[member] = min(max(_safe_float(edit.get("hours"), daily_hours.get(member, 8.0)), 0.0), 24.0)
+        else:
+            skipped.append(i)
+    return {
+        "jobs": jobs_over,
+        "settings": settings_over,
+        "daily": daily_over,
+        "members": sorted(set(jobs_over) | set(settings_over) | set(daily_over)),
+        "shared": shared_over,
+        "skipped": skipped,
+    }
+
+def describe_scenario_edit(edit: dict) -> str:
+    op = edit.get("op")
+    if op == "move_job":
+        slot = f" at priority {edit['priority']}" if edit.get("priority") is not None else ""
+        return f"Move {edit.get('job')} from {edit.get('member')} to {edit.get('to')}{slot}"
+    if op == "split_job":
+        slot = f" at priority {edit['priority']}" if edit.get("priority") is not None else ""
+        return f"Move {edit.get('hours')}h of {edit.get('job')} from {edit.get('member')} to {edit.get('to')}{slot}"
+    if op == "update_job":
+        changes = [f"{label} {edit[k]}" for k, label in (("hours", "hours"), ("priority", "priority"), ("due", "due")) if edit.get(k) is not None]
+        return f"Set {edit.get('job')} ({edit.get('member')}) " + ", ".join(changes)
+    if op == "leave":
+        return f"{edit.get('member')} off {edit.get('start')} to {edit.get('end')}"
+    if op == "weekdays":
+        return f"{edit.get('member')} works " + ", ".join(INT_TO_LABEL.get(int(d), str(d)) for d in sorted(edit.get("weekdays", [])))
+    if op == "daily_hours":
+        return f"{edit.get('member')} at {edit.get('hours')}h per day"
+    return str(edit)
+
+def schedule_outcome(sched: pd.DataFrame | None, deficit: float, note: str = "") -> dict:
+    # A member's contribution to the comparison KPIs.
+    sched = sched if sched is not None else pd.DataFrame()
+    on_time, tracked = on_time_counts(sched)
+    return {
+        "sched": sched,
+        "deficit": float(deficit),
+        "on_time": on_time,
+        "tracked": tracked,
+        "last_finish": max(sched["Finish date"].tolist()) if not sched.empty else None,
+        "note": note,
+    }
+
+def outcome_kpis(outcomes: dict[str, dict]) -> dict:
+    overtime = sum(o["deficit"] for o in outcomes.values())
+    on_time = sum(o["on_time"] for o in outcomes.values())
+    tracked = sum(o["tracked"] for o in outcomes.values())
+    finishes = [o["last_finish"] for o in outcomes.values() if o["last_finish"] is not None]
+    return {
+        "overtime_needed_hours": round(overtime, 2),
+        "overtime_members": sum(1 for o in outcomes.values() if o["deficit"] > 0.0),
+        "on_time_jobs": on_time,
+        "due_tracked_jobs": tracked,
+        "on_time_pct": None if tracked == 0 else round(on_time / tracked * 100.0, 1),
+        "last_finish": max(finishes) if finishes else None,
+    }
+
+def evaluate_scenarios(
+    scenarios: dict[str, list[dict]],
+    partitions: dict[str, pd.DataFrame],
+    member_settings: dict,
+    daily_hours: dict[str, float],
+    start_date: date,
+    shutdown: DateRangeMask | None = None,
+    workers: int | None = None,
+    shared: dict | None = None,
+    links: list[dict] | None = None,
+) -> dict[str, dict]:
+    # Reschedules only the members each scenario touches; every scenario goes into one task batch.
+    # With job links, touching a linked member reschedules every member linked before or after the
+    # edits, together through run_dependency_schedule as the live plan is.
+    overlays = {name: apply_scenario_edits(partitions, member_settings, daily_hours, edits, shared) for name, edits in scenarios.items()}
+
+    def names_of(jobs_over: dict[str, pd.DataFrame]) -> dict[str, list[str]]:
+        return {m: jobs_over.get(m, partitions.get(m, empty_jobs_df()))["Job name"].astype(str).tolist() for m in member_settings if m in daily_hours}
+
+    base_linked: set[str] = set()
+    if links:
+        base_edges, _ = dependency_edges(names_of({}), links, shared)
+        base_linked = {e[0] for e in base_edges} | {e[2] for e in base_edges}
+    tasks = []
+    rescheduled = {}
+    dependent = {}
+    for name, overlay in overlays.items():
+        touched = set(overlay["members"])
+        edges = []
+        linked: set[str] = set()
+        if links:
+            edges, _ = dependency_edges(names_of(overlay["jobs"]), links, overlay["shared"])
+            linked = {e[0] for e in edges} | {e[2] for e in edges}
+            if touched & (base_linked | linked):
+                touched |= base_linked | linked
+        rescheduled[name] = sorted(touched)
+        group = []
+        for member in rescheduled[name]:
+            task = member_schedule_task(
+                member,
+                overlay["settings"].get(member, member_settings[member]),
+                overlay["daily"].get(member, daily_hours.get(member, 8.0)),
+                start_date,
+                shutdown,
+                job_arrays(overlay["jobs"].get(member, partitions.get(member, empty_jobs_df()))),
+                kinds=("active",),
+                due_for=("active",),
+                task_id=member if member in linked else (name, member),
+            )
+            (group if member in linked else tasks).append(task)
+        if group:
+            dependent[name] = run_dependency_schedule(group, edges)[0]
+    results = run_member_schedule_tasks(tasks, workers)
+    out = {}
+    for name, overlay in overlays.items():
+        outcomes = {}
+        for member in rescheduled[name]:
+            result = dependent[name][member] if member in dependent.get(name, {}) else results[(name, member)]
+            active = result["queues"].get("active")
+            jobs = overlay["jobs"].get(member, partitions.get(member, empty_jobs_df()))
+            outcomes[member] = schedule_outcome(
+                scheduled_queue(jobs, "active", active),
+                active["deficit"] if active is not None else 0.0,
+                result["error"],
+            )
+        out[name] = {"overlay": overlay, "outcomes": outcomes}
+    return out
+
+def sequencing_outcomes(
+    partitions: dict[str, pd.DataFrame],
+    member_settings: dict,
+    daily_hours: dict[str, float],
+    start_date: date,
+    shutdown: DateRangeMask | None = None,
+    due_weight: float = DEFAULT_SEQUENCING["due_weight"],
+    workers: int | None = None,
+    edges: list[tuple[str, int, str, int]] | None = None,
+) -> dict[str, dict[str, dict]]:
+    # Every member's active queue under every sequencing policy, scheduled in one task batch:
+    # {policy: {member: schedule_outcome}}. Members joined by edges (from dependency_edges over the
+    # whole team) are scheduled together per policy through run_dependency_schedule, as the live plan is.
+    members = [m for m in member_settings if m in daily_hours]
+    arrays = {m: job_arrays(partitions.get(m, empty_jobs_df())) for m in members}
+    linked = ({e[0] for e in edges} | {e[2] for e in edges}) & set(members) if edges else set()
+    tasks = []
+    dependent = {}
+    for policy in SEQUENCING_POLICIES:
+        group = []
+        for member in members:
+            task = member_schedule_task(
+                member,
+                {**member_settings[member], "sequencing": {"policy": policy, "due_weight": due_weight}},
+                daily_hours[member],
+                start_date,
+                shutdown,
+                arrays[member],
+                kinds=("active",),
+                due_for=("active",),
+                task_id=member if member in linked else (policy, member),
+            )
+            (group if member in linked else tasks).append(task)
+        if group:
+            dependent[policy] = run_dependency_schedule(group, edges)[0]
+    results = run_member_schedule_tasks(tasks, workers)
+    out = {}
+    for policy in SEQUENCING_POLICIES:
+        outcomes = {}
+        for member in members:
+            result = dependent[policy][member] if member in linked else results[(policy, member)]
+            active = result["queues"].get("active")
+            outcomes[member] = schedule_outcome(
+                scheduled_queue(partitions.get(member, empty_jobs_df()), "active", active),
+                active["deficit"] if active is not None else 0.0,
+                result["error"],
+            )
+        out[policy] = outcomes
+    return out
+
+def finish_date_changes(base_outcomes: dict[str, dict], scenario_outcomes: dict[str, dict]) -> pd.DataFrame:
+    # Active jobs of the rescheduled members whose assignee or finish date differs from the baseline.
+    def finishes(outcomes: dict[str, dict]) -> pd.DataFrame:
+        frames = [
+            o["sched"][["Job name", "Due date", "Finish date"]].assign(Assignee=member)
+            for member, o in outcomes.items()
+            if not o["sched"].empty
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["Job name", "Due date", "Finish date", "Assignee", "Occurrence"])
+        df = pd.concat(frames, ignore_index=True)
+        df["Job name"] = df["Job name"].astype(str)
+        # Duplicate job names pair up in order of appearance.
+        df["Occurrence"] = df.groupby("Job name").cumcount()
+        return df
+
+    touched = list(scenario_outcomes)
+    base = finishes({m: base_outcomes[m] for m in touched if m in base_outcomes})
+    scenario = finishes(scenario_outcomes)
+    merged = base.merge(scenario, on=["Job name", "Occurrence"], how="outer", suffixes=(" baseline", " scenario"))
+    out = pd.DataFrame(
+        {
+            "Job name": merged["Job name"],
+            "Assignee": merged["Assignee baseline"],
+            "Scenario assignee": merged["Assignee scenario"],
+            "Due date": merged["Due date scenario"].combine_first(merged["Due date baseline"]).map(_safe_date),
+            "Baseline finish": merged["Finish date baseline"].map(_safe_date),
+            "Scenario finish": merged["Finish date scenario"].map(_safe_date),
+        }
+    )
+    out["Shift (days)"] = [
+        (b2 - b1).days if b1 is not None and b2 is not None else None
+        for b1, b2 in zip(out["Baseline finish"], out["Scenario finish"])
+    ]
+    changed = (out["Assignee"] != out["Scenario assignee"]) | (out["Baseline finish"] != out["Scenario finish"])
+    return out[changed].sort_values(["Scenario assignee", "Scenario finish", "Job name"], na_position="last").reset_index(drop=True)
+
+class MemberLoad:
+    # A member's active queue as cumulative hours against cumulative capacity through each due day.
+    # Prefix/suffix maxima of the due-date slack (finish hours minus capacity by the due day) let a
+    # candidate move be scored in O(1) instead of rescheduling the member.
+    def __init__(self, member: str, queue: pd.DataFrame, calendar: CapacityCalendar, horizon_end: date):
+        self.member = member
+        days = calendar.days_through(horizon_end)
+        self.day_ords = np.array([d.toordinal() for d, _ in days], dtype=np.int64)
+        self.cum_capacity = np.cumsum([cap for _, cap in days], dtype=np.float64)
+        arrays = job_arrays(queue)
+        self.names = queue["Job name"].astype(str).tolist()
+        self.hours = arrays["hours"]
+        self.due = arrays["due"]
+        self._refresh()
+
+    def capacity_through(self, due_ords: np.ndarray) -> np.ndarray:
+        if len(self.cum_capacity) == 0:
+            return np.zeros(len(due_ords), dtype=np.float64)
+        idx = np.searchsorted(self.day_ords, due_ords, side="right")
+        return np.where(idx > 0, self.cum_capacity[np.maximum(idx - 1, 0)], 0.0)
+
+    def _refresh(self) -> None:
+        self.finish = np.cumsum(self.hours)
+        self.slack = np.where(self.due > 0, self.finish - self.capacity_through(self.due), -np.inf)
+        self.prefix_max = np.maximum.accumulate(self.slack)
+        self.suffix_max = np.maximum.accumulate(self.slack[::-1])[::-1]
+        self.total = float(self.finish[-1]) if len(self.finish) else 0.0
+        self.deficit = max(0.0, float(self.slack.max())) if len(self.slack) else 0.0
+
+    def deficits_without(self, positions: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        # Deficit after taking hours[i] off the job at positions[i]; the job leaves when it is all of its hours.
+        padded_prefix = np.concatenate(([-np.inf], self.prefix_max))
+        padded_suffix = np.concatenate((self.suffix_max, [-np.inf]))
+        before = padded_prefix[positions]
+        after = padded_suffix[positions + 1] - hours
+        own = np.where(hours < self.hours[positions] - 1e-9, self.slack[positions] - hours, -np.inf)
+        return np.maximum(np.maximum(before, after), np.maximum(own, 0.0))
+
+    def due_position(self, due: int) -> int:
+        # Earliest-deadline slot: ahead of the first job due later or undated; undated work goes last.
+        if due <= 0:
+            return len(self.due)
+        later = np.flatnonzero((self.due == 0) | (self.due > due))
+        return int(later[0]) if len(later) else len(self.due)
+
+    def insert_capacity(self, pos: int, due: int) -> float:
+        # Most hours that fit at pos without raising this member's deficit.
+        start = float(self.finish[pos - 1]) if pos > 0 else 0.0
+        room = np.inf
+        if due > 0:
+            room = float(self.capacity_through(np.array([due]))[0]) - start + self.deficit
+        if pos < len(self.slack):
+            room = min(room, self.deficit - float(self.suffix_max[pos]))
+        return max(room, 0.0)
+
+    def remove(self, pos: int, hours: float) -> None:
+        if hours >= self.hours[pos] - 1e-9:
+            del self.names[pos]
+            self.hours = np.delete(self.hours, pos)
+            self.due = np.delete(self.due, pos)
+        else:
+            self.hours = self.hours.copy()
+            self.hours[pos] -= hours
+        self._refresh()
+
+    def insert(self, pos: int, name: str, hours: float, due: int) -> None:
+        self.names.insert(pos, name)
+        self.hours = np.insert(self.hours, pos, hours)
+        self.due = np.insert(self.due, pos, due)
+        self._refresh()
+
+def _floor_hours(hours):
+    # Proposed hours are whole hundredths, rounded down so the move still fits.
+    return np.floor(np.asarray(hours) * 100.0 + 1e-6) / 100.0
+
+def propose_rebalance(
+    partitions: dict[str, pd.DataFrame],
+    member_settings: dict,
+    daily_hours: dict[str, float],
+    start_date: date,
+    shutdown: DateRangeMask | None = None,
+    max_moves: int = REBALANCE_MAX_MOVES,
+    min_hours: float = REBALANCE_MIN_MOVE_HOURS,
+    shared: dict | None = None,
+) -> dict:
+    # Job moves and splits from overloaded members to helpers with free capacity before the due dates.
+    # Parts of shared jobs stay with their assignees; change the share instead.
+    # A heap always works on the member with the most overtime. Greedy pass: move the job ahead of their
+    # worst late job that saves the most, appended to the helper with the most free hours by its due
+    # date (vectorized over jobs and helpers). Local search, when appending no longer helps: insert at
+    # the due-ordered slot of a helper's queue, as far as their own due dates allow.
+    members = [m for m in member_settings if m in daily_hours]
+    horizon_end = start_date
+    queues = {}
+    calendars = {}
+    for member in members:
+        part = partitions.get(member, empty_jobs_df())
+        calendars[member] = build_member_calendar(member_settings[member], daily_hours[member], start_date, shutdown)
+        queues[member] = schedule_queue_order(part[part["Priority"] >= 1], member_settings[member].get("sequencing"), calendars[member])
+        dues = queues[member]["Due date"].dropna()
+        if not dues.empty:
+            horizon_end = max(horizon_end, _safe_date(dues.max()))
+    loads = {member: MemberLoad(member, queues[member], calendars[member], horizon_end) for member in members}
+    overtime_before = sum(load.deficit for load in loads.values())
+
+    # Capacity through every day of the horizon for every member; column 0 is "before the start".
+    start_ord = start_date.toordinal()
+    grid = np.arange(start_ord, horizon_end.toordinal() + 1, dtype=np.int64)
+    capacity = np.zeros((len(members), len(grid) + 1), dtype=np.float64)
+    for i, member in enumerate(members):
+        capacity[i, 1:] = loads[member].capacity_through(grid)
+    totals = np.array([loads[m].total for m in members], dtype=np.float64)
+    row_of = {m: i for i, m in enumerate(members)}
+
+    def columns(due_ords: np.ndarray) -> np.ndarray:
+        return np.clip(due_ords - start_ord + 1, 0, len(grid))
+
+    def movable(src: MemberLoad) -> np.ndarray:
+        return np.array([not (shared and name in shared and src.member in shared[name]["shares"]) for name in src.names], dtype=bool)
+
+    def best_append(src: MemberLoad) -> dict | None:
+        worst = int(np.argmax(src.slack))
+        positions = np.arange(worst + 1)
+        due = np.where(src.due[positions] > 0, src.due[positions], src.due[worst])
+        free = capacity[:, columns(due)] - totals[:, None]
+        free[row_of[src.member], :] = -np.inf
+        helper_rows = np.argmax(free, axis=0)
+        moved = _floor_hours(np.minimum(src.hours[positions], free[helper_rows, positions]))
+        saved = src.deficit - src.deficits_without(positions, moved)
+        usable = (moved >= np.minimum(min_hours, src.hours[positions])) & (moved > 0) & (saved > 1e-6) & movable(src)[positions]
+        if not usable.any():
+            return None
+        # Most overtime saved; then whole moves over splits, then the fewest hours moved.
+        whole = moved >= src.hours[positions] - 1e-9
+        pick = int(np.lexsort((moved, ~whole, -np.where(usable, saved, -np.inf)))[0])
+        return {"pos": pick, "to": members[int(helper_rows[pick])], "slot": None, "hours": float(moved[pick]), "saved": float(saved[pick])}
+
+    def best_insert(src: MemberLoad) -> dict | None:
+        worst = int(np.argmax(src.slack))
+        window = columns(np.array([src.due[worst]]))[0]
+        ranked = np.argsort(totals - capacity[:, window])
+        helpers = [members[r] for r in ranked if members[r] != src.member][:REBALANCE_SEARCH_HELPERS]
+        best = None
+        free_jobs = movable(src)
+        for pos in range(worst + 1):
+            if not free_jobs[pos]:
+                continue
+            for helper in helpers:
+                load = loads[helper]
+                slot = load.due_position(int(src.due[pos]))
+                moved = float(_floor_hours(min(float(src.hours[pos]), load.insert_capacity(slot, int(src.due[pos])))))
+                if moved <= 0 or moved < min(min_hours, float(src.hours[pos])):
+                    continue
+                saved = src.deficit - float(src.deficits_without(np.array([pos]), np.array([moved]))[0])
+                if saved > 1e-6 and (best is None or saved > best["saved"] + 1e-9):
+                    best = {"pos": pos, "to": helper, "slot": slot, "hours": moved, "saved": saved}
+        return best
+
+    proposals: list[dict] = []
+    heap = [(-load.deficit, member) for member, load in loads.items() if load.deficit > 1e-9]
+    heapq.heapify(heap)
+    while heap and len(proposals) < max_moves:
+        neg_deficit, member = heapq.heappop(heap)
+        src = loads[member]
+        if src.deficit <= 1e-9 or abs(src.deficit + neg_deficit) > 1e-9:
+            continue
+        move = best_append(src) or best_insert(src)
+        if move is None:
+            continue
+        pos = move["pos"]
+        dst = loads[move["to"]]
+        name = src.names[pos]
+        due = int(src.due[pos])
+        split = move["hours"] < float(src.hours[pos]) - 1e-9
+        slot = len(dst.names) if move["slot"] is None else move["slot"]
+        src.remove(pos, move["hours"])
+        dst.insert(slot, f"{name} (split)" if split else name, move["hours"], due)
+        totals[row_of[member]] = src.total
+        totals[row_of[move["to"]]] = dst.total
+        proposals.append(
+            {
+                "op": "split_job" if split else "move_job",
+                "member": member,
+                "job": name,
+                "to": move["to"],
+                "hours": move["hours"],
+                "priority": None if move["slot"] is None else slot + 1,
+                "due": date.fromordinal(due) if due > 0 else None,
+                "overtime_saved": round(move["saved"], 2),
+            }
+        )
+        if src.deficit > 1e-9:
+            heapq.heappush(heap, (-src.deficit, member))
+    return {
+        "proposals": proposals,
+        "overtime_before": round(overtime_before, 2),
+        "overtime_after": round(sum(load.deficit for load in loads.values()), 2),
+    }
+
+def rebalance_edits(proposals: list[dict]) -> list[dict]:
+    # Proposals as what-if edits, so they can be previewed as a scenario or applied through the same overlay.
+    edits = []
+    for proposal in proposals:
+        edit = {"op": proposal["op"], "member": proposal["member"], "job": proposal["job"], "to": proposal["to"]}
+        if proposal["op"] == "split_job":
+            edit["hours"] = proposal["hours"]
+        if proposal["priority"] is not None:
+            edit["priority"] = proposal["priority"]
+        edits.append(edit)
+    return edits
+
+def normalize_estimate_ranges(raw) -> dict:
+    # {"low", "likely", "high"} team multipliers plus {"jobs": {job name: [low hours, high hours]}}.
+    raw = raw if isinstance(raw, dict) else {}
+    spread = sorted(max(_safe_float(raw.get(k), v), 0.0) for k, v in DEFAULT_ESTIMATE_SPREAD.items())
+    jobs = {}
+    raw_jobs = raw.get("jobs") if isinstance(raw.get("jobs"), dict) else {}
+    for name, bounds in raw_jobs.items():
+        if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+            continue
+        low, high = sorted(_safe_float(b, -1.0) for b in bounds)
+        if 0.0 <= low and high < np.inf:
+            jobs[str(name)] = [low, high]
+    return {"low": spread[0], "likely": spread[1], "high": spread[2], "jobs": jobs}
+
+def job_estimate_bounds(queue: pd.DataFrame, ranges: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Low, most likely and high hours per job. Jobs with their own range keep Required hours as the
+    # most likely value, clamped into the range.
+    hours = np.array(job_hours(queue["Required hours"]), dtype=np.float64)
+    low = hours * ranges["low"]
+    likely = hours * ranges["likely"]
+    high = hours * ranges["high"]
+    if ranges["jobs"]:
+        for i, name in enumerate(queue["Job name"].astype(str).tolist()):
+            bounds = ranges["jobs"].get(name)
+            if bounds is not None:
+                low[i], high[i] = bounds
+                likely[i] = min(max(hours[i], bounds[0]), bounds[1])
+    return low, likely, high
+
+def triangular_hours(u: np.ndarray, low: np.ndarray, likely: np.ndarray, high: np.ndarray) -> np.ndarray:
+    # Inverse CDF of a triangular distribution, with one (low, likely, high) per column of u.
+    width = high - low
+    split = np.divide(likely - low, width, out=np.zeros_like(width), where=width > 0)
+    rising = low + np.sqrt(u * (width * (likely - low)))
+    falling = high - np.sqrt((1.0 - u) * (width * (high - likely)))
+    return np.where(u < split, rising, falling)
+
+def _finish_ordinals(calendar: CapacityCalendar, finish_hours: np.ndarray) -> np.ndarray:
+    # Same hour-to-day rule as queue_dates: a job ending exactly on a day boundary finishes that day.
+    seg_ends = np.array(calendar.seg_ends, dtype=np.float64)
+    seg_ords = np.array([seg[1].toordinal() for seg in calendar.segments], dtype=np.int64)
+    idx = np.searchsorted(seg_ends, np.maximum(finish_hours - 1e-9, 0.0), side="right")
+    return seg_ords[np.minimum(idx, len(seg_ords) - 1)]
+
+def simulate_delivery_risk(
+    partitions: dict[str, pd.DataFrame],
+    member_settings: dict,
+    daily_hours: dict[str, float],
+    start_date: date,
+    shutdown: DateRangeMask | None = None,
+    ranges: dict | None = None,
+    samples: int = RISK_DEFAULT_SAMPLES,
+    seed: int | None = None,
+) -> dict:
+    # Monte Carlo over job hours. Each member's active queue is drawn as a samples x jobs matrix,
+    # cumulative-summed into finish hours and mapped to days through the capacity calendar in bulk.
+    # Jobs are processed in column blocks (carrying the running total) so memory stays bounded.
+    ranges = normalize_estimate_ranges(ranges)
+    samples = max(int(samples), 1)
+    rng = np.random.default_rng(seed)
+    k50 = int(np.ceil(0.5 * samples)) - 1
+    k90 = int(np.ceil(0.9 * samples)) - 1
+    block = max(RISK_BLOCK_VALUES // samples, 1)
+    on_time_by_sample = np.zeros(samples, dtype=np.int64)
+    frames = []
+    errors = {}
+    for member in [m for m in member_settings if m in daily_hours]:
+        part = partitions.get(member, empty_jobs_df())
+        if not (part["Priority"] >= 1).any():
+            continue
+        calendar = build_member_calendar(member_settings[member], daily_hours[member], start_date, shutdown)
+        queue = schedule_queue_order(part[part["Priority"] >= 1], member_settings[member].get("sequencing"), calendar)
+        low, likely, high = job_estimate_bounds(queue, ranges)
+        due = _due_ordinals(queue)
+        try:
+            calendar.extend_to_hours(float(high.sum()))
+        except ValueError as exc:
+            errors[member] = str(exc)
+            continue
+        n = len(queue)
+        chance = np.full(n, np.nan)
+        p50 = np.empty(n, dtype=np.int64)
+        p90 = np.empty(n, dtype=np.int64)
+        carry = np.zeros((samples, 1), dtype=np.float64)
+        for lo in range(0, n, block):
+            hi = min(lo + block, n)
+            drawn = triangular_hours(rng.random((samples, hi - lo)), low[lo:hi], likely[lo:hi], high[lo:hi])
+            finish = np.cumsum(drawn, axis=1)
+            finish += carry
+            carry = finish[:, -1:]
+            finish_ords = _finish_ordinals(calendar, finish)
+            dated = np.flatnonzero(due[lo:hi] > 0)
+            if len(dated):
+                on_time = finish_ords[:, dated] <= due[lo:hi][dated]
+                chance[lo + dated] = on_time.mean(axis=0)
+                on_time_by_sample += on_time.sum(axis=1)
+            ranked = np.partition(finish_ords, [k50, k90], axis=0)
+            p50[lo:hi] = ranked[k50]
+            p90[lo:hi] = ranked[k90]
+        planned = _finish_ordinals(calendar, np.cumsum(np.array(job_hours(queue["Required hours"]), dtype=np.float64)))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "Assignee": member,
+                    "Job name": queue["Job name"].astype(str).to_numpy(),
+                    "Due date": [None if d <= 0 else date.fromordinal(int(d)) for d in due],
+                    "Planned finish": _ordinals_to_dates(planned),
+                    "P50 finish": _ordinals_to_dates(p50),
+                    "P90 finish": _ordinals_to_dates(p90),
+                    "On-time chance %": np.round(chance * 100.0, 1),
+                }
+            )
+        )
+    jobs = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=["Assignee", "Job name", "Due date", "Planned finish", "P50 finish", "P90 finish", "On-time chance %"]
+    )
+    tracked = int(jobs["On-time chance %"].notna().sum())
+    pct = np.sort(on_time_by_sample) / tracked * 100.0 if tracked else None
+    summary = {
+        "samples": samples,
+        "due_tracked_jobs": tracked,
+        "expected_on_time_jobs": round(float(jobs["On-time chance %"].sum()) / 100.0, 1),
+        "on_time_pct_p50": None if pct is None else round(float(pct[k50]), 1),
+        # Nine samples in ten do at least this well.
+        "on_time_pct_p10": None if pct is None else round(float(pct[int(np.ceil(0.1 * samples)) - 1]), 1),
+        "all_on_time_chance_pct": None if pct is None else round(float(np.mean(on_time_by_sample == tracked)) * 100.0, 1),
+    }
+    return {"jobs": jobs, "summary": summary, "errors": errors}
+
+def normalize_shared_jobs(raw) -> dict:
+    # {job name: {"mode", "hours", "shares": {member: value}}}. Fixed shares are each assignee's hours;
+    # proportional shares are weights on "hours", the job total (None = the hours its rows hold now).
+    shared = {}
+    for name, spec in (raw.items() if isinstance(raw, dict) else []):
+        if not isinstance(spec, dict) or not isinstance(spec.get("shares"), dict):
+            continue
+        shares = {str(m): v for m, v in ((m, _safe_float(v, -1.0)) for m, v in spec["shares"].items()) if 0.0 < v < np.inf}
+        mode = spec.get("mode") if spec.get("mode") in SHARE_MODES else "proportional"
+        if not shares:
+            continue
+        hours = _safe_float(spec.get("hours"), -1.0)
+        shared[str(name)] = {"mode": mode, "hours": hours if 0.0 <= hours < np.inf else None, "shares": shares}
+    return shared
+
+def share_hours(spec: dict, total: float | None = None) -> dict[str, float]:
+    # Each assignee's hours of a shared job; total stands in for a proportional spec without "hours".
+    if spec["mode"] == "fixed":
+        return {m: round(h, JOB_HOURS_DECIMALS) for m, h in spec["shares"].items()}
+    total = spec["hours"] if spec["hours"] is not None else (total or 0.0)
+    weight = sum(spec["shares"].values())
+    return {m: round(total * w / weight, JOB_HOURS_DECIMALS) for m, w in spec["shares"].items()}
+
+def apply_job_shares(
+    partitions: dict[str, pd.DataFrame],
+    shared: dict,
+    members: list[str] | None = None,
+    previous: dict[str, list[str]] | None = None,
+) -> dict[str, pd.DataFrame]:
+    # Materialise shared jobs as one row per assignee holding that assignee's hours, so every
+    # per-member schedule, cache and worker sees ordinary rows. An assignee without a row gets a copy
+    # of one at the end of their queue; previous lists members whose row of a job goes when they are
+    # no longer sharing it. Only the frames of members listed (default all) that change are returned.
+    previous = previous or {}
+    wanted = None if members is None else set(members)
+    hours_set: dict[str, dict[str, float]] = {}
+    added: dict[str, list[pd.DataFrame]] = {}
+    dropped: dict[str, set[str]] = {}
+
+    def rows_of(member: str, name: str) -> np.ndarray:
+        part = partitions.get(member)
+        return np.zeros(0, dtype=np.int64) if part is None else np.flatnonzero(part["Job name"].astype(str).to_numpy() == name)
+
+    for name, spec in shared.items():
+        holders = list(spec["shares"]) + [m for m in previous.get(name, []) if m not in spec["shares"]]
+        found = {m: rows_of(m, name) for m in holders}
+        template = next((partitions[m].iloc[[rows[0]]] for m, rows in found.items() if len(rows)), None)
+        if template is None:
+            continue
+        current = sum(float(partitions[m]["Required hours"].iloc[rows[0]]) for m, rows in found.items() if len(rows) and m in spec["shares"])
+        for member, hours in share_hours(spec, current).items():
+            if wanted is not None and member not in wanted:
+                continue
+            if len(found[member]):
+                hours_set.setdefault(member, {})[name] = hours
+            else:
+                added.setdefault(member, []).append(template.assign(**{"Assignee": member, "Required hours": hours}))
+        for member in holders:
+            if member not in spec["shares"] and len(found[member]) and (wanted is None or member in wanted):
+                dropped.setdefault(member, set()).add(name)
+
+    out = {}
+    for member in set(hours_set) | set(added) | set(dropped):
+        jobs = partitions.get(member, empty_jobs_df())
+        names = jobs["Job name"].astype(str).to_numpy()
+        hours = jobs["Required hours"].to_numpy(dtype=float, copy=True)
+        changed = False
+        for name, h in hours_set.get(member, {}).items():
+            first = int(np.flatnonzero(names == name)[0])
+            if round(float(hours[first]), JOB_HOURS_DECIMALS) != h:
+                hours[first] = h
+                changed = True
+        if changed:
+            jobs = apply_job_dtypes(jobs.assign(**{"Required hours": hours}))
+        if member in dropped:
+            jobs = normalize_active_priorities(jobs[~np.isin(names, list(dropped[member]))].reset_index(drop=True))
+            changed = True
+        for row in added.get(member, []):
+            if int(row["Priority"].iloc[0]) >= 1:
+                row = row.assign(Priority=int((jobs["Priority"] >= 1).sum()) + 1)
+            jobs = _queue_job(jobs, row)
+            changed = True
+        if changed:
+            out[member] = jobs
+    return out
+
+def _shared_rows(rows: pd.DataFrame, shared: dict) -> np.ndarray:
+    # Rows that are one assignee's part of a shared job.
+    return np.array(
+        [name in shared and member in shared[name]["shares"] for name, member in zip(rows["Job name"].astype(str), rows["Assignee"].astype(str))],
+        dtype=bool,
+    )
+
+def shared_job_rows(rows: pd.DataFrame, shared: dict) -> pd.DataFrame:
+    # One row per shared job in a schedule frame: hours summed, the earliest start and the latest
+    # finish (none while a part is unscheduled), and "SL 30h + LS 10h" as the assignee.
+    parts = rows[_shared_rows(rows, shared)] if shared and not rows.empty else rows.iloc[0:0]
+    parts = parts.assign(Assignee=[f"{m} {h:g}h" for m, h in zip(parts["Assignee"].astype(str), job_hours(parts["Required hours"]))])
+    key = ["Job name", "Status"] if "Status" in parts.columns else ["Job name"]
+
+    def first(values: pd.Series):
+        return None if values.isna().any() else min(values)
+
+    def last(values: pd.Series):
+        return None if values.isna().any() else max(values)
+
+    agg = {c: "first" for c in parts.columns if c not in key}
+    agg["Assignee"] = " + ".join
+    agg["Required hours"] = "sum"
+    if "Start date" in parts.columns:
+        agg["Start date"] = first
+    if "Finish date" in parts.columns:
+        agg["Finish date"] = last
+    return parts.groupby(key, sort=False, as_index=False).agg(agg)[list(rows.columns)]
+
+def collapse_shared_jobs(rows: pd.DataFrame, shared: dict) -> pd.DataFrame:
+    # Schedule rows with each shared job's parts folded into its shared_job_rows row, so a shared job
+    # counts once and is only on time when every part is.
+    if not shared or rows.empty:
+        return rows
+    part = _shared_rows(rows, shared)
+    if not part.any():
+        return rows
+    return pd.concat([rows[~part], shared_job_rows(rows, shared)], ignore_index=True)
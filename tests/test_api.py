@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from resourcing_api import API_DEFAULT_SOURCE_DIR, DatasetSource, ReportCache, main
+from resourcing_core import DEFAULT_JOBS_ROWS, DEFAULT_TEAM_ROWS
+
+@pytest.fixture
+def cache(tmp_path):
+    (tmp_path / "main.json").write_text(json.dumps({"team": DEFAULT_TEAM_ROWS, "jobs_raw": DEFAULT_JOBS_ROWS}), encoding="utf-8")
+    return ReportCache(DatasetSource(tmp_path), workers=1)
+
+def test_member_filter_only_accepts_team_members(cache):
+    _, body = cache.response("main", "schedules", "SL")
+    assert {job["Assignee"] for job in json.loads(body)["jobs"]} == {"SL"}
+    for member in ("XX", "sl", "SL "):
+        with pytest.raises(LookupError):
+            cache.response("main", "availability", member)
+    assert set(cache._entry("main")["responses"]) == {("schedules", "SL")}
+
+def test_kpis_ignore_the_member_filter(cache):
+    first = cache.response("main", "kpis")
+    assert cache.response("main", "kpis", "SL") == first
+    assert cache.response("main", "kpis", "XX") == first
+    assert set(cache._entry("main")["responses"]) == {("kpis", "")}
+
+def test_default_source_dir_is_the_apps_cache(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    served = {}
+    monkeypatch.setattr("resourcing_api.serve", lambda cache, *args, **kwargs: served.setdefault("dir", cache.source.source_dir))
+    main([])
+    assert served["dir"] == API_DEFAULT_SOURCE_DIR
+    assert API_DEFAULT_SOURCE_DIR.is_absolute()
@@ -0,0 +1,180 @@
+import json
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+
+from resourcing_calendar import (
+    apply_calendar_delta,
+    calendar_sync_windows,
+    fetch_microsoft_calendar_delta,
+    map_events_to_daily_unavailable,
+    sync_calendar_windows,
+)
+
+START = date(2026, 10, 19)
+END = START + timedelta(days=60)
+
+class GraphStub:
+    # Local stand-in for calendarView/delta: a full sync lists the events in its range two to a page,
+    # and the delta token it returns ("start|end|version") replays every change made since.
+    def __init__(self):
+        self.events: dict[str, dict] = {}
+        self.log: list[tuple[int, str]] = []
+        self.version = 0
+        self.expired: set[str] = set()
+        self.requests: list[str] = []
+        self.lock = threading.Lock()
+
+    def put(self, ev_id: str, day: date, h0: int, h1: int, end_day: date | None = None, **extra) -> None:
+        with self.lock:
+            self.version += 1
+            self.events[ev_id] = {
+                "id": ev_id,
+                "start": {"dateTime": f"{day.isoformat()}T{h0:02d}:00:00.0000000", "timeZone": "UTC"},
+                "end": {"dateTime": f"{(end_day or day).isoformat()}T{h1:02d}:00:00.0000000", "timeZone": "UTC"},
+                "showAs": "busy",
+                "isCancelled": False,
+                **extra,
+            }
+            self.log.append((self.version, ev_id))
+
+    def delete(self, ev_id: str) -> None:
+        with self.lock:
+            self.version += 1
+            self.events.pop(ev_id, None)
+            self.log.append((self.version, ev_id))
+
+    def expire_tokens(self) -> None:
+        with self.lock:
+            self.expired.add("*")
+
+    def _overlaps(self, ev: dict, lo: datetime, hi: datetime) -> bool:
+        start = datetime.fromisoformat(ev["start"]["dateTime"][:19]).replace(tzinfo=timezone.utc)
+        end = datetime.fromisoformat(ev["end"]["dateTime"][:19]).replace(tzinfo=timezone.utc)
+        return end > lo and start < hi
+
+    def respond(self, path: str, base: str) -> tuple[int, dict]:
+        query = {k: v[0] for k, v in parse_qs(urlparse(path).query).items()}
+        with self.lock:
+            self.requests.append(path)
+            if "$deltatoken" in query:
+                if "*" in self.expired:
+                    return 410, {"error": {"code": "SyncStateNotFound", "message": "The sync state is expired."}}
+                lo, hi, seen = query["$deltatoken"].split("|")
+                lo, hi = datetime.fromisoformat(lo), datetime.fromisoformat(hi)
+                values = []
+                for ev_id in dict.fromkeys(i for v, i in self.log if v > int(seen)):
+                    ev = self.events.get(ev_id)
+                    values.append(ev if ev is not None and self._overlaps(ev, lo, hi) else {"id": ev_id, "@removed": {"reason": "deleted"}})
+            else:
+                lo = datetime.fromisoformat(query["startDateTime"].replace("Z", "+00:00"))
+                hi = datetime.fromisoformat(query["endDateTime"].replace("Z", "+00:00"))
+                values = sorted((ev for ev in self.events.values() if self._overlaps(ev, lo, hi)), key=lambda ev: ev["id"])
+            page = int(query.get("page", 0))
+            body = {"value": values[page * 2:page * 2 + 2]}
+            if len(values) > page * 2 + 2:
+                body["@odata.nextLink"] = f"{base}/me/calendarView/delta?" + urlencode({**query, "page": page + 1})
+            else:
+                token = f"{lo.isoformat()}|{hi.isoformat()}|{self.version}"
+                body["@odata.deltaLink"] = f"{base}/me/calendarView/delta?" + urlencode({"$deltatoken": token})
+            return 200, body
+
+@pytest.fixture
+def graph():
+    stub = GraphStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = stub.respond(self.path, stub.base)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    stub.base = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield stub
+    server.shutdown()
+
+def _range(first: date, last: date) -> tuple[datetime, datetime]:
+    return (
+        datetime.combine(first, datetime.min.time(), tzinfo=timezone.utc),
+        datetime.combine(last + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc),
+    )
+
+def _hours(cache: dict) -> dict[date, float]:
+    return map_events_to_daily_unavailable(list(cache.values()), START, END)[0]
+
+def test_first_sync_pages_through_every_event(graph):
+    for i in range(5):
+        graph.put(f"e{i}", START + timedelta(days=i), 9, 11)
+    result, msg = fetch_microsoft_calendar_delta("token", *_range(START, START + timedelta(days=9)), base_url=graph.base)
+    assert result is not None, msg
+    assert result["full"] is True
+    assert sorted(ev["id"] for ev in result["events"]) == [f"e{i}" for i in range(5)]
+    assert "deltatoken" in result["delta_link"]
+    assert len(graph.requests) == 3
+
+def test_delta_applies_changed_removed_and_cancelled_events(graph):
+    graph.put("moved", START, 9, 11)
+    graph.put("gone", START + timedelta(days=1), 9, 10)
+    graph.put("called_off", START + timedelta(days=2), 13, 17)
+    first, msg = fetch_microsoft_calendar_delta("token", *_range(START, START + timedelta(days=9)), base_url=graph.base)
+    assert first is not None, msg
+    cache, _ = apply_calendar_delta({}, first["events"], "w")
+    assert _hours(cache) == {START: 2.0, START + timedelta(days=1): 1.0, START + timedelta(days=2): 4.0}
+
+    graph.put("moved", START + timedelta(days=3), 8, 9)
+    graph.delete("gone")
+    graph.put("called_off", START + timedelta(days=2), 13, 17, isCancelled=True)
+    delta, msg = fetch_microsoft_calendar_delta("token", *_range(START, START + timedelta(days=9)), first["delta_link"], base_url=graph.base)
+    assert delta is not None, msg
+    assert delta["full"] is False
+    cache, affected = apply_calendar_delta(cache, delta["events"], "w")
+    assert set(cache) == {"moved", "called_off"}
+    assert affected == {START + timedelta(days=i) for i in range(4)}
+    assert _hours(cache) == {START + timedelta(days=3): 1.0}
+
+def test_windowed_refresh_resumes_from_stored_links(graph):
+    windows = calendar_sync_windows(START, END)
+    edge = windows[0][1]
+    graph.put("early", START, 9, 12)
+    # Crosses the first window edge, so both windows report it.
+    graph.put("overnight", edge, 22, 2, end_day=edge + timedelta(days=1))
+    graph.put("late", windows[-1][0], 9, 10)
+    first, msg = sync_calendar_windows("token", START, END, {}, {}, base_url=graph.base)
+    assert first is not None, msg
+    assert first["full_windows"] == first["windows"] == len(windows)
+    assert set(first["cache"]) == {"early", "overnight", "late"}
+    assert first["cache"]["overnight"]["windows"] == sorted([windows[0][0].isoformat(), windows[1][0].isoformat()])
+
+    requests_before = len(graph.requests)
+    graph.delete("late")
+    second, msg = sync_calendar_windows("token", START, END, first["delta_windows"], first["cache"], base_url=graph.base)
+    assert second is not None, msg
+    assert second["full_windows"] == 0
+    assert second["changes"] == len(windows)
+    assert set(second["cache"]) == {"early", "overnight"}
+    assert windows[-1][0] in second["affected"]
+    assert len(graph.requests) - requests_before == len(windows)
+
+def test_expired_delta_token_falls_back_to_a_full_sync(graph):
+    graph.put("kept", START, 9, 11)
+    first, msg = sync_calendar_windows("token", START, END, {}, {}, base_url=graph.base)
+    assert first is not None, msg
+    graph.put("added", START + timedelta(days=1), 14, 15)
+    graph.expire_tokens()
+    second, msg = sync_calendar_windows("token", START, END, first["delta_windows"], first["cache"], base_url=graph.base)
+    assert second is not None, msg
+    assert second["full_windows"] == second["windows"]
+    assert set(second["cache"]) == {"kept", "added"}
+    assert _hours(second["cache"]) == {START: 2.0, START + timedelta(days=1): 1.0}
+    assert any("startDateTime" in path for path in graph.requests[-second["windows"]:])
@@ -0,0 +1,116 @@
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from resourcing_core import (
+    SEQUENCING_POLICIES,
+    clean_jobs_df,
+    dependency_edges,
+    evaluate_scenarios,
+    job_arrays,
+    member_schedule_task,
+    normalize_dependencies,
+    parse_member_settings,
+    run_dependency_schedule,
+    run_member_schedule_tasks,
+    sequencing_outcomes,
+)
+
+START = date(2026, 10, 19)
+
+def _linked_plan(n_members: int, n_jobs: int, n_links: int, seed: int):
+    rng = random.Random(seed)
+    members = [f"M{i}" for i in range(n_members)]
+    jobs = clean_jobs_df(pd.DataFrame([
+        {
+            "Job name": f"J{i}",
+            "Required hours": round(rng.uniform(0.1, 12.0), 1),
+            "Priority": rng.randint(1, 30),
+            "Assignee": rng.choice(members),
+            "Due date": None,
+            "Notes": "",
+        }
+        for i in range(n_jobs)
+    ]))
+    settings = parse_member_settings({}, members)
+    names, tasks = {}, []
+    for m in members:
+        part = jobs[jobs["Assignee"] == m].reset_index(drop=True)
+        names[m] = part["Job name"].astype(str).tolist()
+        tasks.append(member_schedule_task(m, settings[m], 8.0, START, None, job_arrays(part)))
+    links = []
+    for _ in range(n_links):
+        a, b = sorted(rng.sample(range(n_jobs), 2))
+        links.append({"job": f"J{b}", "after": f"J{a}"})
+    edges, unresolved = dependency_edges(names, normalize_dependencies(links))
+    assert unresolved == []
+    return tasks, edges
+
+def _position(queue: dict, row: int) -> int:
+    return int(np.flatnonzero(queue["order"] == row)[0])
+
+def test_successors_start_after_their_predecessors():
+    # Fractional hours make the member clocks drift by rounding; a job released by another member's
+    # finish must still start on a later day, and one on the same member no earlier than its finish hour.
+    tasks, edges = _linked_plan(20, 2000, 4000, seed=2)
+    results, info = run_dependency_schedule(tasks, edges)
+    assert info["cycles"] == []
+    checked = 0
+    for pm, pr, sm, sr in edges:
+        pred, succ = results[pm]["queues"]["active"], results[sm]["queues"]["active"]
+        p, s = _position(pred, pr), _position(succ, sr)
+        if pm == sm:
+            assert succ["start_hours"][s] >= pred["finish_hours"][p] - 1e-9
+        else:
+            assert succ["start"][s] > pred["finish"][p], (pm, pr, sm, sr)
+            checked += 1
+    assert checked > 3000
+
+def test_no_links_matches_independent_schedules():
+    tasks, _ = _linked_plan(5, 200, 0, seed=1)
+    plain = run_member_schedule_tasks(tasks, 1)
+    linked, _ = run_dependency_schedule(tasks, [])
+    for task in tasks:
+        for kind, queue in plain[task["id"]]["queues"].items():
+            other = linked[task["id"]]["queues"][kind]
+            for field in ("order", "start_hours", "finish_hours", "start", "finish"):
+                assert np.array_equal(queue[field], other[field])
+
+def _pump_and_seal():
+    # LS fits the seal only after SL's pump rebuild; VA is not linked.
+    jobs = clean_jobs_df(pd.DataFrame([
+        {"Job name": "Pump", "Required hours": 16, "Priority": 1, "Assignee": "SL", "Due date": None, "Notes": ""},
+        {"Job name": "Seal", "Required hours": 4, "Priority": 1, "Assignee": "LS", "Due date": None, "Notes": ""},
+        {"Job name": "Valve", "Required hours": 4, "Priority": 1, "Assignee": "VA", "Due date": None, "Notes": ""},
+    ]))
+    partitions = {m: part.reset_index(drop=True) for m, part in jobs.groupby("Assignee", sort=False, observed=True)}
+    return partitions, parse_member_settings({}, list(partitions)), normalize_dependencies([{"job": "Seal", "after": "Pump"}])
+
+def _finish(outcome: dict, job: str):
+    sched = outcome["sched"]
+    return sched.loc[sched["Job name"] == job, "Finish date"].iloc[0]
+
+def _start(outcome: dict, job: str):
+    sched = outcome["sched"]
+    return sched.loc[sched["Job name"] == job, "Start date"].iloc[0]
+
+def test_scenarios_reschedule_linked_members_together():
+    partitions, settings, links = _pump_and_seal()
+    daily = {m: 8.0 for m in settings}
+    scenarios = {"slow": [{"op": "daily_hours", "member": "SL", "hours": 4.0}], "valve": [{"op": "daily_hours", "member": "VA", "hours": 4.0}]}
+    out = evaluate_scenarios(scenarios, partitions, settings, daily, START, workers=1, links=links)
+    slow = out["slow"]["outcomes"]
+    assert sorted(slow) == ["LS", "SL"]
+    assert _start(slow["LS"], "Seal") > _finish(slow["SL"], "Pump")
+    assert sorted(out["valve"]["outcomes"]) == ["VA"]
+
+def test_policy_comparison_keeps_links():
+    partitions, settings, links = _pump_and_seal()
+    daily = {m: 8.0 for m in settings}
+    names = {m: part["Job name"].astype(str).tolist() for m, part in partitions.items()}
+    edges, _ = dependency_edges(names, links)
+    out = sequencing_outcomes(partitions, settings, daily, START, workers=1, edges=edges)
+    for policy in SEQUENCING_POLICIES:
+        assert _start(out[policy]["LS"], "Seal") > _finish(out[policy]["SL"], "Pump")
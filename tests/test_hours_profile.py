@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from resourcing_core import (
+    HOURS_PROFILE_DEFAULT_ANCHOR,
+    _serialize_member_settings,
+    build_member_calendar,
+    normalize_hours_profile,
+    parse_member_settings,
+)
+
+NINE_DAY_FORTNIGHT = [9.0] * 5 + [0.0, 0.0] + [9.0] * 4 + [0.0] * 3
+
+def test_profile_without_anchor_gets_a_fixed_week_one():
+    profile = normalize_hours_profile({"hours": NINE_DAY_FORTNIGHT})
+    assert profile["anchor"] == HOURS_PROFILE_DEFAULT_ANCHOR
+    assert HOURS_PROFILE_DEFAULT_ANCHOR.weekday() == 0
+
+def test_anchor_is_saved_and_reloaded():
+    settings = parse_member_settings({"SL": {"hours_profile": {"hours": NINE_DAY_FORTNIGHT}}}, ["SL"])
+    saved = _serialize_member_settings(settings["SL"])
+    assert saved["hours_profile"]["anchor"] == HOURS_PROFILE_DEFAULT_ANCHOR.isoformat()
+    reloaded = parse_member_settings({"SL": saved}, ["SL"])
+    assert reloaded["SL"]["hours_profile"] == settings["SL"]["hours_profile"]
+
+def test_fortnight_phase_follows_the_anchor():
+    monday = HOURS_PROFILE_DEFAULT_ANCHOR + timedelta(weeks=40)
+    settings = parse_member_settings({"SL": {"hours_profile": {"hours": NINE_DAY_FORTNIGHT}}}, ["SL"])
+    hours = dict(build_member_calendar(settings["SL"], 8.0, monday).days_through(monday + timedelta(days=13)))
+    # Week 40 after the anchor is an even week, so it is week 1 of the cycle: only week 2's Friday is off.
+    assert hours[monday + timedelta(days=4)] == 9.0
+    assert monday + timedelta(days=11) not in hours
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pandas as pd
+
+from resourcing_core import (
+    SlotCalendar,
+    apply_job_dtypes,
+    build_member_calendar,
+    job_time_slots,
+    schedule_member_jobs,
+)
+
+MONDAY = date(2026, 10, 19)
+
+def _member(min_block: float, days: int = 5) -> dict:
+    busy = []
+    for i in range(days):
+        day = date.fromordinal(MONDAY.toordinal() + i).isoformat()
+        busy += [[f"{day}T10:00", f"{day}T11:00"], [f"{day}T14:00", f"{day}T15:00"]]
+    return {
+        "weekdays": {0, 1, 2, 3, 4},
+        "leave_ranges": [],
+        "unavailable_hours": {},
+        "calendar_unavailable_hours": {},
+        "calendar_work_window": ["09:00", "17:00"],
+        "calendar_busy": busy,
+        "intraday": {"enabled": True, "min_block_hours": min_block},
+    }
+
+def _jobs(*rows: tuple[str, float]) -> pd.DataFrame:
+    return apply_job_dtypes(pd.DataFrame({
+        "Job name": [name for name, _ in rows],
+        "Required hours": [hours for _, hours in rows],
+        "Priority": list(range(1, len(rows) + 1)),
+        "Assignee": ["SL"] * len(rows),
+        "Due date": [None] * len(rows),
+        "Notes": [""] * len(rows),
+    }))
+
+def _slots(cfg: dict, jobs: pd.DataFrame) -> pd.DataFrame:
+    calendar = build_member_calendar(cfg, 8.0, MONDAY)
+    assert isinstance(calendar, SlotCalendar)
+    sched = schedule_member_jobs(jobs, MONDAY, 8.0, cfg["weekdays"], set(), calendar=calendar)
+    return job_time_slots(sched, calendar)
+
+def test_focus_block_is_not_left_with_a_short_tail():
+    # Meetings at 10:00 and 14:00 with a 2h minimum block leave 11:00-14:00 and 15:00-17:00. Starting the
+    # 4h job at 11:00 would end it with a 1h piece at 15:00, so it starts at 15:00 instead.
+    slots = _slots(_member(2.0), _jobs(("Focus", 4.0)))
+    assert slots[["Date", "From", "To", "Part"]].values.tolist() == [
+        [MONDAY, "15:00", "17:00", "1 of 2"],
+        [date(2026, 10, 20), "11:00", "13:00", "2 of 2"],
+    ]
+    assert (slots["Hours"] >= 2.0).all()
+
+def test_pieces_hold_the_minimum_block():
+    jobs = _jobs(("A", 1.5), ("B", 4.0), ("C", 2.5), ("D", 5.0), ("E", 0.5))
+    slots = _slots(_member(2.0, days=10), jobs)
+    hours = slots.groupby("Job name", sort=False)["Hours"].sum()
+    assert hours.to_dict() == {"A": 1.5, "B": 4.0, "C": 2.5, "D": 5.0, "E": 0.5}
+    for name, pieces in slots.groupby("Job name"):
+        total = pieces["Hours"].sum()
+        assert (pieces["Hours"] >= min(2.0, total) - 1e-6).all(), name
+
+def test_gaps_shorter_than_the_block_stay_free():
+    # A 4h block fits on none of the meeting days, only on the first free Monday after them.
+    slots = _slots(_member(4.0), _jobs(("Focus", 4.0)))
+    assert slots[["Date", "From", "To"]].values.tolist() == [[date(2026, 10, 26), "09:00", "13:00"]]
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pandas as pd
+
+from resourcing_core import (
+    apply_job_shares,
+    apply_scenario_edits,
+    clean_jobs_df,
+    normalize_active_priorities,
+    normalize_shared_jobs,
+    parse_member_settings,
+    propose_rebalance,
+)
+
+START = date(2026, 10, 19)
+MEMBERS = ["SL", "LB", "XX"]
+
+def _partitions(rows: list[tuple]) -> dict[str, pd.DataFrame]:
+    jobs = normalize_active_priorities(clean_jobs_df(pd.DataFrame([
+        {"Job name": name, "Required hours": hours, "Priority": priority, "Assignee": member, "Due date": due, "Notes": ""}
+        for name, hours, priority, member, due in rows
+    ])))
+    return {str(m): part.reset_index(drop=True) for m, part in jobs.groupby("Assignee", sort=False, observed=True)}
+
+def _apply(partitions: dict, overlay: dict) -> dict:
+    # What the app does on apply: swap the overlay's frames and share specs in, then refit shares.
+    live = {**partitions, **overlay["jobs"]}
+    return {**live, **apply_job_shares(live, overlay["shared"])}
+
+def _hours(partitions: dict, name: str) -> dict[str, float]:
+    return {m: float(p.loc[p["Job name"] == name, "Required hours"].sum()) for m, p in partitions.items() if (p["Job name"] == name).any()}
+
+def _shared_pump() -> tuple[dict, dict]:
+    shared = normalize_shared_jobs({"Pump": {"mode": "fixed", "shares": {"SL": 30, "LB": 10}}})
+    partitions = _partitions([("Pump", 30, 1, "SL", None), ("Pump", 10, 1, "LB", None), ("Valve", 4, 1, "XX", None)])
+    return partitions, shared
+
+def test_moving_a_shared_part_hands_over_the_share():
+    partitions, shared = _shared_pump()
+    edits = [{"op": "move_job", "member": "SL", "job": "Pump", "to": "XX"}]
+    overlay = apply_scenario_edits(partitions, parse_member_settings({}, MEMBERS), {m: 8.0 for m in MEMBERS}, edits, shared)
+    assert overlay["skipped"] == []
+    assert overlay["shared"]["Pump"]["shares"] == {"XX": 30.0, "LB": 10.0}
+    assert shared["Pump"]["shares"] == {"SL": 30.0, "LB": 10.0}
+    preview = {**partitions, **overlay["jobs"]}
+    applied = _apply(partitions, overlay)
+    assert _hours(preview, "Pump") == _hours(applied, "Pump") == {"LB": 10.0, "XX": 30.0}
+
+def test_splits_and_moves_onto_another_holder_are_skipped():
+    partitions, shared = _shared_pump()
+    edits = [
+        {"op": "split_job", "member": "SL", "job": "Pump", "to": "XX", "hours": 5},
+        {"op": "move_job", "member": "SL", "job": "Pump", "to": "LB"},
+    ]
+    overlay = apply_scenario_edits(partitions, parse_member_settings({}, MEMBERS), {m: 8.0 for m in MEMBERS}, edits, shared)
+    assert overlay["skipped"] == [0, 1]
+    assert overlay["jobs"] == {}
+    assert overlay["shared"] is shared
+
+def test_rebalance_leaves_shared_parts_alone():
+    due = pd.Timestamp(START) + pd.Timedelta(days=2)
+    partitions = _partitions([("Pump", 40, 1, "SL", due), ("Seal", 6, 2, "SL", due)])
+    daily = {m: 8.0 for m in MEMBERS}
+    settings = parse_member_settings({}, MEMBERS)
+    moved = {p["job"] for p in propose_rebalance(partitions, settings, daily, START)["proposals"]}
+    assert "Pump" in moved
+    shared = normalize_shared_jobs({"Pump": {"mode": "fixed", "shares": {"SL": 40}}})
+    proposals = propose_rebalance(partitions, settings, daily, START, shared=shared)["proposals"]
+    assert proposals and all(p["job"] != "Pump" for p in proposals)